@@ -1,7 +1,17 @@
 __all__ = [
     'booleanexpression',
     'netlist',
+    'schematic',
     'truthtable',
+    'binarytable',
+    'minimize',
+    'npn',
+    'bdd',
+    'sat',
+    'simulate',
+    'parallel',
+    'cache',
+    'incremental',
     'utility',
     'generalinformation',
     'various'
@@ -0,0 +1,782 @@
+#!/usr/bin/env python3
+
+# electruth: a collection of boolean logic tools
+# Copyright (C) 2010, 2011  Niels Serup
+
+# This file is part of electruth.
+#
+# electruth is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# electruth is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with electruth.  If not, see <http://www.gnu.org/licenses/>.
+
+##[ Name        ]## electruth.bdd
+##[ Maintainer  ]## Niels Serup <ns@metanohi.org>
+##[ Description ]## Reduced ordered binary decision diagrams
+
+# A BDD manager keeps every node of every diagram it has built in one
+# unique table, so two functions are equal exactly when they are the
+# same node. Nodes are integers indexing the lists _var, _low and
+# _high; 0 and 1 are the false and true terminals. The variable at the
+# top of a node is stored as a variable index, and _levels maps
+# variable indices to their position in the variable order.
+
+# Diagrams are handed out as Function objects. Nodes that no Function
+# can reach are removed by collect_garbage, which the manager runs by
+# itself when the number of nodes has grown enough.
+
+# The size of a diagram depends very much on the variable order. When
+# the number of live nodes has grown past a limit, the manager improves
+# the order by sifting (see reorder), and doubles the limit. Levels are
+# swapped in place, so a node keeps its number (and its Functions stay
+# valid) even though its variable and children may change.
+
+import functools
+import operator
+import electruth.booleanexpression as boolexpr
+from electruth.booleanexpression import AND, OR, NOT, XOR, NAND, NOR, XNOR
+
+_infinity = float('inf')
+
+class BDDError(Exception):
+    pass
+
+def _reduce_and(*objs):
+    return functools.reduce(operator.and_, objs)
+
+def _reduce_or(*objs):
+    return functools.reduce(operator.or_, objs)
+
+def _reduce_xor(*objs):
+    return functools.reduce(operator.xor, objs)
+
+_function_operator_types = {
+    NOT: lambda obj: ~obj,
+    AND: _reduce_and,
+    OR: _reduce_or,
+    XOR: _reduce_xor,
+    NAND: lambda *objs: ~_reduce_and(*objs),
+    NOR: lambda *objs: ~_reduce_or(*objs),
+    XNOR: lambda *objs: ~_reduce_xor(*objs)
+}
+
+class Function(object):
+    """A boolean function represented by a node of a BDD manager. Use
+    &, |, ^ and ~ to combine functions of the same manager; == is true
+    if two functions are equal, which takes constant time."""
+    __slots__ = ('manager', 'node', '__weakref__')
+
+    def __init__(self, manager, node):
+        self.manager = manager
+        self.node = node
+        if node > 1:
+            roots = manager._roots
+            roots[node] = roots.get(node, 0) + 1
+
+    def __del__(self):
+        if self.node > 1:
+            try:
+                roots = self.manager._roots
+                roots[self.node] -= 1
+                if roots[self.node] == 0:
+                    del roots[self.node]
+            except (AttributeError, KeyError, TypeError):
+                pass
+
+    def _check(self, other):
+        if not isinstance(other, Function) or other.manager is not self.manager:
+            raise BDDError('functions belong to different managers')
+
+    def __and__(self, other):
+        self._check(other)
+        m = self.manager
+        return m._wrap(m._ite(self.node, other.node, 0))
+
+    def __or__(self, other):
+        self._check(other)
+        m = self.manager
+        return m._wrap(m._ite(self.node, 1, other.node))
+
+    def __xor__(self, other):
+        self._check(other)
+        m = self.manager
+        return m._wrap(m._ite(self.node, m._not(other.node), other.node))
+
+    def __invert__(self):
+        return self.manager._wrap(self.manager._not(self.node))
+
+    def __eq__(self, other):
+        return isinstance(other, Function) and \
+            other.manager is self.manager and other.node == self.node
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.node)
+
+    def __len__(self):
+        """Return the number of nodes in the diagram, terminals
+        included"""
+        return len(self.manager._reachable([self.node]))
+
+    def is_true(self):
+        return self.node == 1
+
+    def is_false(self):
+        return self.node == 0
+
+    def ite(self, then, other):
+        """Return (self and then) or (not self and other)"""
+        self._check(then)
+        self._check(other)
+        m = self.manager
+        return m._wrap(m._ite(self.node, then.node, other.node))
+
+    def support(self):
+        """Return the names of the variables the function depends on,
+        in the current variable order"""
+        m = self.manager
+        indices = set(m._var[u] for u in m._reachable([self.node])
+                      if u > 1)
+        return [m._names[v] for v in m._order if v in indices]
+
+    def count(self, names=None):
+        """Return the number of assignments making the function true.
+        The assignments are of all variables of the manager, or of the
+        variables in names, which must include the support."""
+        m = self.manager
+        total = m._count(self.node)
+        if names is None:
+            return total
+        extra = len(m._names) - len(names)
+        if extra < 0 or total % (1 << extra):
+            raise BDDError('names must include the support')
+        return total >> extra
+
+    def pick(self):
+        """Return a dict of values of the support making the function
+        true, or None if there are none"""
+        m = self.manager
+        if self.node == 0:
+            return None
+        values = {}
+        u = self.node
+        while u > 1:
+            name = m._names[m._var[u]]
+            if m._high[u] != 0:
+                values[name] = True
+                u = m._high[u]
+            else:
+                values[name] = False
+                u = m._low[u]
+        return values
+
+    def restrict(self, **values):
+        """Return the function with some variables set to constants"""
+        m = self.manager
+        indices = {}
+        for name, value in values.items():
+            indices[m._index(name)] = bool(value)
+        return m._wrap(m._restrict(self.node, indices, {}))
+
+    def compose(self, name, function):
+        """Return the function with the variable name replaced by
+        another function"""
+        self._check(function)
+        m = self.manager
+        v = m._index(name)
+        high = m._restrict(self.node, {v: True}, {})
+        low = m._restrict(self.node, {v: False}, {})
+        return m._wrap(m._ite(function.node, high, low))
+
+    def canonical_form(self):
+        """Return the diagram as a tuple of the position of the root
+        followed by (level, low, high) triples, children before parents,
+        where low and high are positions among the triples (or -1 and -2
+        for the false and true terminals). Functions of managers with
+        the same variable order are equal exactly when their canonical
+        forms are."""
+        m = self.manager
+        positions = {0: -1, 1: -2}
+        form = []
+        for u in m._postorder(self.node):
+            if u > 1:
+                positions[u] = len(form)
+                form.append((m._levels[m._var[u]], positions[m._low[u]],
+                             positions[m._high[u]]))
+        return (positions[self.node],) + tuple(form)
+
+    def to_expression(self):
+        """Convert the function into a boolean expression, with one
+        if-then-else per node"""
+        return self.manager._to_expression(self.node)
+
+    def to_truthtable(self, names=None):
+        """Convert the function into a Truthtable of the given input
+        names (by default, the support). The table is given as an
+        irredundant cover of prime cubes, so the rows are never listed
+        one by one."""
+        import electruth.truthtable as truthtable
+        if names is None:
+            names = self.support()
+        return truthtable.Truthtable(
+            names, cubes=self.manager._cubes(self.node, names))
+
+class BDD(object):
+    """A manager of reduced ordered binary decision diagrams sharing one
+    variable order"""
+
+    # Computed table entries are forgotten when there are more of them
+    computed_limit = 1 << 20
+    # Garbage is collected when the number of nodes has grown past this
+    # (the limit is raised as the number of live nodes grows)
+    gc_threshold = 1 << 16
+    # Variables are reordered when the number of live nodes has grown
+    # past this (the limit is at least doubled every time)
+    reorder_threshold = 1 << 12
+    # Sifting a variable further in one direction stops when the number
+    # of nodes has grown by more than this factor
+    max_growth = 1.2
+    # At most this many variables are sifted, with at most this many
+    # swaps in all, every time the variables are reordered
+    max_sift_variables = 1000
+    max_swaps = 1 << 16
+    # Sifting also stops when the swaps have gone through this many
+    # times as many nodes as were live when it started, so that it takes
+    # time in proportion to the size of the diagrams
+    sift_effort = 16
+    # ... or when this many variables in a row have been sifted without
+    # making the diagrams smaller
+    max_sift_misses = 4
+
+    def __init__(self, variables=(), reordering=True):
+        self._var = [None, None]
+        self._low = [0, 1]
+        self._high = [0, 1]
+        self._free = []
+        self._unique = []
+        self._names = []
+        self._indices = {}
+        self._levels = []
+        self._order = []
+        self._computed = {}
+        self._roots = {}
+        self._size = 0
+        self._gc_limit = self.gc_threshold
+        self.reordering = reordering
+        self._reorder_limit = self.reorder_threshold
+        self._refs = None
+        self.false = Function(self, 0)
+        self.true = Function(self, 1)
+        for x in variables:
+            self.add_variable(x)
+
+    def __len__(self):
+        """Return the number of nodes in the manager, terminals not
+        included"""
+        return self._size
+
+    def add_variable(self, name):
+        """Add a variable at the bottom of the variable order, unless it
+        exists already"""
+        if name not in self._indices:
+            self._indices[name] = len(self._names)
+            self._levels.append(len(self._order))
+            self._order.append(len(self._names))
+            self._names.append(name)
+            self._unique.append({})
+        return self.variable(name)
+
+    def variable(self, name):
+        """Return the function that is true when the variable is"""
+        return self._wrap(self._mk(self._index(name), 0, 1))
+
+    def get_order(self):
+        """Return the names of the variables from top to bottom"""
+        return [self._names[v] for v in self._order]
+
+    def set_order(self, names):
+        """Move the given variables to the top of the order, in the
+        given order"""
+        indices = [self._index(x) for x in names]
+        self._start_reordering()
+        try:
+            for i in range(len(indices)):
+                self._move(indices[i], i)
+        finally:
+            self._stop_reordering()
+
+    def reorder(self):
+        """Improve the variable order by sifting: each variable in turn,
+        starting with the one with the most nodes, is moved through the
+        order and left where the number of nodes was smallest. At most
+        max_sift_variables are sifted, and sifting stops after about
+        max_swaps swaps, after going through sift_effort times as
+        many nodes as there are, or when max_sift_misses variables in
+        a row did not make the diagrams smaller."""
+        self._start_reordering()
+        try:
+            budget = [self.max_swaps, self.sift_effort * self._size]
+            misses = 0
+            for v in sorted(range(len(self._order)),
+                            key=lambda v: -len(self._unique[v]))[
+                :self.max_sift_variables]:
+                if min(budget) <= 0 or misses >= self.max_sift_misses:
+                    break
+                before = self._size
+                self._sift(v, budget)
+                misses = misses + 1 if self._size > before * 0.99 else 0
+        finally:
+            self._stop_reordering()
+
+    def _index(self, name):
+        try:
+            return self._indices[name]
+        except KeyError:
+            raise BDDError('variable {} does not exist'.format(name))
+
+    def _level(self, u):
+        v = self._var[u]
+        if v is None:
+            return _infinity
+        return self._levels[v]
+
+    def _mk(self, v, low, high):
+        if low == high:
+            return low
+        table = self._unique[v]
+        u = table.get((low, high))
+        if u is None:
+            if self._free:
+                u = self._free.pop()
+                self._var[u] = v
+                self._low[u] = low
+                self._high[u] = high
+            else:
+                u = len(self._var)
+                self._var.append(v)
+                self._low.append(low)
+                self._high.append(high)
+            table[(low, high)] = u
+            self._size += 1
+        return u
+
+    def _wrap(self, u):
+        # Every public operation ends here, with no unrooted nodes in
+        # use, so this is where the manager cleans up. Dead nodes are
+        # collected before deciding whether to reorder, as only the live
+        # ones say anything about the order.
+        f = Function(self, u)
+        if self._size > self._gc_limit:
+            self.collect_garbage()
+            if self.reordering and self._size > self._reorder_limit:
+                before = self._size
+                self.reorder()
+                # Wait longer if reordering did not help much
+                growth = 2 if self._size < before * 0.9 else 4
+                self._reorder_limit = max(self._reorder_limit * growth,
+                                          self._size * growth)
+            self._gc_limit = max(self.gc_threshold, self._size * 2)
+        return f
+
+    def _not(self, u):
+        return self._ite(u, 0, 1)
+
+    def _ite(self, f, g, h):
+        # Without recursion, as diagrams can have thousands of levels.
+        # The stack holds calls (f, g, h) still to be worked out and
+        # nodes (v, key) waiting for the results of their two calls,
+        # which are found at the end of results.
+        results = []
+        stack = [(f, g, h)]
+        computed = self._computed
+        var, levels, low, high = self._var, self._levels, self._low, self._high
+        while stack:
+            task = stack.pop()
+            if len(task) == 2:
+                v, key = task
+                r1 = results.pop()
+                r = self._mk(v, results.pop(), r1)
+                if len(computed) >= self.computed_limit:
+                    computed.clear()
+                computed[key] = r
+                results.append(r)
+                continue
+            f, g, h = task
+            if f == 1:
+                results.append(g)
+                continue
+            if f == 0 or g == h:
+                results.append(h)
+                continue
+            if g == 1 and h == 0:
+                results.append(f)
+                continue
+            r = computed.get(task)
+            if r is not None:
+                results.append(r)
+                continue
+            # f is not a terminal here, but g and h may be
+            level_f = levels[var[f]]
+            level_g = levels[var[g]] if g > 1 else _infinity
+            level_h = levels[var[h]] if h > 1 else _infinity
+            top = min(level_f, level_g, level_h)
+            if level_f == top:
+                f0, f1 = low[f], high[f]
+            else:
+                f0 = f1 = f
+            if level_g == top:
+                g0, g1 = low[g], high[g]
+            else:
+                g0 = g1 = g
+            if level_h == top:
+                h0, h1 = low[h], high[h]
+            else:
+                h0 = h1 = h
+            stack.append((self._order[top], task))
+            stack.append((f1, g1, h1))
+            stack.append((f0, g0, h0))
+        return results[0]
+
+    def _restrict(self, u, values, memo):
+        # Without recursion, like _ite. A node on the stack is still to
+        # be worked out (state 0), waits for the results of its two
+        # children (1), or takes the result of one child as its own (2).
+        results = []
+        stack = [(u, 0)]
+        while stack:
+            u, state = stack.pop()
+            if state == 1:
+                high = results.pop()
+                r = memo[u] = self._mk(self._var[u], results.pop(), high)
+                results.append(r)
+                continue
+            if state == 2:
+                memo[u] = results[-1]
+                continue
+            if u <= 1:
+                results.append(u)
+                continue
+            r = memo.get(u)
+            if r is not None:
+                results.append(r)
+                continue
+            v = self._var[u]
+            if v in values:
+                stack.append((u, 2))
+                stack.append((self._high[u] if values[v] else self._low[u],
+                              0))
+            else:
+                stack.append((u, 1))
+                stack.append((self._high[u], 0))
+                stack.append((self._low[u], 0))
+        return results[0]
+
+    def _reachable(self, nodes):
+        seen = set()
+        stack = list(nodes)
+        while stack:
+            u = stack.pop()
+            if u in seen:
+                continue
+            seen.add(u)
+            if u > 1:
+                stack.append(self._low[u])
+                stack.append(self._high[u])
+        return seen
+
+    def _postorder(self, u):
+        # Nodes below u, children before parents
+        result = []
+        seen = set()
+        stack = [(u, False)]
+        while stack:
+            x, expanded = stack.pop()
+            if expanded:
+                result.append(x)
+                continue
+            if x in seen:
+                continue
+            seen.add(x)
+            stack.append((x, True))
+            if x > 1:
+                stack.append((self._high[x], False))
+                stack.append((self._low[x], False))
+        return result
+
+    def _count(self, u):
+        # counts[x] is the number of assignments of the variables at or
+        # below the level of x making x true
+        size = len(self._order)
+        def level(x):
+            return self._levels[self._var[x]] if x > 1 else size
+        counts = {0: 0, 1: 1}
+        for x in self._postorder(u):
+            if x > 1:
+                lx = level(x)
+                low, high = self._low[x], self._high[x]
+                counts[x] = (counts[low] << (level(low) - lx - 1)) + \
+                    (counts[high] << (level(high) - lx - 1))
+        return counts[u] << level(u)
+
+    def _to_expression(self, u):
+        exprs = {0: boolexpr.BooleanConstant(False),
+                 1: boolexpr.BooleanConstant(True)}
+        for x in self._postorder(u):
+            if x <= 1:
+                continue
+            var = boolexpr.BooleanVariable(self._names[self._var[x]])
+            low, high = self._low[x], self._high[x]
+            if low == 0 and high == 1:
+                expr = var
+            elif low == 1 and high == 0:
+                expr = boolexpr.BooleanOperator(NOT, var)
+            elif low == 0:
+                expr = boolexpr.BooleanOperator(AND, var, exprs[high])
+            elif high == 0:
+                expr = boolexpr.BooleanOperator(
+                    AND, boolexpr.BooleanOperator(NOT, var), exprs[low])
+            elif high == 1:
+                expr = boolexpr.BooleanOperator(OR, var, exprs[low])
+            elif low == 1:
+                expr = boolexpr.BooleanOperator(
+                    OR, boolexpr.BooleanOperator(NOT, var), exprs[high])
+            else:
+                expr = boolexpr.BooleanOperator(
+                    OR, boolexpr.BooleanOperator(AND, var, exprs[high]),
+                    boolexpr.BooleanOperator(
+                        AND, boolexpr.BooleanOperator(NOT, var),
+                        exprs[low]))
+            exprs[x] = expr
+        return exprs[u]
+
+    def _cubes(self, u, names):
+        size = len(names)
+        bits = {}
+        for i in range(size):
+            bits[self._index(names[i])] = 1 << (size - 1 - i)
+        return self._isop(u, u, bits, {})[0]
+
+    def _isop(self, lower, upper, bits, memo):
+        # Minato-Morreale: return an irredundant sum of prime products
+        # (as cubes) of a function between lower and upper, and the node
+        # of that function. The calls are generators (see _isop_step)
+        # run from a stack instead of recursively.
+        stack = [self._isop_step(lower, upper, bits, memo)]
+        value = None
+        while stack:
+            try:
+                call = stack[-1].send(value)
+            except StopIteration as e:
+                stack.pop()
+                value = e.value
+                continue
+            stack.append(self._isop_step(call[0], call[1], bits, memo))
+            value = None
+        return value
+
+    def _isop_step(self, lower, upper, bits, memo):
+        # Yields the (lower, upper) pairs it needs the results of, and
+        # returns its own
+        if lower == 0:
+            return [], 0
+        if upper == 1:
+            return [(0, 0)], 1
+        key = (lower, upper)
+        r = memo.get(key)
+        if r is not None:
+            return r
+        top = min(self._level(lower), self._level(upper))
+        v = self._order[top]
+        try:
+            bit = bits[v]
+        except KeyError:
+            raise BDDError('variable {} is not among the names'.format(
+                    self._names[v]))
+        if self._level(lower) == top:
+            l0, l1 = self._low[lower], self._high[lower]
+        else:
+            l0 = l1 = lower
+        if self._level(upper) == top:
+            u0, u1 = self._low[upper], self._high[upper]
+        else:
+            u0 = u1 = upper
+        c0, f0 = yield self._ite(l0, self._not(u1), 0), u0
+        c1, f1 = yield self._ite(l1, self._not(u0), 0), u1
+        rest = self._ite(self._ite(l0, self._not(f0), 0), 1,
+                         self._ite(l1, self._not(f1), 0))
+        cs, fs = yield rest, self._ite(u0, u1, 0)
+        cubes = [(value, mask | bit) for value, mask in c0]
+        cubes.extend((value | bit, mask | bit) for value, mask in c1)
+        cubes.extend(cs)
+        node = self._ite(self._mk(v, f0, f1), 1, fs)
+        memo[key] = (cubes, node)
+        return cubes, node
+
+    def _start_reordering(self):
+        # While reordering, nodes are freed as soon as nothing refers to
+        # them, so the number of nodes is always exact
+        self.collect_garbage()
+        refs = [0] * len(self._var)
+        for u in self._roots:
+            refs[u] += 1
+        for table in self._unique:
+            for low, high in table:
+                refs[low] += 1
+                refs[high] += 1
+        self._refs = refs
+
+    def _stop_reordering(self):
+        self._refs = None
+        self._computed.clear()
+
+    def _mk_ref(self, v, low, high):
+        size = self._size
+        u = self._mk(v, low, high)
+        refs = self._refs
+        if u >= len(refs):
+            refs.extend([0] * (u + 1 - len(refs)))
+        if self._size > size:
+            refs[u] = 0
+            refs[low] += 1
+            refs[high] += 1
+        refs[u] += 1
+        return u
+
+    def _deref(self, u):
+        refs = self._refs
+        stack = [u]
+        while stack:
+            u = stack.pop()
+            if u <= 1:
+                continue
+            refs[u] -= 1
+            if refs[u] == 0:
+                low, high = self._low[u], self._high[u]
+                del self._unique[self._var[u]][(low, high)]
+                self._var[u] = None
+                self._free.append(u)
+                self._size -= 1
+                stack.append(low)
+                stack.append(high)
+
+    def _swap(self, level):
+        # Swap the variables at level and level + 1. Nodes of the upper
+        # variable x that depend on the lower variable y are rewritten
+        # in place into nodes of y with new children of x; all other
+        # nodes stay as they are.
+        x, y = self._order[level], self._order[level + 1]
+        var, low, high = self._var, self._low, self._high
+        upper = self._unique[x]
+        lower = self._unique[y]
+        moved = [u for (f0, f1), u in upper.items()
+                 if var[f0] == y or var[f1] == y]
+        for u in moved:
+            del upper[(low[u], high[u])]
+        self._order[level], self._order[level + 1] = y, x
+        self._levels[x], self._levels[y] = level + 1, level
+        for u in moved:
+            f0, f1 = low[u], high[u]
+            if var[f0] == y:
+                f00, f01 = low[f0], high[f0]
+            else:
+                f00 = f01 = f0
+            if var[f1] == y:
+                f10, f11 = low[f1], high[f1]
+            else:
+                f10 = f11 = f1
+            a = self._mk_ref(x, f00, f10)
+            b = self._mk_ref(x, f01, f11)
+            self._deref(f0)
+            self._deref(f1)
+            var[u] = y
+            low[u] = a
+            high[u] = b
+            lower[(a, b)] = u
+
+    def _move(self, v, target):
+        level = self._levels[v]
+        while level < target:
+            self._swap(level)
+            level += 1
+        while level > target:
+            self._swap(level - 1)
+            level -= 1
+
+    def _sift(self, v, budget):
+        # budget is a list of the swaps and of the nodes to swap left,
+        # which is lowered by those done while looking for the best
+        # level (but not by those back to it)
+        last = len(self._order) - 1
+        best_size = self._size
+        best = self._levels[v]
+        limit = best_size * self.max_growth
+        # Go to the closest end first
+        ends = (0, last) if best <= last - best else (last, 0)
+        for end in ends:
+            level = self._levels[v]
+            step = -1 if end < level else 1
+            while level != end and self._size <= limit and min(budget) > 0:
+                upper = min(level, level + step)
+                budget[0] -= 1
+                budget[1] -= len(self._unique[self._order[upper]]) + \
+                    len(self._unique[self._order[upper + 1]])
+                self._swap(upper)
+                level += step
+                if self._size < best_size:
+                    best_size, best = self._size, level
+        self._move(v, best)
+
+    def collect_garbage(self):
+        """Remove the nodes no Function can reach"""
+        live = self._reachable(self._roots)
+        for v in range(len(self._unique)):
+            table = self._unique[v]
+            for key, u in list(table.items()):
+                if u not in live:
+                    del table[key]
+                    self._var[u] = None
+                    self._free.append(u)
+                    self._size -= 1
+        self._computed.clear()
+
+    def from_expression(self, expr):
+        """Build the Function of a boolean expression. Variables not in
+        the manager are added at the bottom of the order."""
+        values = {}
+        for x in boolexpr._iter_postorder(expr):
+            if x.is_constant:
+                values[id(x)] = self.true if x.value else self.false
+            elif x.is_variable:
+                values[id(x)] = self.add_variable(x.name)
+            else:
+                values[id(x)] = _function_operator_types[x.func](
+                    *[values[id(y)] for y in x.objs])
+        return values[id(expr)]
+
+    def from_nets(self, nets):
+        """Build the Functions of nets of a NetCollection (e.g. its end
+        nets), returning a dict of net names and Functions. Every net is
+        converted only once, however many paths lead to it."""
+        import electruth.netlist as netlist
+        values = {}
+        for net in netlist.topological_order(nets):
+            gate = net.get_output()
+            if gate is None:
+                if net.constant is None:
+                    values[net] = self.add_variable(net.name)
+                else:
+                    values[net] = self.true if net.constant else self.false
+            else:
+                values[net] = _function_operator_types[gate.func](
+                    *[values[x] for x in gate.get_input_nets()])
+        return dict((x.name, values[x]) for x in nets)
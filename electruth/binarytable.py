@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+
+# electruth: a collection of boolean logic tools
+# Copyright (C) 2010, 2011  Niels Serup
+
+# This file is part of electruth.
+#
+# electruth is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# electruth is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with electruth.  If not, see <http://www.gnu.org/licenses/>.
+
+##[ Name        ]## electruth.binarytable
+##[ Maintainer  ]## Niels Serup <ns@metanohi.org>
+##[ Description ]## Reads and writes truth tables in a binary format
+
+# A binary truth table file (.ettb) starts with a header:
+#
+#   4 bytes   b'ETTB'
+#   1 byte    format version (1)
+#   3 bytes   zero
+#   4 bytes   number of inputs
+#   4 bytes   number of outputs
+#   4 bytes   size of the header, which is a multiple of 8
+#   names     the names of the inputs, then of the outputs, each as a
+#             2-byte length followed by that many bytes of UTF-8
+#
+# All numbers are little-endian. After the header follow two bitmaps
+# for each output: the rows for which it is true, and the rows for which
+# it does not matter. A bitmap has one bit per row, row r being bit
+# r % 8 of byte r // 8, so it can be read with int.from_bytes(...,
+# 'little') as a packed bitmap (see electruth.truthtable).
+
+# Files are opened with mmap, so opening one takes the same time
+# whatever its size, and single rows are read without loading anything
+# else. get_truthtable gives views of the bitmaps of an output, which
+# are only read when the Truthtable needs them. Files compressed with
+# gzip, bzip2 or xz (e.g. table.ettb.gz) are decompressed into a
+# temporary file first.
+
+# Files are written under a temporary name and renamed when complete,
+# so a failed write never leaves a partial file behind.
+
+import os
+import struct
+import mmap
+import shutil
+import tempfile
+import electruth.truthtable as truthtable
+import electruth.minimize as minimize
+
+class BinaryTableError(Exception):
+    pass
+
+_magic = b'ETTB'
+_version = 1
+_header_format = '<4sB3xIII'
+_header_size = struct.calcsize(_header_format)
+
+# Bitmaps are read this many bytes at a time when scanned
+_chunk_size = 1 << 20
+
+# More inputs than this would make every bitmap larger than 512 MiB
+size_limit = 32
+
+# mkstemp makes files only the owner can read, so written files are
+# given the usual permissions. The umask can only be read by setting it,
+# which is not safe once other threads run, so that is done once here.
+_umask = os.umask(0)
+os.umask(_umask)
+
+def _bitmap_length(size):
+    return ((1 << size) + 7) >> 3
+
+class BinaryTable(object):
+    """A binary truth table file opened for reading. Use it as a context
+    manager, or call close when done."""
+
+    def __init__(self, path):
+        self.path = path
+        if truthtable._compression(path) is None:
+            self._file = open(path, 'rb')
+        else:
+            self._file = tempfile.TemporaryFile()
+            try:
+                with truthtable._open_text(path, 'rb') as f:
+                    shutil.copyfileobj(f, self._file, _chunk_size)
+                self._file.flush()
+            except Exception:
+                self._file.close()
+                raise
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise BinaryTableError('{} is empty'.format(path))
+        try:
+            self._read_header()
+        except Exception:
+            self.close()
+            raise
+
+    def _read_header(self):
+        data = self._map
+        if len(data) < _header_size:
+            raise BinaryTableError('{} is too short'.format(self.path))
+        magic, version, inputs, outputs, offset = struct.unpack_from(
+            _header_format, data)
+        if magic != _magic:
+            raise BinaryTableError('{} is not a binary truth table'.format(
+                    self.path))
+        if version != _version:
+            raise BinaryTableError('{} has unknown version {}'.format(
+                    self.path, version))
+        names = []
+        pos = _header_size
+        for i in range(inputs + outputs):
+            length, = struct.unpack_from('<H', data, pos)
+            pos += 2
+            names.append(data[pos:pos + length].decode('utf-8'))
+            pos += length
+        self.names = names[:inputs]
+        self.outputs = names[inputs:]
+        self._length = _bitmap_length(inputs)
+        self._offset = offset
+        if len(data) < offset + 2 * outputs * self._length:
+            raise BinaryTableError('{} is truncated'.format(self.path))
+
+    def close(self):
+        try:
+            self._map.close()
+        except BufferError:
+            # Truthtables still use views of it; the map is closed
+            # when the last of them is gone
+            pass
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _start(self, output, dontcare=False):
+        try:
+            i = self.outputs.index(output)
+        except ValueError:
+            raise BinaryTableError('output {} does not exist'.format(
+                    output))
+        return self._offset + (2 * i + dontcare) * self._length
+
+    def _view(self, start):
+        with memoryview(self._map) as view:
+            return view[start:start + self._length]
+
+    def value(self, output, row):
+        """Return the value of an output in a row (given by its number):
+        True, False, or None if it does not matter"""
+        if not 0 <= row < 1 << len(self.names):
+            raise BinaryTableError('row {} does not exist'.format(row))
+        byte, bit = row >> 3, 1 << (row & 7)
+        if self._map[self._start(output, True) + byte] & bit:
+            return None
+        return bool(self._map[self._start(output) + byte] & bit)
+
+    def count(self, output, dontcare=False):
+        """Return the number of rows for which the output is true (or
+        does not matter)"""
+        start = self._start(output, dontcare)
+        end = start + self._length
+        total = 0
+        with memoryview(self._map) as view:
+            for pos in range(start, end, _chunk_size):
+                with view[pos:min(pos + _chunk_size, end)] as chunk:
+                    total += minimize.popcount(
+                        int.from_bytes(chunk, 'little'))
+        return total
+
+    def iter_minterms(self, output, dontcare=False):
+        """Yield the numbers of the rows for which the output is true (or
+        does not matter), lowest first"""
+        start = self._start(output, dontcare)
+        end = start + self._length
+        for pos in range(start, end, _chunk_size):
+            chunk = int.from_bytes(
+                self._map[pos:min(pos + _chunk_size, end)], 'little')
+            base = (pos - start) << 3
+            for i in truthtable._iter_bits(chunk):
+                yield base + i
+
+    def get_truthtable(self, output):
+        """Return a Truthtable of one output. Its bitmaps are views of
+        the file, and are only read into integers when the Truthtable
+        first needs them."""
+        return truthtable.Truthtable(
+            self.names, onset=self._view(self._start(output)),
+            dcset=self._view(self._start(output, True)))
+
+def write_binary_truthtable(path, names, tables, outputs=None):
+    """Write a binary truth table file. names are the names of the
+    inputs, and tables is an iterable of (output name, Truthtable)
+    pairs, the Truthtables having those inputs. If outputs (the names of
+    the outputs, in order) is given, every table is written as soon as
+    tables yields it, so tables can be a generator making one table at a
+    time."""
+    size = len(names)
+    if size > size_limit:
+        raise BinaryTableError('{} inputs are too many (at most {} are \
+supported)'.format(size, size_limit))
+    if outputs is None:
+        tables = list(tables)
+        outputs = [x[0] for x in tables]
+    encoded = []
+    for x in list(names) + list(outputs):
+        x = x.encode('utf-8')
+        if len(x) > 0xffff:
+            raise BinaryTableError('name is too long')
+        encoded.append(struct.pack('<H', len(x)) + x)
+    header_length = _header_size + sum(len(x) for x in encoded)
+    header_length += -header_length % 8
+    length = _bitmap_length(size)
+
+    directory, filename = os.path.split(os.path.abspath(path))
+    fd, temporary = tempfile.mkstemp(prefix='.' + filename + '.',
+                                     dir=directory)
+    try:
+        os.fchmod(fd, 0o666 & ~_umask)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(struct.pack(_header_format, _magic, _version, size,
+                                len(outputs), header_length))
+            for x in encoded:
+                f.write(x)
+            f.write(b'\0' * (header_length - f.tell()))
+            written = 0
+            for name, table in tables:
+                if written == len(outputs) or name != outputs[written]:
+                    raise BinaryTableError('output {} was not \
+expected'.format(name))
+                if list(table.names) != list(names):
+                    raise BinaryTableError('output {} does not have the \
+inputs {}'.format(name, ', '.join(names)))
+                f.write(table.onset.to_bytes(length, 'little'))
+                f.write(table.dcset.to_bytes(length, 'little'))
+                written += 1
+            if written != len(outputs):
+                raise BinaryTableError('output {} is missing'.format(
+                        outputs[written]))
+        os.replace(temporary, path)
+    except BaseException:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+        raise
+
+def convert_raw_truthtable(source, destination, delimiter='\t'):
+    """Convert a file of tab- or comma-separated values (see
+    electruth.truthtable.parse_raw_truthtable) into a binary truth table
+    file, one output at a time"""
+    with truthtable._open_text(source) as f:
+        header = [x.strip() for x in f.readline().split(delimiter)]
+    names = [x[1:] for x in header if x.startswith('<')]
+    outputs = [x[1:] for x in header if x.startswith('>')]
+    write_binary_truthtable(
+        destination, names,
+        truthtable.iter_raw_truthtable(source, delimiter), outputs)
+
+def convert_binary_truthtable(source, destination, delimiter='\t'):
+    """Convert a binary truth table file into a file of tab- or
+    comma-separated values, with a line for every row"""
+    with BinaryTable(source) as table, open(destination, 'w') as f:
+        size = len(table.names)
+        f.write(delimiter.join(['<' + x for x in table.names] +
+                               ['>' + x for x in table.outputs]) + '\n')
+        row_format = '{{:0{}b}}'.format(size) if size else ''
+        bitmaps = [(table._start(x), table._start(x, True))
+                   for x in table.outputs]
+        data = table._map
+        for row in range(1 << size):
+            byte, bit = row >> 3, 1 << (row & 7)
+            cells = list(row_format.format(row))
+            for on, dc in bitmaps:
+                if data[dc + byte] & bit:
+                    cells.append('x')
+                else:
+                    cells.append('1' if data[on + byte] & bit else '0')
+            f.write(delimiter.join(cells) + '\n')
+
+# On direct execution:
+if __name__ == '__main__':
+    # Convert between raw and binary truth tables, going by the endings
+    # of the paths
+    import sys
+    if len(sys.argv) != 3:
+        print('Usage: python3 -m electruth.binarytable SOURCE DESTINATION')
+        print('Exactly one of the paths must end with .ettb; the other \
+is read or written as comma-separated values if it ends with .csv, and \
+as tab-separated values otherwise; a source may also be compressed, as in \
+SOURCE.csv.gz.')
+        sys.exit(1)
+    source, destination = sys.argv[1:]
+    if source.endswith('.ettb') and not destination.endswith('.ettb'):
+        delimiter = ',' if destination.endswith('.csv') else '\t'
+        convert_binary_truthtable(source, destination, delimiter)
+    elif destination.endswith('.ettb') and not source.endswith('.ettb'):
+        # Compressed sources are named like table.csv.gz
+        name = source
+        for ending in ('.gz', '.bz2', '.xz'):
+            if name.endswith(ending):
+                name = name[:-len(ending)]
+        delimiter = ',' if name.endswith('.csv') else '\t'
+        convert_raw_truthtable(source, destination, delimiter)
+    else:
+        print('Exactly one of the paths must end with .ettb.')
+        sys.exit(1)
@@ -23,15 +23,15 @@
 ##[ Description ]## This is the core of electruth: the implementation
                   # of boolean logic
 
+import itertools
+import collections.abc
+import operator
+import weakref
+import re
+
 # Operator names
 _operator_names = ('not', 'and', 'or', 'xor', 'nand', 'nor', 'xnor')
 
-_inverted_operator_names = {
-    'and': 'nand',
-    'or':  'nor',
-    'xor': 'xnor'
-}
-
 # Operator types
 def NOT(obj):
     return not obj
@@ -60,6 +60,37 @@ def NOR(*objs):
 def XNOR(*objs):
     return not XOR(*objs)
 
+# Bitwise operator types: the same operators, but working on integers
+# where every bit is a separate row. mask has a bit set for every row
+# in use.
+def _bits_not(mask, obj):
+    return mask ^ obj
+
+def _bits_and(mask, *objs):
+    # Not &=, which would change NumPy arrays in place
+    r = objs[0]
+    for x in objs[1:]:
+        r = r & x
+    return r
+
+def _bits_or(mask, *objs):
+    r = objs[0]
+    for x in objs[1:]:
+        r = r | x
+    return r
+
+def _bits_xor(mask, obj1, obj2):
+    return obj1 ^ obj2
+
+def _bits_nand(mask, *objs):
+    return mask ^ _bits_and(mask, *objs)
+
+def _bits_nor(mask, *objs):
+    return mask ^ _bits_or(mask, *objs)
+
+def _bits_xnor(mask, *objs):
+    return mask ^ _bits_xor(mask, *objs)
+
 
 def _both_as_keys(*lsts):
     dicts = []
@@ -98,138 +129,534 @@ _operator_types = (NOT, AND, OR, XOR, NAND,
 _translated_operator_types, _translated_operator_names = \
     _both_as_keys(_operator_names, _operator_types)
 
-_raw_aliases = {
-    '(': ' ( ',
-    ')': ' ) ',
-    '!': ' not ',
-    '*': ' and ',
-    '.': ' and ',
-    '·': ' and ',
-    '+': ' or ',
-    '&': ' and ',
-    '|': ' or ',
-    '&&': ' and ',
-    '||': ' or ',
-    '^': ' xor ',
-    'nand': 'not and',
-    'nor': 'not or',
-    'xnor': 'not xor',
-    '⊕': 'xor',
-    '∨': ' or ',
-    '∧': ' and ',
-    '¬': ' not '
+_bitwise_operator_types = {
+    NOT: _bits_not,
+    AND: _bits_and,
+    OR: _bits_or,
+    XOR: _bits_xor,
+    NAND: _bits_nand,
+    NOR: _bits_nor,
+    XNOR: _bits_xnor
+}
+
+# Symbols that can be used instead of operator names in raw
+# expressions
+_raw_symbols = {
+    '!': 'not',
+    '¬': 'not',
+    '*': 'and',
+    '.': 'and',
+    '·': 'and',
+    '&': 'and',
+    '&&': 'and',
+    '∧': 'and',
+    '+': 'or',
+    '|': 'or',
+    '||': 'or',
+    '∨': 'or',
+    '^': 'xor',
+    '⊕': 'xor'
+}
+
+# A token is a parenthesis, an operator symbol, or a name (anything
+# else not containing whitespace)
+_raw_token = re.compile(r'&&|\|\||[()!¬*.·&∧+|∨^⊕]|[^\s()!¬*.·&∧+|∨^⊕]+')
+
+# How tightly the binary operators bind; NOT binds tighter than all
+_raw_precedences = {
+    'and': 3,
+    'nand': 3,
+    'xor': 2,
+    'xnor': 2,
+    'or': 1,
+    'nor': 1
+}
+
+_raw_constants = {
+    '0': False,
+    '1': True
+}
+
+# How compiled expressions write each operator: the symbol joining
+# the objects, and whether the result is inverted
+_compiled_operators = {
+    NOT: ('', True),
+    AND: (' & ', False),
+    OR: (' | ', False),
+    XOR: (' ^ ', False),
+    NAND: (' & ', True),
+    NOR: (' | ', True),
+    XNOR: (' ^ ', True)
 }
 
 class BooleanExpressionError(Exception):
     pass
 
-
-def _recursive_show_loop(op):
-    text = '{}('.format(op.get_name())
-    t_objs = []
-    for x in op.objs:
-        if x.is_operator:
-            t_objs.append(_recursive_show_loop(x))
+# Expressions with up to this many variables in total are compared by
+# evaluating both of them for all rows at once; wider ones by solving
+# their miter (see electruth.sat).
+signature_size_limit = 16
+
+_equivalence_methods = ('auto', 'table', 'bdd', 'sat')
+
+
+def _iter_tokens(op, leaf, operator):
+    # Yield the text of an expression piece by piece, left to right.
+    # leaf(x) is the text of a variable or constant, and operator(x) the
+    # (start, separator, end) of an operator. Uses a stack instead of
+    # recursion, and the pieces are joined once, so the time taken is
+    # linear in the length of the text however deep the expression is.
+    stack = [op]
+    while stack:
+        x = stack.pop()
+        if isinstance(x, str):
+            yield x
+        elif not x.is_operator:
+            yield leaf(x)
         else:
-            t = x.name
-            t_objs.append(t)
-    text += ', '.join(t_objs)
-    text += ')'
-    return text
-
-def _match_two(a, b):
-    if a == b or (a.is_variable and b.is_variable and a.name == b.name):
-        return True
-    elif a.is_operator and b.is_operator and a.func == b.func and \
-            len(a.objs) == len(b.objs):
-        used = []
-        for i in range(len(a.objs)):
-            ok = False
-            for j in range(len(a.objs)):
-                if j not in used and _match_two(a.objs[i], b.objs[j]):
-                    used.append(j)
-                    ok = True
-                    break
-            if not ok:
-                return False
-        return True
-    else:
-        return False
-
-def _recursive_express_loop(op, and_symbol, or_symbol, not_symbol, xor_symbol):
-    if not op.is_operator:
-        return op.name
-    
-    if op.func == NOT:
-        rec = _recursive_express_loop(
-            op.objs[0], and_symbol, or_symbol, not_symbol, xor_symbol)
-        return (not_symbol or '!{}').format(rec)
-    text = '('
-    t_objs = []
-    for x in op.objs:
-        t_objs.append(_recursive_express_loop(
-            x, and_symbol, or_symbol,
-            not_symbol, xor_symbol))
-    opname = op.func == AND and and_symbol or op.func == OR and \
-        or_symbol or op.func == XOR and xor_symbol or \
-        op.get_name().upper()
-    text += (' {} '.format(opname)).join(t_objs)
-    text += ')'
-    return text
-
-def _recursive_test_loop(op, **keyvals):
-    objs = []
-    for x in op.objs:
+            start, separator, end = operator(x)
+            yield start
+            stack.append(end)
+            objs = x.objs
+            for i in range(len(objs) - 1, 0, -1):
+                stack.append(objs[i])
+                stack.append(separator)
+            if objs:
+                stack.append(objs[0])
+
+def _show(op):
+    return ''.join(_iter_tokens(
+            op, operator.attrgetter('name'),
+            lambda x: (x.get_name() + '(', ', ', ')')))
+
+def _express(op, and_symbol, or_symbol, not_symbol, xor_symbol):
+    # not_symbol is a format string with the negated text at {}
+    not_start, not_end = (not_symbol or '!{}').format('\0').split('\0')
+    def write_operator(x):
+        if x.func == NOT:
+            return not_start, '', not_end
+        opname = x.func == AND and and_symbol or x.func == OR and \
+            or_symbol or x.func == XOR and xor_symbol or \
+            x.get_name().upper()
+        return '(', ' {} '.format(opname), ')'
+    return ''.join(_iter_tokens(op, operator.attrgetter('name'),
+                                write_operator))
+
+def _test(x, objs, keyvals):
+    if x.is_operator:
+        return x.func(*objs)
+    elif x.is_constant:
+        return x.value
+    return keyvals[x.name]
+
+def _iter_postorder(op):
+    """Yield every distinct object in op once, children before parents"""
+    seen = set()
+    stack = [(op, False)]
+    while stack:
+        x, expanded = stack.pop()
+        if expanded:
+            yield x
+            continue
+        if id(x) in seen:
+            continue
+        seen.add(id(x))
+        stack.append((x, True))
         if x.is_operator:
-            objs.append(_recursive_test_loop(x, **keyvals))
+            for y in reversed(x.objs):
+                if id(y) not in seen:
+                    stack.append((y, False))
+
+def _bitwise_test_loop(op, mask, columns):
+    # Every operator is evaluated once for all rows at the same
+    # time. Values are forgotten as soon as their last user has been
+    # evaluated.
+    nodes = list(_iter_postorder(op))
+    users = {}
+    for x in nodes:
+        if x.is_operator:
+            for y in x.objs:
+                users[id(y)] = users.get(id(y), 0) + 1
+    values = {}
+    for x in nodes:
+        if x.is_constant:
+            values[id(x)] = mask if x.value else mask ^ mask
+            continue
+        elif not x.is_operator:
+            try:
+                values[id(x)] = columns[x.get_name()]
+            except KeyError:
+                raise BooleanExpressionError(
+                    'no values given for variable {}'.format(x.get_name()))
+            continue
+        objs = []
+        for y in x.objs:
+            objs.append(values[id(y)])
+            users[id(y)] -= 1
+            if users[id(y)] == 0:
+                del values[id(y)]
+        values[id(x)] = _bitwise_operator_types[x.func](mask, *objs)
+    return values[id(op)]
+
+def _evaluate_batch(op, columns, packed, count):
+    names = op.get_variables()
+    for name in names:
+        if name not in columns:
+            raise BooleanExpressionError(
+                'no values given for variable {}'.format(name))
+    if not packed and all(isinstance(x, int) for x in columns.values()):
+        if count is None:
+            raise BooleanExpressionError(
+                'the number of vectors must be given for integer columns')
+        return _bitwise_test_loop(op, (1 << count) - 1, columns)
+
+    try:
+        import numpy
+    except ImportError:
+        raise BooleanExpressionError('NumPy is needed to evaluate arrays')
+    arrays = {}
+    for name in names:
+        x = numpy.asarray(columns[name])
+        if packed:
+            if x.dtype != numpy.uint8:
+                raise BooleanExpressionError(
+                    'packed values of {} are not uint8'.format(name))
+        elif x.dtype != numpy.bool_:
+            x = x != 0
+        arrays[name] = x
+    shapes = set(numpy.shape(x) for x in columns.values())
+    if len(shapes) > 1:
+        raise BooleanExpressionError('arrays differ in shape')
+    if shapes:
+        shape = shapes.pop()
+    elif count is not None:
+        shape = ((count + 7) >> 3,) if packed else (count,)
+    else:
+        raise BooleanExpressionError(
+            'the number of vectors must be given without variables')
+    if packed:
+        mask = numpy.full(shape, 0xff, numpy.uint8)
+    else:
+        mask = numpy.ones(shape, numpy.bool_)
+    result = _bitwise_test_loop(op, mask, arrays)
+    if packed and count is not None and count & 7 and result.size:
+        # Clear the bits after the last vector
+        result = result.copy()
+        result[..., -1] &= (0xff << (8 - (count & 7))) & 0xff
+    return result
+
+def _compile_expression(op, bitmask=False):
+    # Generate a function with one line per distinct operator, each
+    # storing its result in a local variable
+    names = op.get_variables()
+    size = len(names)
+    positions = dict((names[i], i) for i in range(size))
+    lines = []
+    if bitmask:
+        args = 'm'
+        for i in range(size):
+            lines.append('v{} = m >> {} & 1'.format(i, size - 1 - i))
+        invert = '1 ^ ({})'
+        constants = ('0', '1')
+    else:
+        args = ', '.join('v{}'.format(i) for i in range(size))
+        invert = 'not ({})'
+        constants = ('False', 'True')
+    refs = {}
+    for x in _iter_postorder(op):
+        if x.is_constant:
+            refs[id(x)] = constants[x.value]
+        elif not x.is_operator:
+            refs[id(x)] = 'v{}'.format(positions[x.get_name()])
         else:
-            objs.append(keyvals[x.get_name()])
-    return op.func(*objs)
-
-class BooleanBaseObject:
+            symbol, inverted = _compiled_operators[x.func]
+            code = symbol.join(refs[id(y)] for y in x.objs)
+            if inverted:
+                code = invert.format(code)
+            refs[id(x)] = 't{}'.format(len(lines))
+            lines.append('{} = {}'.format(refs[id(x)], code))
+    result = refs[id(op)]
+    if bitmask:
+        result = 'bool({})'.format(result)
+    lines.append('return {}'.format(result))
+    source = 'def compiled({}):\n    {}\n'.format(args, '\n    '.join(lines))
+    namespace = {}
+    exec(compile(source, '<electruth expression>', 'exec'), namespace)
+    func = namespace['compiled']
+    func.variables = names
+    return func
+
+def _equivalent(a, b, method=None):
+    if method is None:
+        method = 'auto'
+    if method not in _equivalence_methods:
+        raise BooleanExpressionError(
+            'equivalence method {} does not exist'.format(method))
+    if a is b:
+        return True
+    names = a.get_variables()
+    names.extend(x for x in b.get_variables() if x not in names)
+    if method == 'auto':
+        method = 'table' if len(names) <= signature_size_limit else 'sat'
+    if method == 'sat':
+        import electruth.sat as sat
+        return sat.equivalent(a, b)
+    if method == 'bdd':
+        # Equal functions are the same node of a decision diagram
+        import electruth.bdd as bdd
+        manager = bdd.BDD(names)
+        return manager.from_expression(a) == manager.from_expression(b)
+    import electruth.truthtable as truthtable
+    mask = (1 << (1 << len(names))) - 1
+    columns = dict(zip(names, truthtable.variable_columns(len(names))))
+    return a.test_bits(mask, **columns) == b.test_bits(mask, **columns)
+
+def _get_operator_type(kind):
+    if isinstance(kind, str):
+        try:
+            return _translated_operator_types[kind]
+        except KeyError:
+            raise BooleanExpressionError(
+                'operator {} does not exist'.format(kind))
+    elif kind not in _operator_types:
+        raise BooleanExpressionError(
+            'operator {} does not exist'.format(kind))
+    return kind
+
+# Every distinct variable, constant and operator exists only once: the
+# constructors look objects up in these tables before creating new
+# ones. Equal expressions are therefore the same object, and identical
+# subexpressions are shared instead of copied.
+_variables = weakref.WeakValueDictionary()
+_constants = {}
+_operators = weakref.WeakValueDictionary()
+_operator_numbers = itertools.count()
+
+# The objects of these operators can be given in any order, so they
+# are sorted to make e.g. 'A and B' and 'B and A' the same object
+_commutative_operator_types = (AND, OR, XOR, NAND, NOR, XNOR)
+
+_order_key = operator.attrgetter('_key')
+
+class BooleanBaseObject(object):
+    __slots__ = ('_hash', '_key', '_cache', '__weakref__')
     is_operator=False
     is_variable=False
+    is_constant=False
+
+    def __hash__(self):
+        return self._hash
 
     def get_name(self):
         return self.name
 
+    def get_cache(self):
+        """Return a dict for storing information about this object.
+        Objects never change once created, so anything computed from
+        one can be kept here."""
+        if self._cache is None:
+            self._cache = {}
+        return self._cache
+
+    def iter_postorder(self):
+        """Yield every distinct object in the expression once, the
+        objects of an operator before the operator itself. Shared
+        subexpressions are only yielded the first time."""
+        return _iter_postorder(self)
+
+    def visit(self, func):
+        """Call func(x, results) for every distinct object x in the
+        expression, children first, where results is a list of what
+        func returned for the objects of x (empty for variables and
+        constants). Returns what func returned for this object."""
+        results = {}
+        for x in _iter_postorder(self):
+            if x.is_operator:
+                results[id(x)] = func(x, [results[id(y)] for y in x.objs])
+            else:
+                results[id(x)] = func(x, [])
+        return results[id(self)]
+
+    def transform(self, func):
+        """Return a new expression in which every object x has been
+        replaced by func(x), children first: func is given x with its
+        objects already replaced, and returns x or another object"""
+        def rebuild(x, objs):
+            if x.is_operator and any(objs[i] is not x.objs[i]
+                                     for i in range(len(objs))):
+                x = BooleanOperator(x.func, *objs)
+            return func(x)
+        return self.visit(rebuild)
+
+    def get_variables(self):
+        """Return the names of the variables, in order of first
+        appearance"""
+        return _get_all_variables(self)
+
+    def test_bits(self, mask, **columns):
+        """Test many rows at once. Every value is an integer in which
+        each bit is a separate row, and mask has a bit set for every
+        row in use. Returns an integer of the rows that are true."""
+        return _bitwise_test_loop(self, mask, columns)
+
+    def evaluate_batch(self, columns, packed=False, count=None):
+        """Evaluate the expression for many vectors of values at once,
+        with one operation on whole columns per operator. columns maps
+        every variable name to the values of that variable, either as
+        NumPy arrays of bools (or numbers, 0 being false), the result
+        being such an array, or as integers in which bit i is the value
+        in vector i, like test_bits. For integers, count must be the
+        number of vectors.
+
+        If packed is true, the arrays are instead uint8 arrays of bits
+        packed with numpy.packbits, and so is the result; give count to
+        clear the unused bits at the end.
+
+        columns may also be an iterable of such mappings (chunks of the
+        vectors), in which case a generator of results is returned, so
+        that only one chunk needs to be in memory at a time."""
+        if isinstance(columns, collections.abc.Mapping):
+            return _evaluate_batch(self, columns, packed, count)
+        return (_evaluate_batch(self, x, packed, count) for x in columns)
+
+    def create_bdd(self, manager=None):
+        """Return the binary decision diagram of the expression, as a
+        Function of manager (a new electruth.bdd.BDD by default)"""
+        import electruth.bdd as bdd
+        if manager is None:
+            manager = bdd.BDD(self.get_variables())
+        return manager.from_expression(self)
+
+    def match(self, other):
+        """Check if two expressions are written the same way, not
+        counting the order of objects in commutative operators"""
+        return self is other
+
+    def equivalent(self, other, method=None):
+        """Check if two expressions are true for exactly the same
+        values of their variables, however they are written. method is
+        'table' (evaluate both for every row), 'bdd' (compare decision
+        diagrams), 'sat' (check that their exclusive or can never be
+        true) or 'auto' (the default: 'table' for few variables, else
+        'sat')."""
+        return _equivalent(self, other, method)
+
+    def is_satisfiable(self):
+        """Check if the expression is true for some values of its
+        variables"""
+        import electruth.sat as sat
+        return sat.is_satisfiable(self)
+
+    def find_model(self):
+        """Return a dict of variable names and values making the
+        expression true, or None if there are none"""
+        import electruth.sat as sat
+        return sat.find_model(self)
+
     def express(self, typ=None):
         return str(self)
 
-    def simplify(self):
+    def simplify(self, method=None, time_limit=None):
+        return self
+
+    def ungroup(self):
         return self
 
 class BooleanVariable(BooleanBaseObject):
+    __slots__ = ('name',)
     is_variable=True
 
-    def __init__(self, name):
-        self.name = name
+    def __new__(cls, name):
+        obj = _variables.get(name)
+        if obj is None:
+            obj = object.__new__(cls)
+            obj.name = name
+            obj._hash = hash(name)
+            obj._key = (0, name)
+            obj._cache = None
+            _variables[name] = obj
+        return obj
+
+    def __reduce__(self):
+        return (BooleanVariable, (self.name,))
 
     def __str__(self):
         return self.name
 
-class BooleanOperator(BooleanBaseObject):
-    is_operator=True
+class BooleanConstant(BooleanBaseObject):
+    """Always true or always false"""
+    __slots__ = ('value', 'name')
+    is_constant=True
+
+    def __new__(cls, value):
+        value = bool(value)
+        obj = _constants.get(value)
+        if obj is None:
+            obj = object.__new__(cls)
+            obj.value = value
+            obj.name = value and '1' or '0'
+            obj._hash = hash(value)
+            obj._key = (-1, value)
+            obj._cache = None
+            _constants[value] = obj
+        return obj
+
+    def __reduce__(self):
+        return (BooleanConstant, (self.value,))
 
-    def __init__(self, kind, *objs):
-        self.set_kind(kind)
-        self.objs = objs
+    def __str__(self):
+        return self.name
 
-    def set_kind(self, kind):
-        if isinstance(kind, str):
-            try:
-                self.func = _translated_operator_types[kind]
-            except KeyError:
-                raise BooleanExpressionError(
-                    'operator {} does not exist'.format(kind))
+    def test(self, **keyvals):
+        return self.value
+
+def _rebuild_operator(nodes):
+    # Undo BooleanOperator.__reduce__
+    built = []
+    for x in nodes:
+        if isinstance(x, tuple):
+            built.append(BooleanOperator(x[0], *[built[i] for i in x[1:]]))
         else:
-            self.func = kind
+            built.append(x)
+    return built[-1]
 
-    def get_variables(self):
-        return _get_all_variables(self)
+class BooleanOperator(BooleanBaseObject):
+    __slots__ = ('func', 'objs')
+    is_operator=True
+
+    def __new__(cls, kind, *objs):
+        func = _get_operator_type(kind)
+        if func in _commutative_operator_types:
+            objs = tuple(sorted(objs, key=_order_key))
+        key = (func, objs)
+        obj = _operators.get(key)
+        if obj is None:
+            obj = object.__new__(cls)
+            obj.func = func
+            obj.objs = objs
+            obj._hash = hash((_translated_operator_names[func],
+                              tuple(x._hash for x in objs)))
+            obj._key = (1, next(_operator_numbers))
+            obj._cache = None
+            _operators[key] = obj
+        return obj
+
+    def __reduce__(self):
+        # A flat list of the objects, children first, so that deep
+        # expressions are pickled without recursion
+        positions = {}
+        nodes = []
+        for x in _iter_postorder(self):
+            positions[id(x)] = len(nodes)
+            if x.is_operator:
+                nodes.append((x.get_name(),) +
+                             tuple(positions[id(y)] for y in x.objs))
+            else:
+                nodes.append(x)
+        return (_rebuild_operator, (nodes,))
 
     def is_multi_operator(self):
-        return _operator_arg_limits[obj.get_name()] == _infty
+        return _operator_arg_limits[self.get_name()] == _infty
 
     def get_name(self):
         return _translated_operator_names[self.func]
@@ -239,18 +666,32 @@ class BooleanOperator(BooleanBaseObject):
         return truthtable.create_from_expression(self)
 
     def test(self, **keyvals):
-        return _recursive_test_loop(self, **keyvals)
+        return self.visit(lambda x, objs: _test(x, objs, keyvals))
+
+    def compile(self, bitmask=False):
+        """Return a function giving the same results as test, but much
+        faster. It takes the values of the variables as positional
+        arguments, in the order given by get_variables() (also available
+        as the variables attribute of the function). If bitmask is true,
+        it instead takes a single integer with the first variable as the
+        most significant bit, like the row numbers of a truth table.
+        Functions are cached, so compiling again is cheap."""
+        cache = self.get_cache()
+        try:
+            return cache['compiled', bitmask]
+        except KeyError:
+            func = _compile_expression(self, bitmask)
+            cache['compiled', bitmask] = func
+            return func
 
     def ungroup(self):
         return _ungroup_expression(self)
 
-    def simplify(self):
-        """Simplifies the expression. Will sometimes shorten it as well"""
-        return self.create_truthtable().shorten()
+    def simplify(self, method=None, time_limit=None):
+        """Simplifies the expression. Will sometimes shorten it as well.
+        See Truthtable.shorten for method and time_limit."""
+        return self.create_truthtable().shorten(method, time_limit)
 
-    def match(self, other):
-        return _match_two(self, other)
-    
     def express(self, typ='basic'):
         """Return a string formatted in a human-friendly way"""
         if typ == 'internal':
@@ -276,122 +717,156 @@ class BooleanOperator(BooleanBaseObject):
                 _or = None
                 _not = None
                 _xor = None
-            return _recursive_express_loop(
-                self, _and, _or, _not, _xor)
+            return _express(self, _and, _or, _not, _xor)
 
     def __str__(self):
-        return _recursive_show_loop(self)
-
-def parse_raw_expression(expr, always_return_op=False, simplify=False):
-    """Convert a raw expression into an internal format."""
-    for orig, new in _raw_aliases.items():
-        expr = expr.replace(orig, new)
-    expr = expr.split()
-    complete = _parse_raw_part(expr)
+        return _show(self)
+
+def parse_raw_expression(expr, always_return_op=False, simplify=False,
+                         method=None, time_limit=None):
+    """Convert a raw expression into an internal format. expr is a
+    string, or an iterable of strings (e.g. a file) which together form
+    the expression. NOT binds tighter than AND and NAND, which bind
+    tighter than XOR and XNOR, which bind tighter than OR and NOR. 0 and
+    1 are constants."""
+    if isinstance(expr, str):
+        expr = (expr,)
+    complete = _parse_raw_tokens(_iter_raw_tokens(expr))
     if always_return_op and not complete.is_operator:
         complete = BooleanOperator(OR, complete)
     if simplify:
-        complete = complete.simplify()
+        complete = complete.simplify(method, time_limit)
     return complete
 
 def _get_all_variables(op):
-    vs = []
-    for x in op.objs:
-        if x.is_variable:
-            vs.append(x.get_name())
-        else:
-            vs.extend(_get_all_variables(x))
-    return list(set(vs))
-    
+    # In order of first appearance, so that the order is the same every
+    # time (variable orders of BDDs and columns of truth tables depend
+    # on it)
+    return [x.name for x in _iter_postorder(op) if x.is_variable]
+
 def _ungroup_expression(expr):
     # Ungroup objects in operators with only one object (not counting
     # NOT operators)
-    objs = []
-    if expr.is_operator:
-        for x in expr.objs:
-            if x.is_operator:
-                if len(x.objs) == 1 and \
-                        _operator_arg_limits[x.get_name()] == _infty:
-                    objs.append(x.objs[0])
-                else:
-                    objs.append(_ungroup_expression(x))
+    if not expr.is_operator:
+        return expr
+    def ungroup(x):
+        if not x.is_operator:
+            return x
+        objs = []
+        changed = False
+        for y in x.objs:
+            if y.is_operator and len(y.objs) == 1 and \
+                    _operator_arg_limits[y.get_name()] == _infty:
+                objs.append(y.objs[0])
+                changed = True
             else:
-                objs.append(x)
-    expr.objs = objs
-    return expr
-    
-def _parse_raw_part(expr, obj_history={}):
-    levels = 0
-    objs = []
-    op = None
-    invert_next = False
-    invert_operator = False
-
-    for i in range(len(expr)):
-        x = expr[i]
-        x_lowered = x.lower()
-        if x == '(':
-            if levels == 0:
-                group_start = i + 1
-            levels += 1
-        elif x == ')':
-            levels -= 1
-            if levels == 0:
-                o = _parse_raw_part(expr[group_start:i], obj_history)
-                if invert_next:
-                    o = BooleanOperator(NOT, o)
-                    invert_next = False
-                objs.append(o)
-        elif levels == 0:
-            if x_lowered == 'not':
-                invert_next = not invert_next
-            elif x_lowered in _operator_names:
-                if x != op or len(objs) == _operator_arg_limits[op]:
-                    if op is not None:
-                        if len(objs) == 1:
-                            if invert_operator:
-                                objs[0] = BooleanOperator(NOT, objs[0])
-                        else:
-                            if invert_operator:
-                                op = _inverted_operator_names[op]
-                                invert_operator = False
-                            objs = [BooleanOperator(op, *objs)]
-                    op = x
-                    if invert_next:
-                        invert_operator = True
-                        invert_next = False
+                objs.append(y)
+        if not changed:
+            return x
+        return BooleanOperator(x.func, *objs)
+    return expr.transform(ungroup)
+
+def _iter_raw_tokens(chunks):
+    # A token at the end of a chunk may go on in the next one, so it is
+    # kept until then
+    rest = ''
+    for chunk in chunks:
+        text = rest + chunk
+        rest = ''
+        for match in _raw_token.finditer(text):
+            if match.end() == len(text):
+                rest = match.group()
             else:
-                if x in obj_history.keys():
-                    obj = obj_history[x]
-                    if op is not None and obj in objs and \
-                            _operator_arg_limits[op] == _infty:
-                        # Expressions like 'A and A' might as well be
-                        # shortened to 'A' at once, but expressions
-                        # requiring a specific number of arguments,
-                        # such as 'A xor A', should not be altered at
-                        # this point, as these different expressions
-                        # require separate actions.
-                        continue
-                else:
-                    obj = BooleanVariable(x)
-                    obj_history[x] = obj
-                if invert_next:
-                    obj = BooleanOperator(NOT, obj)
-                objs.append(obj)
-                if invert_next:
-                    invert_next = False
-
-    if op is None:
-        if len(objs) > 1:
-            raise BooleanExpressionError('expression lacks an operator')
-        return objs[0]
-    else:
+                yield match.group()
+    if rest:
+        yield rest
+
+def _end_raw_chain(name, objs):
+    if _operator_arg_limits[name] == _infty:
+        # Expressions like 'A and A' might as well be shortened to 'A'
+        # at once
+        seen = set()
+        unique = []
+        for x in objs:
+            if id(x) not in seen:
+                seen.add(id(x))
+                unique.append(x)
+        objs = unique
         if len(objs) == 1:
-            if invert_operator:
-                objs[0] = BooleanOperator(NOT, objs[0])
+            if name in ('nand', 'nor'):
+                return BooleanOperator(NOT, objs[0])
             return objs[0]
+    return BooleanOperator(name, *objs)
+
+def _parse_raw_tokens(tokens):
+    # Operator precedence parsing with explicit stacks, so that deep
+    # nesting does not recurse. stack holds '(' and 'not' tokens and
+    # [precedence, operator name, objects] chains waiting for their
+    # last object. Chains of the same multi-object operator, such as
+    # 'A or B or C', become one operator with all the objects.
+    stack = []
+    current = None # The object just parsed, if any
+
+    def end_chains(precedence, name=None):
+        nonlocal current
+        while stack and not isinstance(stack[-1], str):
+            chain = stack[-1]
+            if chain[0] < precedence or chain[0] == precedence and \
+                    chain[1] == name and \
+                    _operator_arg_limits[name] == _infty:
+                break
+            stack.pop()
+            chain[2].append(current)
+            current = _end_raw_chain(chain[1], chain[2])
+
+    def end_nots():
+        nonlocal current
+        while stack and stack[-1] == 'not':
+            stack.pop()
+            current = BooleanOperator(NOT, current)
+
+    for token in tokens:
+        name = _raw_symbols.get(token, token.lower())
+        if current is None:
+            if name == 'not' and stack and stack[-1] == 'not':
+                # Two NOTs in a row cancel out
+                stack.pop()
+            elif name == 'not' or name == '(':
+                stack.append(name)
+            elif name == ')':
+                raise BooleanExpressionError('expected an object before )')
+            elif name in _operator_names:
+                raise BooleanExpressionError(
+                    'expected an object before {}'.format(token))
+            else:
+                if token in _raw_constants:
+                    current = BooleanConstant(_raw_constants[token])
+                else:
+                    current = BooleanVariable(token)
+                end_nots()
+        elif name == ')':
+            end_chains(0)
+            if not stack:
+                raise BooleanExpressionError('unmatched )')
+            stack.pop()
+            end_nots()
+        elif name in _raw_precedences:
+            precedence = _raw_precedences[name]
+            end_chains(precedence, name)
+            if stack and not isinstance(stack[-1], str) and \
+                    stack[-1][1] == name:
+                stack[-1][2].append(current)
+            else:
+                stack.append([precedence, name, [current]])
+            current = None
         else:
-            if invert_operator:
-                op = _inverted_operator_names[op]
-            return BooleanOperator(op, *objs)
+            raise BooleanExpressionError('expression lacks an operator')
 
+    if current is None:
+        if stack:
+            raise BooleanExpressionError('expression ends too early')
+        raise BooleanExpressionError('expression is empty')
+    end_chains(0)
+    if stack:
+        raise BooleanExpressionError('unmatched (')
+    return current
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+
+# electruth: a collection of boolean logic tools
+# Copyright (C) 2010, 2011  Niels Serup
+
+# This file is part of electruth.
+#
+# electruth is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# electruth is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with electruth.  If not, see <http://www.gnu.org/licenses/>.
+
+##[ Name        ]## electruth.cache
+##[ Maintainer  ]## Niels Serup <ns@metanohi.org>
+##[ Description ]## Remembers minimized functions between runs
+
+# Minimized functions are stored in an SQLite database, keyed by a
+# SHA-256 hash of the function and the minimizer settings. The function
+# is hashed by position, not by the names of its inputs, so the same
+# logic under other names is found as well. Tables with few inputs are
+# hashed as packed truth tables; wider ones as the canonical form of
+# their binary decision diagrams. The stored value is the cover (a list
+# of cubes, see electruth.minimize), from which the expression is
+# rebuilt with the names of the table being shortened.
+
+# When the stored values take up more than max_size bytes, the least
+# recently used ones are removed.
+
+# The results of electruth.incremental.Analysis are stored as well, by
+# the path of the netlist, so that a later run only simplifies the end
+# nets whose logic has changed since.
+
+# Worker processes (see electruth.parallel) only read the cache, each
+# through a read-only connection of its own; the calling process counts
+# the hits and stores the new covers.
+
+import os
+import pathlib
+import sqlite3
+import hashlib
+import json
+import time
+import electruth.truthtable as truthtable
+
+class CacheError(Exception):
+    pass
+
+# Part of every key, so that keys change if the way they are made does
+_key_version = 1
+
+_current = None
+
+# Read-only connections of this process, by path
+_readers = {}
+
+def set_cache(cache):
+    """Make Truthtable.shorten and BooleanOperator.simplify use a Cache
+    (or no cache, if cache is None)"""
+    global _current
+    _current = cache
+
+def get_cache():
+    """Return the Cache in use, or None"""
+    return _current
+
+def _bdd_form(size, cubes):
+    import electruth.bdd as bdd
+    manager = bdd.BDD(range(size), reordering=False)
+    variables = [manager.variable(i) for i in range(size)]
+    f = manager.false
+    for value, mask in cubes:
+        term = manager.true
+        for i in range(size):
+            bit = 1 << (size - 1 - i)
+            if mask & bit:
+                term &= variables[i] if value & bit else ~variables[i]
+        f |= term
+    return f.canonical_form()
+
+def function_key(table, method=None, time_limit=None):
+    """Return the key of a Truthtable minimized with the given
+    settings (see Truthtable.shorten)"""
+    size = len(table.names)
+    method = truthtable._get_minimization_method(method, size)
+    if method != 'espresso':
+        time_limit = None
+    h = hashlib.sha256()
+    h.update(repr((_key_version, size, method, time_limit)).encode('ascii'))
+    if table._onset is not None or size <= truthtable.bitmap_size_limit:
+        length = ((1 << size) + 7) >> 3
+        h.update(b'bitmap')
+        h.update(table.onset.to_bytes(length, 'little'))
+        h.update(table.dcset.to_bytes(length, 'little'))
+    else:
+        h.update(b'bdd')
+        h.update(repr(_bdd_form(size, table.cubes)).encode('ascii'))
+        h.update(repr(_bdd_form(size, table.dontcares)).encode('ascii'))
+    return h.hexdigest()
+
+def lookup_readonly(path, key):
+    """Return the cover stored under key in the cache at path, or None,
+    without writing anything (so the hit is neither counted nor marked
+    as used). This is safe in other processes than the one using the
+    Cache."""
+    try:
+        db = _readers.get(path)
+        if db is None:
+            uri = pathlib.Path(os.path.abspath(path)).as_uri() + '?mode=ro'
+            db = _readers[path] = sqlite3.connect(uri, uri=True)
+        row = db.execute('SELECT cover FROM covers WHERE key = ?',
+                         (key,)).fetchone()
+    except sqlite3.Error:
+        return None
+    if row is None:
+        return None
+    return [tuple(x) for x in json.loads(row[0])]
+
+class Cache(object):
+    """A cache of minimized functions in an SQLite database at path
+    (created if it does not exist)"""
+
+    def __init__(self, path, max_size=64 << 20):
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        try:
+            self._db = sqlite3.connect(path)
+            self._db.execute('CREATE TABLE IF NOT EXISTS covers (key TEXT \
+PRIMARY KEY, cover TEXT NOT NULL, size INTEGER NOT NULL, used REAL NOT \
+NULL)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS covers_used ON \
+covers (used)')
+            self._db.execute('CREATE TABLE IF NOT EXISTS analyses (path TEXT \
+NOT NULL, settings TEXT NOT NULL, net TEXT NOT NULL, signature TEXT NOT \
+NULL, value TEXT NOT NULL, PRIMARY KEY (path, net))')
+            self._db.commit()
+        except sqlite3.Error as e:
+            raise CacheError('cannot use {} as a cache: {}'.format(path, e))
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self._db.execute('SELECT COUNT(*) FROM covers').fetchone()[0]
+
+    def get_size(self):
+        """Return the number of bytes taken up by the stored covers"""
+        return self._db.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM covers').fetchone()[0]
+
+    def lookup(self, key):
+        """Return the cover stored under key, or None"""
+        row = self._db.execute('SELECT cover FROM covers WHERE key = ?',
+                               (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._db.execute('UPDATE covers SET used = ? WHERE key = ?',
+                         (time.time(), key))
+        self._db.commit()
+        return [tuple(x) for x in json.loads(row[0])]
+
+    def store(self, key, cover):
+        """Store a cover under key, removing the least recently used
+        covers if the cache has grown too big"""
+        text = json.dumps(cover, separators=(',', ':'))
+        self._db.execute('INSERT OR REPLACE INTO covers VALUES (?, ?, ?, \
+?)', (key, text, len(text), time.time()))
+        excess = self.get_size() - self.max_size
+        if excess > 0:
+            removed = []
+            for key, size in self._db.execute(
+                'SELECT key, size FROM covers ORDER BY used'):
+                if excess <= 0:
+                    break
+                removed.append((key,))
+                excess -= size
+            self._db.executemany('DELETE FROM covers WHERE key = ?',
+                                 removed)
+        self._db.commit()
+
+    def lookup_analysis(self, path, settings):
+        """Return a dict of the end net names and (signature, value)
+        pairs stored for the netlist at path with the given settings (a
+        string)"""
+        rows = self._db.execute('SELECT net, signature, value FROM \
+analyses WHERE path = ? AND settings = ?', (path, settings))
+        return dict((net, (signature, json.loads(value)))
+                    for net, signature, value in rows)
+
+    def store_analysis(self, path, settings, results):
+        """Store a dict of end net names and (signature, value) pairs
+        for the netlist at path, replacing what was stored for it
+        before"""
+        self._db.execute('DELETE FROM analyses WHERE path = ?', (path,))
+        self._db.executemany(
+            'INSERT INTO analyses VALUES (?, ?, ?, ?, ?)',
+            [(path, settings, net, signature,
+              json.dumps(value, separators=(',', ':')))
+             for net, (signature, value) in results.items()])
+        self._db.commit()
+
+    def clear(self):
+        self._db.execute('DELETE FROM covers')
+        self._db.execute('DELETE FROM analyses')
+        self._db.commit()
+
+    def minimize(self, table, method=None, time_limit=None, minimizer=None):
+        """Return the cover of a Truthtable, from the cache if it is
+        there, else found with minimizer(table, method, time_limit) (by
+        default, the one of Truthtable.shorten) and stored"""
+        key = function_key(table, method, time_limit)
+        cover = self.lookup(key)
+        if cover is None:
+            if minimizer is None:
+                minimizer = truthtable._minimize_truthtable
+            cover = minimizer(table, method, time_limit)
+            self.store(key, cover)
+        return cover
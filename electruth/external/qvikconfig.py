@@ -173,7 +173,7 @@ class _QvikParser(dict):
         def fil2dat(t):
             # If it's a file..
             try:
-                return open(t, 'U').read()
+                return open(t, 'r').read()
             except TypeError:
                 try:
                     return t.read().replace(
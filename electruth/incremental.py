@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+
+# electruth: a collection of boolean logic tools
+# Copyright (C) 2010, 2011  Niels Serup
+
+# This file is part of electruth.
+#
+# electruth is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# electruth is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with electruth.  If not, see <http://www.gnu.org/licenses/>.
+
+##[ Name        ]## electruth.incremental
+##[ Maintainer  ]## Niels Serup <ns@metanohi.org>
+##[ Description ]## Reanalyzes only the changed parts of netlists
+
+# Every net gets a signature: a hash of the gates in its cone (the
+# gates it depends on) and of the names of the starting nets they
+# read, but not of the names of the gates or of the nets in between.
+# Two versions of a netlist give an end net the same signature exactly
+# when its logic has not changed, so only the end nets with new
+# signatures need to be simplified again. The signatures and results
+# can be kept in an electruth.cache.Cache, so that this also holds
+# between runs.
+
+# FileWatcher waits for files to change, using inotify where available
+# (Linux) and checking the modification times of the files every
+# poll_interval seconds elsewhere.
+
+import os
+import struct
+import select
+import time
+import hashlib
+import ctypes
+import ctypes.util
+import electruth.booleanexpression as boolexpr
+import electruth.netlist as netlist
+
+# Seconds between checks of the files when inotify is not available
+poll_interval = 1.0
+
+# Seconds to wait for more changes after one, as editors often write a
+# file in several steps
+settle_time = 0.1
+
+def cone_signatures(nets):
+    """Return a dict of the nets (and of all the nets they depend on)
+    and the signatures of their cones"""
+    signatures = {}
+    for net in netlist.topological_order(nets):
+        gate = net.get_output()
+        if gate is None:
+            if net.constant is None:
+                data = [b'net', net.name.encode('utf-8')]
+            else:
+                data = [b'constant', str(int(net.constant)).encode('ascii')]
+        else:
+            inputs = [signatures[x] for x in gate.get_input_nets()]
+            if gate.func in boolexpr._commutative_operator_types:
+                inputs.sort()
+            data = [boolexpr._translated_operator_names[gate.func].encode(
+                    'ascii')] + inputs
+        signatures[net] = hashlib.sha1(b'\0'.join(data)).digest()
+    return signatures
+
+def _to_json(expr):
+    # Operators become lists of their names and objects, variables their
+    # names and constants booleans
+    if expr.is_operator:
+        return [expr.get_name()] + [_to_json(x) for x in expr.objs]
+    if expr.is_constant:
+        return expr.value
+    return expr.name
+
+def _from_json(value):
+    if isinstance(value, bool):
+        return boolexpr.BooleanConstant(value)
+    if isinstance(value, str):
+        return boolexpr.BooleanVariable(value)
+    return boolexpr.BooleanOperator(value[0],
+                                    *[_from_json(x) for x in value[1:]])
+
+class Analysis(object):
+    """Simplifies the end nets of successive versions of a netlist,
+    reusing the results of the previous version for the end nets whose
+    logic has not changed"""
+
+    def __init__(self, method=None, time_limit=None):
+        self.method = method
+        self.time_limit = time_limit
+        self.changed = [] # Names of the end nets simplified last time
+        self._results = {} # End net names and (signature, Result)
+
+    def submit(self, coll, pool):
+        """Submit the changed end nets of a NetCollection to a
+        electruth.parallel.Pool, returning a list of the names and
+        Results of all end nets"""
+        nets = coll.get_end_nets()
+        signatures = cone_signatures(nets)
+        changed = [x for x in nets if x.name not in self._results or
+                   self._results[x.name][0] != signatures[x]]
+        exprs = coll.get_logic_dag(changed) if changed else {}
+        results = {}
+        for net in nets:
+            if net.name in exprs:
+                result = pool.simplify(exprs[net.name], self.method,
+                                       self.time_limit)
+            else:
+                result = self._results[net.name][1]
+            results[net.name] = (signatures[net], result)
+        self._results = results
+        self.changed = [x.name for x in changed]
+        return [(x.name, results[x.name][1]) for x in nets]
+
+    def _settings(self):
+        return repr((self.method, self.time_limit))
+
+    def load(self, cache, path):
+        """Take the results stored for the netlist at path in an
+        electruth.cache.Cache (see save) as those of the previous
+        version"""
+        import electruth.parallel as parallel
+        for name, (signature, value) in cache.lookup_analysis(
+            path, self._settings()).items():
+            self._results[name] = (bytes.fromhex(signature),
+                                   parallel.Result(None, _from_json(value),
+                                                   None))
+
+    def save(self, cache, path):
+        """Store the results of the last version submitted for the
+        netlist at path in an electruth.cache.Cache, waiting for them if
+        needed"""
+        cache.store_analysis(path, self._settings(), dict(
+                (name, (signature.hex(), _to_json(result.get())))
+                for name, (signature, result) in self._results.items()))
+
+    def update(self, coll, pool=None):
+        """Return a dict of the names and simplified expressions of the
+        end nets of a NetCollection"""
+        import electruth.parallel as parallel
+        if pool is None:
+            with parallel.Pool(1) as pool:
+                return self.update(coll, pool)
+        return dict((name, result.get()) for name, result in
+                    self.submit(coll, pool))
+
+# From <sys/inotify.h>
+_IN_MODIFY = 0x2
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_CLOEXEC = 0o2000000
+_event_header = struct.Struct('iIII')
+
+def _open_inotify():
+    # Return the libc and an inotify file descriptor, or None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6',
+                           use_errno=True)
+        fd = libc.inotify_init1(_IN_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    return libc, fd
+
+class FileWatcher(object):
+    """Waits for changes to files. Use it as a context manager, or call
+    close when done."""
+
+    def __init__(self, paths, use_inotify=True):
+        self.paths = [os.path.abspath(x) for x in paths]
+        self._inotify = _open_inotify() if use_inotify else None
+        if self._inotify is not None:
+            libc, fd = self._inotify
+            # Watch the directories, as editors often replace files
+            # instead of writing to them
+            for directory in set(os.path.dirname(x) for x in self.paths):
+                if libc.inotify_add_watch(
+                    fd, directory.encode(), _IN_MODIFY | _IN_CLOSE_WRITE |
+                    _IN_MOVED_TO | _IN_CREATE) < 0:
+                    self.close()
+                    break
+        self._stamps = self._get_stamps()
+
+    @property
+    def uses_inotify(self):
+        return self._inotify is not None
+
+    def close(self):
+        if self._inotify is not None:
+            os.close(self._inotify[1])
+            self._inotify = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _get_stamps(self):
+        stamps = {}
+        for path in self.paths:
+            try:
+                info = os.stat(path)
+                stamps[path] = (info.st_mtime_ns, info.st_size)
+            except OSError:
+                stamps[path] = None
+        return stamps
+
+    def _changed_paths(self):
+        stamps = self._get_stamps()
+        changed = [x for x in self.paths if stamps[x] != self._stamps[x]]
+        self._stamps = stamps
+        return changed
+
+    def _read_events(self, timeout):
+        # Return the paths of the watched files named in the events that
+        # arrive within timeout seconds (or at all, if None)
+        fd = self._inotify[1]
+        names = set()
+        if not select.select([fd], [], [], timeout)[0]:
+            return names
+        data = os.read(fd, 65536)
+        pos = 0
+        while pos < len(data):
+            wd, mask, cookie, length = _event_header.unpack_from(data, pos)
+            pos += _event_header.size
+            names.add(data[pos:pos + length].rstrip(b'\0').decode(
+                    'utf-8', 'replace'))
+            pos += length
+        return names
+
+    def wait(self, timeout=None):
+        """Wait until at least one of the files has changed (or timeout
+        seconds have passed) and return the paths of the changed
+        files"""
+        end = None if timeout is None else time.time() + timeout
+        basenames = set(os.path.basename(x) for x in self.paths)
+        while True:
+            left = None if end is None else max(0, end - time.time())
+            if self._inotify is not None:
+                if basenames & self._read_events(left):
+                    while self._read_events(settle_time):
+                        pass
+            else:
+                time.sleep(poll_interval if left is None else
+                           min(poll_interval, left))
+            changed = self._changed_paths()
+            if changed:
+                if self._inotify is None:
+                    time.sleep(settle_time)
+                    self._stamps = self._get_stamps()
+                return changed
+            if end is not None and time.time() >= end:
+                return []
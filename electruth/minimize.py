@@ -0,0 +1,622 @@
+#!/usr/bin/env python3
+
+# electruth: a collection of boolean logic tools
+# Copyright (C) 2010, 2011  Niels Serup
+
+# This file is part of electruth.
+#
+# electruth is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# electruth is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with electruth.  If not, see <http://www.gnu.org/licenses/>.
+
+##[ Name        ]## electruth.minimize
+##[ Maintainer  ]## Niels Serup <ns@metanohi.org>
+##[ Description ]## Two-level minimization of boolean functions
+
+# Functions are described by cubes. A cube is a (value, mask) pair of
+# integers over n variables: the bits set in mask are the variables
+# the cube depends on, and value holds their values (bits outside mask
+# are always 0). Variable i of n is bit n - 1 - i, so a minterm is the
+# cube (row number, (1 << n) - 1).
+
+import heapq
+import time
+
+# Petrick's method is only used while the number of partial solutions
+# stays below this limit; larger instances get a greedy cover.
+petrick_limit = 512
+
+def popcount(x):
+    return bin(x).count('1')
+
+def cube_cost(cube):
+    """Return the number of literals in a cube"""
+    return popcount(cube[1])
+
+def cube_contains(a, b):
+    """Check if cube a contains cube b"""
+    return a[1] & b[1] == a[1] and (a[0] ^ b[0]) & a[1] == 0
+
+def iter_cube_minterms(cube, n):
+    """Yield the minterms of a cube"""
+    value, mask = cube
+    free = ((1 << n) - 1) & ~mask
+    sub = free
+    while True:
+        yield value | sub
+        if sub == 0:
+            break
+        sub = (sub - 1) & free
+
+def prime_implicants(n, minterms, dontcares=()):
+    """Return the prime implicants of the function that is true for
+    minterms and may be anything for dontcares"""
+    # Implicants are grouped by mask, and the partner of a value is
+    # found by setting one of its zero bits and looking it up, so two
+    # implicants are only ever compared if their number of ones differs
+    # by exactly one.
+    current = {(1 << n) - 1: set(minterms) | set(dontcares)}
+    primes = []
+    while current:
+        following = {}
+        for mask, values in current.items():
+            combined = set()
+            for value in values:
+                bits = mask & ~value
+                while bits:
+                    bit = bits & -bits
+                    bits ^= bit
+                    if value | bit in values:
+                        following.setdefault(mask ^ bit, set()).add(value)
+                        combined.add(value)
+                        combined.add(value | bit)
+            for value in values - combined:
+                primes.append((value, mask))
+        current = following
+    primes.sort()
+    return primes
+
+def _cube_covers(cube, n, minterms):
+    # Enumerate the smaller of the two sets
+    if 1 << (n - popcount(cube[1])) <= len(minterms):
+        return [m for m in iter_cube_minterms(cube, n) if m in minterms]
+    else:
+        value, mask = cube
+        return [m for m in minterms if m & mask == value]
+
+def _petrick(clauses, primes):
+    # Multiply out the product of sums, absorbing supersets as we go.
+    # Products are bitmasks of prime indices.
+    products = {0}
+    for clause in sorted(clauses, key=popcount):
+        following = set()
+        for p in products:
+            if p & clause:
+                following.add(p)
+                continue
+            bits = clause
+            while bits:
+                bit = bits & -bits
+                bits ^= bit
+                following.add(p | bit)
+        products = set()
+        for p in sorted(following, key=popcount):
+            for q in products:
+                if p & q == q:
+                    break
+            else:
+                products.add(p)
+        if len(products) > petrick_limit:
+            return None
+
+    def cost(p):
+        return (popcount(p),
+                sum(cube_cost(primes[i]) for i in range(len(primes))
+                    if (p >> i) & 1), p)
+    best = min(products, key=cost)
+    return [i for i in range(len(primes)) if (best >> i) & 1]
+
+def _greedy(uncovered, covers, primes):
+    # Gains only ever shrink, so a prime whose recorded gain is still
+    # correct when it reaches the top of the heap is the best choice.
+    heap = [(-len(covers[i] & uncovered), cube_cost(primes[i]), i)
+            for i in range(len(primes))]
+    heapq.heapify(heap)
+    chosen = []
+    while uncovered:
+        gain, cost, i = heapq.heappop(heap)
+        actual = len(covers[i] & uncovered)
+        if actual == 0:
+            continue
+        if actual != -gain:
+            heapq.heappush(heap, (-actual, cost, i))
+            continue
+        chosen.append(i)
+        uncovered -= covers[i]
+    return chosen
+
+def minimum_cover(n, primes, minterms):
+    """Choose a small subset of primes covering every minterm. Essential
+    primes are always chosen; the rest is found with Petrick's method,
+    or greedily for big instances."""
+    minterms = set(minterms)
+    covers = [set(_cube_covers(p, n, minterms)) for p in primes]
+    coverers = {}
+    for i in range(len(primes)):
+        for m in covers[i]:
+            coverers.setdefault(m, []).append(i)
+
+    chosen = set()
+    for m, ps in coverers.items():
+        if len(ps) == 1:
+            chosen.add(ps[0])
+    uncovered = set(minterms)
+    for i in chosen:
+        uncovered -= covers[i]
+
+    if uncovered:
+        rest = sorted(set(i for m in uncovered for i in coverers[m]))
+        rest_primes = [primes[i] for i in rest]
+        rest_covers = [covers[i] & uncovered for i in rest]
+        positions = dict((rest[j], j) for j in range(len(rest)))
+        clauses = set()
+        for m in uncovered:
+            clause = 0
+            for i in coverers[m]:
+                clause |= 1 << positions[i]
+            clauses.add(clause)
+        found = _petrick(clauses, rest_primes)
+        if found is None:
+            found = _greedy(set(uncovered), rest_covers, rest_primes)
+        chosen.update(rest[j] for j in found)
+    return [primes[i] for i in sorted(chosen)]
+
+def quine_mccluskey(n, minterms, dontcares=()):
+    """Return a minimum sum-of-products cover of the function over n
+    variables that is true for minterms and may be anything for
+    dontcares, as a list of cubes"""
+    minterms = set(minterms)
+    if not minterms:
+        return []
+    primes = prime_implicants(n, minterms, dontcares)
+    return minimum_cover(n, primes, minterms)
+
+# Espresso-style heuristic minimization. Everything below works on
+# lists of cubes and never lists the minterms of the function, so it
+# can be used for functions with many inputs.
+
+def _cofactor(cubes, cube):
+    value, mask = cube
+    return [(v & ~mask, m & ~mask) for v, m in cubes
+            if not (v ^ value) & m & mask]
+
+def _split_variable(cubes):
+    # Return the bit of the variable most cubes depend on, preferring
+    # binate variables
+    ones = zeros = 0
+    for v, m in cubes:
+        ones |= v
+        zeros |= m & ~v
+    binate = ones & zeros
+    candidates = binate or ones | zeros
+    best = None
+    best_count = -1
+    bits = candidates
+    while bits:
+        bit = bits & -bits
+        bits ^= bit
+        count = 0
+        for v, m in cubes:
+            if m & bit:
+                count += 1
+        if count > best_count:
+            best = bit
+            best_count = count
+    return best, binate
+
+def _tautology(cubes, space, deadline=None):
+    # space has a bit set for every variable still free. When the
+    # deadline has passed, False is returned, which every caller takes
+    # as the safe answer.
+    if not cubes:
+        return False
+    if deadline is not None and time.time() > deadline:
+        return False
+    free = popcount(space)
+    total = 0
+    for v, m in cubes:
+        if m == 0:
+            return True
+        total += 1 << (free - popcount(m))
+    if total < 1 << free:
+        return False
+
+    ones = zeros = 0
+    for v, m in cubes:
+        ones |= v
+        zeros |= m & ~v
+    unate = (ones | zeros) & ~(ones & zeros)
+    if unate:
+        # A cover is a tautology if and only if the cubes not depending
+        # on its unate variables are
+        return _tautology([c for c in cubes if not c[1] & unate],
+                          space & ~unate, deadline)
+    bit, binate = _split_variable(cubes)
+    return _tautology(_cofactor(cubes, (bit, bit)), space & ~bit,
+                      deadline) and \
+        _tautology(_cofactor(cubes, (0, bit)), space & ~bit, deadline)
+
+def _complement_supercube(cubes, space, memo, deadline=None):
+    # Return the smallest cube containing the complement of cubes, or
+    # None if the complement is empty. memo holds the answers for the
+    # covers seen so far. When the deadline has passed, the whole space
+    # is returned, which only makes REDUCE do less.
+    if not cubes:
+        return (0, 0)
+    ones = zeros = 0
+    for v, m in cubes:
+        if m == 0:
+            return None
+        ones |= v
+        zeros |= m & ~v
+    if not ones & zeros:
+        # The complement of a unate cover without the empty cube is not
+        # empty, and only depends on the variables that are cubes of
+        # their own
+        value = mask = 0
+        for v, m in cubes:
+            if m & (m - 1) == 0:
+                value |= v ^ m
+                mask |= m
+        return (value, mask)
+    key = tuple(sorted(cubes))
+    if key in memo:
+        return memo[key]
+    if deadline is not None and time.time() > deadline:
+        return (0, 0)
+    bit, binate = _split_variable(cubes)
+    rest = space & ~bit
+    low_cubes = _cofactor(cubes, (0, bit))
+    high = _complement_supercube(_cofactor(cubes, (bit, bit)), rest, memo,
+                                 deadline)
+    if high == (0, 0):
+        # Nothing is fixed, unless the complement has no part where
+        # the variable is 0
+        if _tautology(low_cubes, rest, deadline):
+            result = (bit, bit)
+        else:
+            result = (0, 0)
+    else:
+        low = _complement_supercube(low_cubes, rest, memo, deadline)
+        if high is None and low is None:
+            result = None
+        elif low is None:
+            result = (high[0] | bit, high[1] | bit)
+        elif high is None:
+            result = (low[0], low[1] | bit)
+        else:
+            result = supercube([high, low])
+    memo[key] = result
+    return result
+
+def supercube(cubes):
+    """Return the smallest cube containing all the given cubes"""
+    value, mask = cubes[0]
+    for v, m in cubes[1:]:
+        mask &= m & ~(value ^ v)
+    return (value & mask, mask)
+
+def _covered(cube, cubes, full, deadline=None):
+    # Check if cube is contained in the union of cubes (or answer False
+    # once the deadline has passed)
+    return _tautology(_cofactor(cubes, cube), full & ~cube[1], deadline)
+
+def _cover_cost(cubes):
+    return (len(cubes), sum(cube_cost(c) for c in cubes))
+
+def _remove_contained(cubes):
+    result = []
+    for c in sorted(set(cubes), key=cube_cost):
+        for d in result:
+            if cube_contains(d, c):
+                break
+        else:
+            result.append(c)
+    return result
+
+def _expand(cubes, dontcares, full, deadline):
+    care = cubes + dontcares
+    # Most attempts to raise a literal fail. Checking a single point of
+    # the new half of the cube first rejects them without a tautology
+    # check; the points of minterm cubes are looked up in a set.
+    points = set(v for v, m in care if m == full)
+    wide = [c for c in care if c[1] != full]
+    # Raise the literals that few other cubes depend on first; this
+    # tends to make the cube cover more of the others
+    depending = {}
+    for v, m in cubes:
+        while m:
+            bit = m & -m
+            m ^= bit
+            depending[bit] = depending.get(bit, 0) + 1
+    expanded = []
+    cubes = sorted(cubes, key=cube_cost)
+    for i, cube in enumerate(cubes):
+        if deadline is not None and time.time() > deadline:
+            expanded.extend(c for c in cubes[i:] if not any(
+                    cube_contains(d, c) for d in expanded))
+            break
+        if any(cube_contains(d, cube) for d in expanded):
+            continue
+        value, mask = cube
+        bits = []
+        b = mask
+        while b:
+            bit = b & -b
+            b ^= bit
+            bits.append((depending[bit], bit))
+        for count, bit in sorted(bits):
+            point = value ^ bit
+            if point not in points and not any(
+                    point & m == v for v, m in wide):
+                continue
+            raised = (value & ~bit, mask & ~bit)
+            if _covered(raised, care, full, deadline):
+                value, mask = raised
+        expanded.append((value, mask))
+    return _remove_contained(expanded)
+
+def _irredundant(cubes, dontcares, full, deadline):
+    cubes = sorted(cubes, key=cube_cost, reverse=True)
+    i = 0
+    while i < len(cubes):
+        if deadline is not None and time.time() > deadline:
+            break
+        others = cubes[:i] + cubes[i + 1:] + dontcares
+        if _covered(cubes[i], others, full, deadline):
+            del cubes[i]
+        else:
+            i += 1
+    return cubes
+
+def _reduce(cubes, dontcares, full, deadline):
+    cubes = sorted(cubes, key=cube_cost)
+    memo = {}
+    i = 0
+    while i < len(cubes):
+        if deadline is not None and time.time() > deadline:
+            break
+        others = cubes[:i] + cubes[i + 1:] + dontcares
+        value, mask = cubes[i]
+        sc = _complement_supercube(_cofactor(others, cubes[i]),
+                                   full & ~mask, memo, deadline)
+        if sc is None:
+            del cubes[i]
+            continue
+        cubes[i] = (value | sc[0], mask | sc[1])
+        i += 1
+    return cubes
+
+def espresso(n, cubes, dontcares=(), time_limit=None):
+    """Return a small sum-of-products cover of the function over n
+    variables that is true for cubes and may be anything for dontcares,
+    as a list of cubes. This is a heuristic in the style of Espresso
+    (EXPAND, IRREDUNDANT and REDUCE repeated until the cover stops
+    improving); the result is not guaranteed to be minimal. If
+    time_limit (in seconds) is given, the best cover found when it runs
+    out is returned."""
+    full = (1 << n) - 1
+    deadline = time_limit is not None and time.time() + time_limit or None
+    dontcares = list(dontcares)
+    cover = _remove_contained(cubes)
+    if not cover:
+        return []
+    cover = _expand(cover, dontcares, full, deadline)
+    cover = _irredundant(cover, dontcares, full, deadline)
+    cost = _cover_cost(cover)
+    while deadline is None or time.time() < deadline:
+        attempt = _reduce(cover, dontcares, full, deadline)
+        attempt = _expand(attempt, dontcares, full, deadline)
+        attempt = _irredundant(attempt, dontcares, full, deadline)
+        attempt_cost = _cover_cost(attempt)
+        if attempt_cost >= cost:
+            break
+        cover = attempt
+        cost = attempt_cost
+    return sorted(cover)
+
+# Multi-output minimization. Several functions of the same variables
+# are minimized together, so that a product can be shared by the sums
+# of several outputs. Implicants are tagged with a bitmask of the
+# outputs they are implicants of (bit o for output o).
+
+def multi_output_prime_implicants(n, minterms, dontcares=None):
+    """Return the multi-output prime implicants of a list of functions,
+    each given by its minterms and its dontcares, as (cube, tag) pairs.
+    A cube is prime for a tag if it cannot be made larger while staying
+    an implicant of every output in the tag."""
+    if dontcares is None:
+        dontcares = [()] * len(minterms)
+    tags = {}
+    for o in range(len(minterms)):
+        bit = 1 << o
+        for m in minterms[o]:
+            tags[m] = tags.get(m, 0) | bit
+        for m in dontcares[o]:
+            tags[m] = tags.get(m, 0) | bit
+    current = {(1 << n) - 1: tags}
+    primes = []
+    while current:
+        following = {}
+        for mask, values in current.items():
+            combined = set()
+            for value, tag in values.items():
+                bits = mask & ~value
+                while bits:
+                    bit = bits & -bits
+                    bits ^= bit
+                    other = values.get(value | bit)
+                    if other is None:
+                        continue
+                    shared = tag & other
+                    if not shared:
+                        continue
+                    following.setdefault(mask ^ bit, {})[value] = shared
+                    # A cube is only covered if the larger cube is an
+                    # implicant of all of its outputs
+                    if shared == tag:
+                        combined.add(value)
+                    if shared == other:
+                        combined.add(value | bit)
+            for value, tag in values.items():
+                if value not in combined:
+                    primes.append(((value, mask), tag))
+        current = following
+    primes.sort()
+    return primes
+
+def multi_output_cover(n, primes, minterms):
+    """Choose tagged primes covering the minterms of every output, and
+    return a list of products (cubes) and, for each output, a list of
+    the indices of the products in its sum. A product costs its literals
+    once and one more for every output using it, so shared products are
+    preferred."""
+    outputs = len(minterms)
+    sets = [set(x) for x in minterms]
+    # Requirements are (minterm, output) pairs, numbered m * outputs + o
+    covers = []
+    for cube, tag in primes:
+        pairs = set()
+        for o in range(outputs):
+            if (tag >> o) & 1:
+                pairs.update(m * outputs + o
+                             for m in _cube_covers(cube, n, sets[o]))
+        covers.append(pairs)
+    coverers = {}
+    for i in range(len(primes)):
+        for r in covers[i]:
+            coverers.setdefault(r, []).append(i)
+
+    chosen = set()
+    for r, ps in coverers.items():
+        if len(ps) == 1:
+            chosen.add(ps[0])
+    uncovered = set(coverers)
+    for i in chosen:
+        uncovered -= covers[i]
+    if uncovered:
+        # Greedy, best gain per cost first (see _greedy)
+        def cost(i):
+            return cube_cost(primes[i][0]) + popcount(primes[i][1])
+        heap = [(-len(covers[i] & uncovered) / cost(i), i)
+                for i in range(len(primes)) if i not in chosen]
+        heapq.heapify(heap)
+        while uncovered:
+            gain, i = heapq.heappop(heap)
+            actual = len(covers[i] & uncovered)
+            if actual == 0:
+                continue
+            if actual / cost(i) != -gain:
+                heapq.heappush(heap, (-actual / cost(i), i))
+                continue
+            chosen.add(i)
+            uncovered -= covers[i]
+
+    # Every output takes a minimum cover out of the chosen products that
+    # are implicants of it
+    products = []
+    positions = {}
+    output_covers = []
+    for o in range(outputs):
+        candidates = sorted(set(primes[i][0] for i in chosen
+                                if (primes[i][1] >> o) & 1))
+        cover = minimum_cover(n, candidates, sets[o]) if sets[o] else []
+        indices = []
+        for cube in cover:
+            if cube not in positions:
+                positions[cube] = len(products)
+                products.append(cube)
+            indices.append(positions[cube])
+        output_covers.append(indices)
+    return products, output_covers
+
+def multi_output_quine_mccluskey(n, minterms, dontcares=None):
+    """Minimize a list of functions over n variables together, each
+    given by its minterms (and its dontcares). Returns a list of
+    products (cubes) and, for each function, a list of the indices of
+    the products in its sum."""
+    primes = multi_output_prime_implicants(n, minterms, dontcares)
+    return multi_output_cover(n, primes, minterms)
+
+def multi_output_espresso(n, cubes, dontcares=None, time_limit=None):
+    """Like multi_output_quine_mccluskey, but for functions given by
+    lists of cubes (truthtable uses multi_output_quine_mccluskey
+    instead while functions are small enough). Products are tagged with
+    the outputs they are implicants of: every function is minimized with
+    espresso, every product found is then added to the tags of all
+    other outputs it is an implicant of (EXPAND of the output part), and
+    every output drops the products it does not need, least shared
+    first (IRREDUNDANT). Each output that is still to be minimized gets
+    an equal share of the time left."""
+    outputs = len(cubes)
+    if dontcares is None:
+        dontcares = [()] * outputs
+    deadline = time_limit is not None and time.time() + time_limit or None
+    full = (1 << n) - 1
+
+    def share(left):
+        # The deadline of the next of left parts of the work
+        if deadline is None:
+            return None
+        return time.time() + max(0, deadline - time.time()) / left
+
+    # Twice the outputs: once to minimize them and once to choose their
+    # products
+    tags = {}
+    for o in range(outputs):
+        end = share(2 * outputs - o)
+        for cube in espresso(n, cubes[o], dontcares[o],
+                             None if end is None else end - time.time()):
+            tags[cube] = tags.get(cube, 0) | 1 << o
+    cares = [list(cubes[o]) + list(dontcares[o]) for o in range(outputs)]
+    for cube in sorted(tags):
+        for o in range(outputs):
+            if not (tags[cube] >> o) & 1 and (cubes[o] or dontcares[o]) \
+                    and _covered(cube, cares[o], full, deadline):
+                tags[cube] |= 1 << o
+
+    products = []
+    positions = {}
+    covers = []
+    for o in range(outputs):
+        end = share(outputs - o)
+        cover = sorted((cube for cube, tag in tags.items()
+                        if (tag >> o) & 1),
+                       key=lambda c: (popcount(tags[c]), -cube_cost(c), c))
+        dcs = list(dontcares[o])
+        i = 0
+        while i < len(cover):
+            if end is not None and time.time() > end:
+                break
+            if _covered(cover[i], cover[:i] + cover[i + 1:] + dcs, full,
+                        end):
+                del cover[i]
+            else:
+                i += 1
+        indices = []
+        for cube in sorted(cover):
+            if cube not in positions:
+                positions[cube] = len(products)
+                products.append(cube)
+            indices.append(positions[cube])
+        covers.append(indices)
+    return products, covers
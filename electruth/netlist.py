@@ -23,52 +23,147 @@
 ##[ Description ]## Controls netlists
 
 import tempfile
+import subprocess
+import threading
+import shutil
 import os.path
+import time
+import re
+import json
 import electruth.booleanexpression as boolexpr
-from electruth.booleanexpression import AND, OR, NOT, XOR, NAND, NOR, XNOR
 import electruth.various as various
 
 #####################################################################
 
-# Type of logic gate with number of inputs; may contain erroneous
-# information. It is probably best to use the basic devices (be it
-# CMOS or TTL). Gates with more than one output are currently not
-# supported. Gates with more than two inputs could easily be added,
-# but they are not supported yet.
-
-_cmos_two_inputs = (1, 2, 5, 6, 8, 9, 12, 13)
-_ttl_two_inputs = (1, 2, 4, 5, 9, 10, 12, 13)
-_not_inputs = (1, 3, 5, 9, 11, 13)
-_gates_information = {
-    '4081': (AND, _cmos_two_inputs),
-    '7408': (AND, _ttl_two_inputs),
-    '7409': (AND, _ttl_two_inputs),
-
-    '4071': (OR, _cmos_two_inputs),
-    '7432': (OR, _ttl_two_inputs),
-
-    '4069': (NOT, _not_inputs),
-    '4049': (NOT, (3, 5, 7, 9, 11, 14)),
-    '7404': (NOT, _not_inputs),
-    '7405': (NOT, _not_inputs),
-    '7414': (NOT, _not_inputs),
-
-    '4070': (XOR, _cmos_two_inputs),
-    '4030': (XOR, _cmos_two_inputs),
-    '7486': (XOR, _ttl_two_inputs),
-
-    '4011': (NAND, _cmos_two_inputs),    
-    '7400': (NAND, _ttl_two_inputs),
-    '7403': (NAND, _ttl_two_inputs),
-    '74132': (NAND, _ttl_two_inputs),
-
-    '4001': (NOR, _cmos_two_inputs),
-    '7402': (NOR, (2, 3, 5, 6, 8, 9, 11, 12)),
-
-    '4077': (XNOR, _cmos_two_inputs),
-    '74266': (XNOR, _cmos_two_inputs) # Odd but true
+# Logic parts are described in gates.json (next to this file). A part
+# is either a function (e.g. "nand") and a layout, which is a list of
+# [input pins, output pin] pairs, one for each gate in the package, or
+# a list of units, each with an output pin, names for the pins it reads
+# and a raw expression of those names (see
+# booleanexpression.parse_raw_expression). Units are used for parts
+# such as multiplexers and decoders; their expressions are split into
+# simple gates inside the component. More parts can be added with
+# add_gate_library.
+
+# The library is read when first needed, and every part is prepared
+# only when it is first used.
+_library_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'gates.json')
+_library = None # Device names and their descriptions
+_parts = {} # Device names and their Part objects
+
+# Device names such as 74LS08, SN74LS08N and CD4081BE are looked up as
+# 7408 and 4081 if they are not known themselves
+_device_families = (
+    (re.compile(r'^(?:[A-Z]{1,3})?74[A-Z]*(\d+)[A-Z]*$'), '74'),
+    (re.compile(r'^(?:CD|MC1|HEF)?(4\d{3})[A-Z]*$'), '')
+)
+
+# Nets with these names are connected to the supply, and give gate
+# inputs a constant value
+_constant_nets = {
+    'Vcc': True,
+    'GND': False
 }
 
+def _read_gate_library(path):
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise Exception('cannot read gate library {}: {}'.format(path, e))
+    layouts = data.get('layouts', {})
+    parts = data.get('parts', {})
+    for device, part in parts.items():
+        layout = part.get('layout')
+        if layout is not None and not isinstance(layout, list):
+            try:
+                part['layout'] = layouts[layout]
+            except KeyError:
+                raise Exception('layout {} of {} does not exist'.format(
+                        layout, device))
+    return parts
+
+def add_gate_library(path):
+    """Add the parts of a gate library file (in the format of gates.json)
+    to the known parts, replacing parts of the same names"""
+    global _library
+    parts = _read_gate_library(path)
+    if _library is None:
+        _library = _read_gate_library(_library_path)
+    _library.update(parts)
+    for device in parts:
+        _parts.pop(device, None)
+
+def get_part(device):
+    """Return the Part of a device name"""
+    part = _parts.get(device)
+    if part is not None:
+        return part
+    global _library
+    if _library is None:
+        _library = _read_gate_library(_library_path)
+    name = device
+    if name not in _library:
+        for pattern, prefix in _device_families:
+            match = pattern.match(device.upper())
+            if match is not None:
+                name = prefix + match.group(1)
+                break
+    try:
+        description = _library[name]
+    except KeyError:
+        raise Exception('logic gate {} is not recognized (is it \
+even a logic gate?)'.format(device))
+    part = _parts[device] = Part(device, description)
+    return part
+
+class Part(object):
+    """The logic of a device: for every output pin, the simple gates
+    computing it, as (function, input keys, output key) tuples in
+    order. Keys are pin numbers, or strings for the connections between
+    the gates of a unit."""
+
+    def __init__(self, device, description):
+        self.device = device
+        self.outputs = {}
+        if 'units' in description:
+            for unit in description['units']:
+                self._add_unit(unit)
+        else:
+            func = boolexpr._get_operator_type(description['function'])
+            for inputs, output in description['layout']:
+                self.outputs[output] = [(func, tuple(inputs), output)]
+        self.inputs = set(key for gates in self.outputs.values()
+                          for gate in gates for key in gate[1]
+                          if isinstance(key, int))
+
+    def _add_unit(self, unit):
+        output = unit['output']
+        pins = unit['pins']
+        expr = boolexpr.parse_raw_expression(unit['expression'])
+        if not expr.is_operator:
+            raise Exception('unit {} of {} has no gates'.format(
+                    output, self.device))
+        keys = {}
+        gates = []
+        for x in expr.iter_postorder():
+            if x.is_constant:
+                raise Exception('unit {} of {} has a constant'.format(
+                        output, self.device))
+            elif x.is_variable:
+                try:
+                    keys[x] = pins[x.name]
+                except KeyError:
+                    raise Exception('pin {} of {} is not numbered'.format(
+                            x.name, self.device))
+            else:
+                keys[x] = output if x is expr else '{}~{}'.format(
+                    output, len(gates) + 1)
+                gates.append((x.func, tuple(keys[y] for y in x.objs),
+                              keys[x]))
+        self.outputs[output] = gates
+
 #####################################################################
 
 # Notes on structuring the data: A netlist consists of one single
@@ -96,38 +191,81 @@ _gates_information = {
 
 #####################################################################
 
-class Gate(object):
+class Component(object):
+    """A package (e.g. a 7408), holding a Gate for every output pin in
+    use"""
+
     def __init__(self, name, device):
-        try:
-            func, input_nums = _gates_information[device]
-        except KeyError:
-            raise Exception('logic gate {} is not recognized (is it \
-even a logic gate?)'.format(device))
+        self.name = name
+        self.device = device
+        self.part = get_part(device)
+        self.pins = {} # Pin numbers and GatePins, set by GatePin
+        self._gates = {} # Keys and the Gates driving them
+        self._internal_nets = {}
+
+    def get_gate(self, key):
+        """Return the Gate driving a pin (or a connection inside the
+        component), or None if it is not an output"""
+        gate = self._gates.get(key)
+        if gate is None:
+            if isinstance(key, int):
+                gates = self.part.outputs.get(key)
+                if gates is None:
+                    return None
+            else:
+                gates = self.part.outputs[int(key.partition('~')[0])]
+            for func, inputs, output in gates:
+                if output == key:
+                    if len(self.part.outputs) == 1 and len(gates) == 1:
+                        name = self.name
+                    else:
+                        name = '{}:{}'.format(self.name, output)
+                    gate = self._gates[key] = Gate(name, func, self,
+                                                   inputs, output)
+                    break
+        return gate
+
+    def get_net(self, key):
+        """Return the Net connected to a pin (or a connection inside the
+        component)"""
+        if isinstance(key, int):
+            pin = self.pins.get(key)
+            if pin is None or pin.parent is None:
+                raise Exception('pin {} of {} is not connected'.format(
+                        key, self.name))
+            return pin.parent
+        net = self._internal_nets.get(key)
+        if net is None:
+            net = self._internal_nets[key] = Net(
+                '{}:{}'.format(self.name, key), GatePin(self, key))
+        return net
+
+class Gate(object):
+    """A single logic function of some input nets, driving one output
+    pin of a Component"""
+
+    def __init__(self, name, func, component, inputs, output):
         self.name = name
         self.func = func
-        self.input_numbers = input_nums
-        self.pins = [] # GatePin objects will append themselves to
-                       # this list
+        self.component = component
+        self.inputs = inputs # Pin numbers or internal keys
+        self.output = output
 
     def get_input_nets(self):
-        nets = []
-        for x in self.pins:
-            if x.is_input:
-                nets.append(x.parent)
-        return nets
+        return [self.component.get_net(x) for x in self.inputs]
 
     def get_output_net(self):
-        for x in self.pins:
-            if x.is_output:
-                return x
+        return self.component.get_net(self.output)
 
 class GatePin(object):
-    def __init__(self, gate, pinnum):
-        self.gate = gate
+    def __init__(self, component, pinnum):
+        self.component = component
         self.pin = pinnum
-        self.is_input = self.pin in self.gate.input_numbers
-        self.is_output = not self.is_input
-        self.gate.pins.append(self)
+        self.gate = component.get_gate(pinnum)
+        self.is_output = self.gate is not None
+        self.is_input = pinnum in component.part.inputs
+        if isinstance(pinnum, int):
+            component.pins[pinnum] = self
         self.parent = None # Will be set when put on a net
 
 class Net(object):
@@ -140,6 +278,8 @@ class Net(object):
             x.parent = self
         self.links = links
         self.parent = None # Will be set when put in a collection
+        # True or False for supply nets, which are never variables
+        self.constant = _constant_nets.get(name)
 
     def get_output(self):
         for x in self.links:
@@ -156,6 +296,7 @@ class NetCollection(object):
         for x in nets:
             x.parent = self
         self.nets = nets
+        self.parse_time = None # Seconds spent parsing, if parsed
 
     def get_end_nets(self, prefix='>'):
         nets = []
@@ -164,83 +305,248 @@ class NetCollection(object):
                 nets.append(x)
         return nets
 
-    def get_logic_path(self, net, used_gates=[]):
-        used_gates = used_gates[:]
-        output_gate = net.get_output()
-        if output_gate in used_gates:
-            net_names_lst = [repr(x.parent.name) for x in
-                             output_gate.pins]
-            if len(net_names_lst) == 1:
-                net_names = net_names_lst[0]
+    def get_variable_order(self, nets=None):
+        """Return the names of the starting nets that the nets (the end
+        nets by default) depend on, in the order a depth-first search
+        from the nets reaches them. Inputs of the same gate end up close
+        to each other, which usually makes a good variable order for
+        binary decision diagrams."""
+        if nets is None:
+            nets = self.get_end_nets()
+        names = []
+        seen = set()
+        stack = list(reversed(nets))
+        while stack:
+            net = stack.pop()
+            if net in seen:
+                continue
+            seen.add(net)
+            gate = net.get_output()
+            if gate is None:
+                if net.constant is None:
+                    names.append(net.name)
             else:
-                net_names = ', '.join(net_names_lst[:-1]) + ' and ' + net_names_lst[-1]
-            raise Exception('gate {} on nets {} cannot be used more than once'.format(
-                    output_gate.name, net_names))
-        used_gates.append(output_gate)
-        if output_gate is None:
-            return boolexpr.BooleanVariable(net.name)
-
-        # Else (if the net is not a starting net)
-        input_nets = output_gate.get_input_nets()
-        objs = []
-        for x in input_nets:
-            objs.append(self.get_logic_path(x, used_gates))
-        op = boolexpr.BooleanOperator(output_gate.func, *objs)
-        return op
+                stack.extend(reversed(gate.get_input_nets()))
+        return names
+
+    def get_bdds(self, nets=None, manager=None):
+        """Return a dict of net names and the binary decision diagrams of
+        the nets (the end nets by default), as Functions of manager (a
+        new electruth.bdd.BDD with the variables in the order given by
+        get_variable_order by default)"""
+        import electruth.bdd as bdd
+        if nets is None:
+            nets = self.get_end_nets()
+        if manager is None:
+            manager = bdd.BDD(self.get_variable_order(nets))
+        return manager.from_nets(nets)
+
+    def get_simulator(self, nets=None):
+        """Return an electruth.simulate.Simulator of the nets (the end
+        nets by default)"""
+        import electruth.simulate as simulate
+        if nets is None:
+            nets = self.get_end_nets()
+        return simulate.Simulator(nets)
+
+    def get_logic_dag(self, nets=None):
+        """Return a dict of net names and the boolean expressions of the
+        nets (the end nets by default). Every gate is converted only
+        once, so logic shared by several nets (or reached along several
+        paths) is the same object in all of them."""
+        if nets is None:
+            nets = self.get_end_nets()
+        exprs = {}
+        for net in topological_order(nets):
+            gate = net.get_output()
+            if gate is None:
+                if net.constant is None:
+                    exprs[net] = boolexpr.BooleanVariable(net.name)
+                else:
+                    exprs[net] = boolexpr.BooleanConstant(net.constant)
+            else:
+                exprs[net] = boolexpr.BooleanOperator(
+                    gate.func, *[exprs[x] for x in gate.get_input_nets()])
+        return dict((x.name, exprs[x]) for x in nets)
+
+    def get_logic_path(self, net):
+        return self.get_logic_dag([net])[net.name]
+
+def topological_order(nets):
+    """Return the nets that the given nets depend on (themselves
+    included), ordered so that the input nets of a gate always come
+    before its output net"""
+    # Find the nets in use and the nets depending on them
+    users = {}
+    waiting = {}
+    stack = list(nets)
+    while stack:
+        net = stack.pop()
+        if net in waiting:
+            continue
+        gate = net.get_output()
+        inputs = gate.get_input_nets() if gate is not None else []
+        waiting[net] = len(inputs)
+        for x in inputs:
+            users.setdefault(x, []).append(net)
+            if x not in waiting:
+                stack.append(x)
+
+    # Kahn's algorithm: a net is ready when all its inputs are done
+    order = [x for x in waiting if waiting[x] == 0]
+    i = 0
+    while i < len(order):
+        for x in users.get(order[i], ()):
+            waiting[x] -= 1
+            if waiting[x] == 0:
+                order.append(x)
+        i += 1
+    if len(order) < len(waiting):
+        gates = sorted(set(x.get_output().name for x in waiting
+                           if waiting[x] > 0))
+        raise Exception('gates {} are part of or depend on a loop'.format(
+                ', '.join(gates)))
+    return order
 
 #####################################################################
 
-def parse_geda_netlist(path, return_end_nets_exprs=False):
-    gates = {}
+def create_net_collection(devices, nets):
+    """Return a NetCollection of components (a dict of refdes and device
+    names) connected by nets (an iterable of net names and lists of
+    (refdes, pin number) links)"""
+    # Components are found by refdes and pins by number, so every link
+    # is handled in constant time
+    components = dict((refdes, Component(refdes, device))
+                      for refdes, device in devices.items())
+    made = []
+    for name, links in nets:
+        pins = []
+        for refdes, pinnum in links:
+            try:
+                component = components[refdes]
+            except KeyError:
+                raise Exception('component {} does not exist'.format(refdes))
+            pin = component.pins.get(pinnum)
+            if pin is None:
+                pin = GatePin(component, pinnum)
+            pins.append(pin)
+        made.append(Net(name, *pins))
+    return NetCollection(*made)
+
+def _read_geda_netlist(lines):
+    # Read the lines of a netlist in the gEDA format, which may still be
+    # being written
+    devices = {}
     nets = []
-    pins = []
-    
     in_group = None
-    for line in open(path, 'r'):
+    for line in lines:
         line = line.strip()
-        if not line: continue
-        data = line.split(' ')
-        if data[0] == 'START':
-            in_group = data[1]
-        elif data[0] == 'END':
+        if not line:
+            continue
+        word, _, rest = line.partition(' ')
+        if word == 'START':
+            in_group = rest
+        elif word == 'END':
             in_group = None
         elif in_group == 'components':
-            gates[data[0]] = Gate(data[0], data[1].split('=')[1])
+            devices[word] = rest.partition('=')[2]
         elif in_group == 'nets':
-            data = [x.strip() for x in line.split(':')]
-            if data[0] not in ('Vcc', 'GND'):
-                net_links = [x.strip().split(' ')
-                             for x in data[1].split(',')]
-                for i in range(len(net_links)):
-                    x = net_links[i]
-                    pin_inf = gates[x[0]], int(x[1])
-                    ok = False
-                    for y in pins:
-                        if y[0] == pin_inf[0] and y[1] == pin_inf[1]:
-                            pin = y[2]
-                            ok = True
-                            break
-                    if not ok:
-                        pin = GatePin(*pin_inf)
-                        pins.append((pin_inf[0], pin_inf[1], pin))
-                    net_links[i] = pin
-                nets.append(Net(data[0], *net_links))
-
-    coll = NetCollection(*nets)
+            name, _, links = line.partition(':')
+            net_links = []
+            for link in links.split(','):
+                refdes, _, pinnum = link.strip().partition(' ')
+                net_links.append((refdes, int(pinnum)))
+            nets.append((name.rstrip(), net_links))
+    return create_net_collection(devices, nets)
+
+def _finish_parsing(coll, start_time, return_end_nets_exprs, method,
+                    time_limit):
+    coll.parse_time = time.time() - start_time
     if return_end_nets_exprs:
-        exprs = {}
-        for x in coll.get_end_nets():
-            exprs[x.name] = x.get_logic_path().simplify()
+        exprs = coll.get_logic_dag()
+        for name in exprs:
+            exprs[name] = exprs[name].simplify(method, time_limit)
         return exprs
     else:
         return coll
 
-def parse_geda_netlist_from_schematic(path, return_end_nets_exprs=False):
-    filename = os.path.join(tempfile.gettempdir(), 'output.net')
-    if not various.exec_program('gnetlist', '-g', 'geda', '-o',
-                               filename, path) == 0:
-        raise Exception('gnetlist does not work')
-    return parse_geda_netlist(filename, return_end_nets_exprs)
+def parse_geda_netlist(path, return_end_nets_exprs=False, method=None,
+                       time_limit=None):
+    start_time = time.time()
+    with open(path, 'r') as f:
+        coll = _read_geda_netlist(f)
+    return _finish_parsing(coll, start_time, return_end_nets_exprs, method,
+                           time_limit)
+
+def _run_gnetlist(path):
+    # Convert a schematic with gnetlist and read the netlist as it is
+    # written. Every run writes to a named pipe in a new temporary
+    # directory, so runs in parallel never share an output file; where
+    # named pipes do not exist, a file in that directory is read when
+    # gnetlist is done.
+    directory = tempfile.mkdtemp(prefix='electruth-')
+    output = os.path.join(directory, 'output.net')
+    command = ('gnetlist', '-q', '-g', 'geda', '-o', output,
+               os.path.abspath(path))
+    try:
+        if not hasattr(os, 'mkfifo'):
+            if various.exec_program(*command) != 0:
+                raise Exception('gnetlist does not work')
+            with open(output, 'r') as f:
+                return _read_geda_netlist(f)
+
+        os.mkfifo(output)
+        # Open both ends at once so that neither side waits for the
+        # other. The extra write end is closed when gnetlist exits, which
+        # ends the stream even if gnetlist never opened the pipe.
+        reader = os.open(output, os.O_RDONLY | os.O_NONBLOCK)
+        writer = os.open(output, os.O_WRONLY)
+        os.set_blocking(reader, True)
+        try:
+            process = subprocess.Popen(command, stdin=subprocess.DEVNULL,
+                                       stdout=subprocess.DEVNULL,
+                                       stderr=subprocess.DEVNULL)
+        except OSError:
+            os.close(reader)
+            os.close(writer)
+            raise Exception('gnetlist does not work')
+        def close_when_done():
+            process.wait()
+            os.close(writer)
+        waiter = threading.Thread(target=close_when_done)
+        waiter.start()
+        try:
+            with open(reader, 'r') as f:
+                coll = _read_geda_netlist(f)
+        except Exception:
+            waiter.join()
+            if process.returncode != 0:
+                raise Exception('gnetlist does not work')
+            raise
+        waiter.join()
+        if process.returncode != 0:
+            raise Exception('gnetlist does not work')
+        return coll
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def parse_geda_netlist_from_schematic(path, return_end_nets_exprs=False,
+                                      method=None, time_limit=None):
+    """Read a gschem schematic (see electruth.schematic), using gnetlist
+    for what the reader does not support"""
+    import electruth.schematic as schematic
+    start_time = time.time()
+    if schematic.use_gnetlist:
+        coll = _run_gnetlist(path)
+    else:
+        try:
+            coll = schematic.read_schematic(path)
+        except schematic.UnsupportedError:
+            if shutil.which('gnetlist') is None:
+                raise
+            coll = _run_gnetlist(path)
+    return _finish_parsing(coll, start_time, return_end_nets_exprs, method,
+                           time_limit)
 
 # On direct execution:
 if __name__ == '__main__':
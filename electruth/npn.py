@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+
+# electruth: a collection of boolean logic tools
+# Copyright (C) 2010, 2011  Niels Serup
+
+# This file is part of electruth.
+#
+# electruth is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# electruth is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with electruth.  If not, see <http://www.gnu.org/licenses/>.
+
+##[ Name        ]## electruth.npn
+##[ Maintainer  ]## Niels Serup <ns@metanohi.org>
+##[ Description ]## Canonical forms of functions up to renaming and negation
+
+# Functions that differ only by the order of their inputs and by which
+# inputs are negated have covers of the same size: rename and negate the
+# literals of one, and it is a cover of the other. This module moves a
+# function (a packed on-set and don't-care set, see electruth.truthtable)
+# to a canonical position in its class, and moves covers back.
+
+# Negating the output is the N in NPN, but a sum of products of the
+# negated function is no sum of products of the function itself, so
+# covers can only be shared between functions of the same output phase.
+# Only the inputs are normalized here; in effect, the phase is part of
+# the key.
+
+# Inputs are negated so that more on-set rows have them false, and
+# sorted by how many on-set rows have them true (then by how they pair
+# with the other inputs). Where these counts tie, every order of the
+# tied inputs (and both phases of inputs true in half of the rows) is
+# tried, and the smallest result is the canonical form. Beyond
+# max_candidates tries, the first is taken instead, so that functions
+# with many symmetries may end up in different forms, which only means
+# that they do not share a cover.
+
+import collections
+import functools
+import itertools
+import math
+import operator
+import electruth.truthtable as truthtable
+import electruth.minimize as minimize
+
+# The most ways of breaking ties tried by canonical_form
+max_candidates = 1 << 10
+
+def _negate(bits, b, columns, full):
+    # Negate the variable of row bit b
+    column = columns[b]
+    shift = 1 << b
+    return ((bits & column) >> shift) | ((bits & ~column & full) << shift)
+
+def _swap(bits, high, low, columns, full):
+    # Swap the variables of row bits high and low (high > low)
+    a, b = columns[high], columns[low]
+    shift = (1 << high) - (1 << low)
+    stay = bits & ~(a ^ b) & full
+    down = bits & a & ~b
+    up = bits & b & ~a
+    return stay | (down >> shift) | (up << shift)
+
+def _arrange(n, onset, dcset, wanted, columns, full):
+    # Move row bit wanted[p] of the function to row bit p by swapping two
+    # at a time; at[p] is the row bit of the function now at row bit p
+    at = list(range(n))
+    for target in range(n):
+        b = wanted[target]
+        current = at.index(b)
+        if current != target:
+            high, low = max(current, target), min(current, target)
+            onset = _swap(onset, high, low, columns, full)
+            dcset = _swap(dcset, high, low, columns, full)
+            at[current], at[target] = at[target], at[current]
+    # Row bit p of the result is row bit at[p] of the function
+    return onset, dcset, [n - 1 - at[n - 1 - i] for i in range(n)]
+
+def canonical_form(n, onset, dcset=0):
+    """Return (onset, dcset, negations, order): the canonical form of a
+    function of n inputs, the inputs negated to get there (a bitmask of
+    row bits) and, for each position of the canonical form, the number
+    of the input placed there."""
+    full = (1 << (1 << n)) - 1
+    # columns[b] has the rows where row bit b (input n - 1 - b) is 1
+    columns = truthtable.variable_columns(n)[::-1]
+
+    total = minimize.popcount(onset)
+    dc_total = minimize.popcount(dcset)
+    negations = 0
+    balanced = [] # Row bits whose inputs can be negated or not
+    for b in range(n):
+        ones = minimize.popcount(onset & columns[b])
+        dc_ones = minimize.popcount(dcset & columns[b])
+        if ones * 2 > total or ones * 2 == total and dc_ones * 2 > dc_total:
+            onset = _negate(onset, b, columns, full)
+            dcset = _negate(dcset, b, columns, full)
+            negations |= 1 << b
+        elif ones * 2 == total and dc_ones * 2 == dc_total:
+            balanced.append(b)
+
+    first = best = None
+    tries = 0
+    for phases in range(1 << len(balanced)):
+        on, dc, negated = onset, dcset, negations
+        for i, b in enumerate(balanced):
+            if phases & (1 << i):
+                on = _negate(on, b, columns, full)
+                dc = _negate(dc, b, columns, full)
+                negated |= 1 << b
+        def rank(b):
+            pairs = sorted(minimize.popcount(on & columns[b] & columns[c])
+                           for c in range(n) if c != b)
+            return (minimize.popcount(on & columns[b]),
+                    minimize.popcount(dc & columns[b]), pairs)
+        ranks = dict((b, rank(b)) for b in range(n))
+        groups = [tuple(x) for _, x in itertools.groupby(
+                sorted(range(n), key=ranks.get), ranks.get)]
+        tries += functools.reduce(operator.mul, [math.factorial(len(x))
+                                                 for x in groups], 1)
+        if tries > max_candidates:
+            if first is None:
+                first = _arrange(n, on, dc, sum(groups, ()), columns, full)
+                first = first[:2] + (negated, first[2])
+            return first
+        for wanted in itertools.product(*[list(itertools.permutations(x))
+                                          for x in groups]):
+            candidate = _arrange(n, on, dc, sum(wanted, ()), columns, full)
+            candidate = candidate[:2] + (negated, candidate[2])
+            if first is None:
+                first = best = candidate
+            elif candidate[:2] < best[:2]:
+                best = candidate
+    return best
+
+def restore_cover(n, cubes, negations, order):
+    """Move a cover of a canonical form back to the function it was made
+    from (see canonical_form)"""
+    restored = []
+    for value, mask in cubes:
+        new_value = new_mask = 0
+        for i in range(n):
+            bit = 1 << (n - 1 - i)
+            if mask & bit:
+                original = 1 << (n - 1 - order[i])
+                new_mask |= original
+                if bool(value & bit) != bool(negations & original):
+                    new_value |= original
+        restored.append((new_value, new_mask))
+    return restored
+
+class Memo(object):
+    """Remembers the covers of the canonical forms of the last size
+    functions minimized"""
+
+    def __init__(self, size=1024):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._covers = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._covers)
+
+    def clear(self):
+        self._covers.clear()
+
+    def minimize(self, n, onset, dcset, settings, minimizer):
+        """Return a cover of the function of n inputs with the given
+        onset and dcset. minimizer(onset, dcset) finds a cover when the
+        canonical form of the function is not remembered; settings is
+        anything else the cover depends on (e.g. the method)."""
+        onset, dcset, negations, order = canonical_form(n, onset, dcset)
+        key = (n, onset, dcset, settings)
+        cubes = self._covers.get(key)
+        if cubes is None:
+            self.misses += 1
+            cubes = minimizer(onset, dcset)
+            self._covers[key] = cubes
+            while len(self._covers) > self.size:
+                self._covers.popitem(False)
+        else:
+            self.hits += 1
+            self._covers.move_to_end(key)
+        return restore_cover(n, cubes, negations, order)
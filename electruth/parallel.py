@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+
+# electruth: a collection of boolean logic tools
+# Copyright (C) 2010, 2011  Niels Serup
+
+# This file is part of electruth.
+#
+# electruth is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# electruth is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with electruth.  If not, see <http://www.gnu.org/licenses/>.
+
+##[ Name        ]## electruth.parallel
+##[ Maintainer  ]## Niels Serup <ns@metanohi.org>
+##[ Description ]## Minimizes in several processes at once
+
+# Work is sent to worker processes as small tuples of Truthtables or
+# expressions, and only the resulting cubes come back; the expressions
+# are built from them in the calling process. Expressions are pickled as
+# flat lists of their operators (see BooleanOperator.__reduce__), so
+# deep ones are sent and rebuilt without recursion. Results are always
+# collected in the order the work was submitted, so the output does not
+# depend on which worker finishes first.
+
+# With a cache (see electruth.cache), the truth tables of expressions
+# are made and looked up in the workers, which only read it; the calling
+# process stores what they found.
+
+# At most two tasks per worker are waiting or running at a time;
+# submitting more first waits for the oldest, so tables read one at a
+# time are not all held in the queue at once.
+
+import os
+import collections
+import concurrent.futures
+import electruth.truthtable as truthtable
+import electruth.cache as cache
+
+def _run(task):
+    # Runs in a worker process
+    kind = task[0]
+    if kind == 'table':
+        table, method, time_limit = task[1:]
+        return truthtable._minimize_truthtable(table, method, time_limit)
+    elif kind == 'expression':
+        expr, method, time_limit, path = task[1:]
+        table = expr.create_truthtable()
+        if path is None:
+            return table.names, None, truthtable._minimize_truthtable(
+                table, method, time_limit)
+        key = cache.function_key(table, method, time_limit)
+        cubes = cache.lookup_readonly(path, key)
+        if cubes is None:
+            cubes = truthtable._minimize_truthtable(table, method,
+                                                    time_limit)
+        return table.names, key, cubes
+    elif kind == 'tables':
+        tables, method, time_limit = task[1:]
+        return truthtable._minimize_truthtables(tables, method, time_limit)
+
+class Result(object):
+    """The result of work submitted to a Pool"""
+
+    def __init__(self, future, value, convert):
+        self._future = future
+        self._value = value
+        self._convert = convert
+
+    def _wait(self):
+        # Wait for the worker, but leave the conversion for get
+        if self._future is not None:
+            self._value = self._future.result()
+            self._future = None
+
+    def get(self):
+        """Wait for the work to finish and return its result"""
+        if self._convert is not None:
+            self._wait()
+            self._value = self._convert(self._value)
+            self._convert = None
+        return self._value
+
+class Pool(object):
+    """Shortens truth tables and simplifies expressions in jobs worker
+    processes (by default, one per processor). With jobs=1, everything
+    is done in the calling process when submitted."""
+
+    def __init__(self, jobs=None):
+        if jobs is None:
+            jobs = os.cpu_count() or 1
+        self.jobs = jobs
+        self._running = collections.deque()
+        if jobs > 1:
+            self._executor = concurrent.futures.ProcessPoolExecutor(jobs)
+        else:
+            self._executor = None
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _submit(self, task, convert):
+        if self._executor is None:
+            return Result(None, _run(task), convert)
+        while len(self._running) >= 2 * self.jobs:
+            self._running.popleft()._wait()
+        result = Result(self._executor.submit(_run, task), None, convert)
+        self._running.append(result)
+        return result
+
+    def shorten(self, table, method=None, time_limit=None):
+        """Submit a Truthtable to be shortened (see Truthtable.shorten);
+        the Result is an expression"""
+        # Only the names are kept, not the table
+        names = table.names
+        def convert(cubes):
+            return truthtable.create_from_cubes(names, cubes).ungroup()
+        # The cache (see electruth.cache) is only used in this process
+        current = cache.get_cache()
+        if current is None:
+            return self._submit(('table', table, method, time_limit),
+                                convert)
+        key = cache.function_key(table, method, time_limit)
+        cubes = current.lookup(key)
+        if cubes is not None:
+            return Result(None, cubes, convert)
+        def store(cubes):
+            current.store(key, cubes)
+            return convert(cubes)
+        return self._submit(('table', table, method, time_limit), store)
+
+    def simplify(self, expr, method=None, time_limit=None):
+        """Submit an expression to be simplified; the Result is an
+        expression"""
+        if not expr.is_operator:
+            return Result(None, expr, lambda x: x)
+        current = cache.get_cache()
+        def convert(value):
+            names, key, cubes = value
+            # Counts the hit or miss, and marks the cover as used
+            if key is not None and current.lookup(key) is None:
+                current.store(key, cubes)
+            return truthtable.create_from_cubes(names, cubes).ungroup()
+        return self._submit(
+            ('expression', expr, method, time_limit,
+             None if current is None else current.path), convert)
+
+    def shorten_together(self, tables, method=None, time_limit=None):
+        """Submit a dict of output names and Truthtables to be shortened
+        together (see truthtable.shorten_truthtables); the Result is a
+        dict of output names and expressions"""
+        output_names = list(tables)
+        if not output_names:
+            return Result(None, {}, lambda x: x)
+        names = tables[output_names[0]].names
+        def convert(value):
+            products, covers = value
+            exprs = truthtable.create_from_shared_cubes(names, products,
+                                                        covers)
+            return dict((output_names[i], exprs[i].ungroup())
+                        for i in range(len(output_names)))
+        return self._submit(('tables', tables, method, time_limit),
+                            convert)
+
+def shorten_each_truthtable(tables, method=None, time_limit=None,
+                            jobs=None):
+    """Shorten each Truthtable in a dict of names and Truthtables on
+    its own, in parallel, returning a dict of names and expressions (see
+    truthtable.shorten_truthtables to shorten them together)"""
+    with Pool(jobs) as pool:
+        results = [(name, pool.shorten(table, method, time_limit))
+                   for name, table in tables.items()]
+        return dict((name, result.get()) for name, result in results)
+
+def simplify_expressions(exprs, method=None, time_limit=None, jobs=None):
+    """Simplify each expression in a dict of names and expressions in
+    parallel, returning a dict of names and expressions"""
+    with Pool(jobs) as pool:
+        results = [(name, pool.simplify(expr, method, time_limit))
+                   for name, expr in exprs.items()]
+        return dict((name, result.get()) for name, result in results)
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+
+# electruth: a collection of boolean logic tools
+# Copyright (C) 2010, 2011  Niels Serup
+
+# This file is part of electruth.
+#
+# electruth is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# electruth is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with electruth.  If not, see <http://www.gnu.org/licenses/>.
+
+##[ Name        ]## electruth.sat
+##[ Maintainer  ]## Niels Serup <ns@metanohi.org>
+##[ Description ]## Satisfiability of boolean expressions
+
+# Expressions are turned into clauses by the Tseitin encoding: every
+# operator gets a variable of its own, and a few clauses force that
+# variable to equal the operator applied to its objects. The number of
+# clauses grows linearly with the size of the expression, and since
+# equal subexpressions are the same object, they are encoded only once.
+
+# The clauses are solved by conflict-driven clause learning. Variables
+# and literals are numbered as in the DIMACS format: variables are
+# positive integers, and -x is the negation of x. Every clause watches
+# its first two literals, so only clauses watching a literal that has
+# become false are looked at during propagation. Conflicts are analysed
+# back to the first unique implication point, the learned clause is
+# added, and the variables involved get more active; the most active
+# free variable is decided on next (VSIDS). The search restarts after a
+# number of conflicts following the Luby sequence.
+
+import heapq
+import electruth.booleanexpression as boolexpr
+from electruth.booleanexpression import AND, OR, NOT, XOR, NAND, NOR, XNOR
+
+class SATError(Exception):
+    pass
+
+def _luby(i):
+    # 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8, ...
+    size, exponent = 1, 0
+    while size < i + 1:
+        exponent += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) >> 1
+        exponent -= 1
+        i %= size
+    return 1 << exponent
+
+class CNF(object):
+    """Clauses in conjunctive normal form made from boolean expressions
+    by the Tseitin encoding"""
+
+    def __init__(self):
+        self.clauses = []
+        self.count = 0 # Number of variables
+        self.variables = {} # Variable names and numbers
+        self._literals = {}
+        self._true = None
+
+    def new_variable(self):
+        self.count += 1
+        return self.count
+
+    def _constant(self, value):
+        if self._true is None:
+            self._true = self.new_variable()
+            self.clauses.append([self._true])
+        return self._true if value else -self._true
+
+    def _gate(self, func, lits):
+        if func == NOT:
+            return -lits[0]
+        if func in (NAND, NOR, XNOR):
+            return -self._gate({NAND: AND, NOR: OR, XNOR: XOR}[func], lits)
+        if len(lits) == 1:
+            return lits[0]
+        if func == XOR:
+            g = lits[0]
+            for x in lits[1:]:
+                a, g = g, self.new_variable()
+                self.clauses.extend(([-g, a, x], [-g, -a, -x],
+                                     [g, -a, x], [g, a, -x]))
+            return g
+        g = self.new_variable()
+        if func == OR:
+            # g = x1 or x2 ... is the same as -g = -x1 and -x2 ...
+            g, lits = -g, [-x for x in lits]
+        for x in lits:
+            self.clauses.append([-g, x])
+        self.clauses.append([g] + [-x for x in lits])
+        return abs(g) if func == OR else g
+
+    def add(self, expr):
+        """Encode an expression, returning the literal equal to it"""
+        literals = self._literals
+        for x in boolexpr._iter_postorder(expr):
+            if x in literals:
+                continue
+            if x.is_constant:
+                lit = self._constant(x.value)
+            elif x.is_variable:
+                lit = self.variables.get(x.name)
+                if lit is None:
+                    lit = self.variables[x.name] = self.new_variable()
+            else:
+                lit = self._gate(x.func, [literals[y] for y in x.objs])
+            literals[x] = lit
+        return literals[expr]
+
+class Solver(object):
+    """A conflict-driven clause learning SAT solver"""
+
+    # Number of conflicts before the first restart; later restarts come
+    # after this times the Luby sequence
+    restart_base = 100
+    # Activities of variables are multiplied by this after every conflict
+    decay = 0.95
+
+    def __init__(self, clauses=()):
+        self.count = 0
+        self._values = [0] # 1, -1 or 0 (unassigned) for every variable
+        self._levels = [0]
+        self._reasons = [None]
+        self._activity = [0.0]
+        self._phases = [False]
+        self._watches = {}
+        self._clauses = []
+        self._learnts = []
+        self._learnt_limit = 1000
+        self._trail = []
+        self._limits = [] # Trail positions where decision levels begin
+        self._head = 0
+        self._heap = []
+        self._increment = 1.0
+        self._model = None
+        self._ok = True
+        for x in clauses:
+            self.add_clause(x)
+
+    def add_variable(self):
+        self.count += 1
+        v = self.count
+        self._values.append(0)
+        self._levels.append(0)
+        self._reasons.append(None)
+        self._activity.append(0.0)
+        self._phases.append(False)
+        self._watches[v] = []
+        self._watches[-v] = []
+        heapq.heappush(self._heap, (0.0, v))
+        return v
+
+    def _value(self, lit):
+        return self._values[lit] if lit > 0 else -self._values[-lit]
+
+    def add_clause(self, lits):
+        """Add a clause (an iterable of literals). Variables are added as
+        needed."""
+        clause = []
+        for x in lits:
+            if not isinstance(x, int) or x == 0:
+                raise SATError('{!r} is not a literal'.format(x))
+            while abs(x) > self.count:
+                self.add_variable()
+            value = self._value(x)
+            if value == 1 or -x in clause:
+                return
+            if value == 0 and x not in clause:
+                clause.append(x)
+        if not self._ok:
+            return
+        if not clause:
+            self._ok = False
+        elif len(clause) == 1:
+            self._assign(clause[0], None)
+            if self._propagate() is not None:
+                self._ok = False
+        else:
+            self._clauses.append(clause)
+            self._watches[clause[0]].append(clause)
+            self._watches[clause[1]].append(clause)
+
+    def _assign(self, lit, reason):
+        v = abs(lit)
+        self._values[v] = 1 if lit > 0 else -1
+        self._levels[v] = len(self._limits)
+        self._reasons[v] = reason
+        self._trail.append(lit)
+
+    def _propagate(self):
+        # Returns a clause with only false literals, or None
+        values = self._values
+        trail = self._trail
+        watches = self._watches
+        while self._head < len(trail):
+            false_lit = -trail[self._head]
+            self._head += 1
+            clauses = watches[false_lit]
+            kept = []
+            for i in range(len(clauses)):
+                c = clauses[i]
+                if c[0] == false_lit:
+                    c[0], c[1] = c[1], false_lit
+                first = c[0]
+                value = values[first] if first > 0 else -values[-first]
+                if value == 1:
+                    kept.append(c)
+                    continue
+                for j in range(2, len(c)):
+                    x = c[j]
+                    if (values[x] if x > 0 else -values[-x]) != -1:
+                        c[1], c[j] = x, false_lit
+                        watches[x].append(c)
+                        break
+                else:
+                    kept.append(c)
+                    if value == -1:
+                        kept.extend(clauses[i + 1:])
+                        watches[false_lit] = kept
+                        self._head = len(trail)
+                        return c
+                    self._assign(first, c)
+            watches[false_lit] = kept
+        return None
+
+    def _bump(self, v):
+        activity = self._activity
+        activity[v] += self._increment
+        if activity[v] > 1e100:
+            for x in range(1, self.count + 1):
+                activity[x] *= 1e-100
+            self._increment *= 1e-100
+            self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        self._heap = [(-self._activity[x], x)
+                      for x in range(1, self.count + 1)
+                      if self._values[x] == 0]
+        heapq.heapify(self._heap)
+
+    def _analyze(self, conflict):
+        # Find the first unique implication point; returns the learned
+        # clause (with the asserting literal first) and the level to go
+        # back to
+        levels = self._levels
+        trail = self._trail
+        level = len(self._limits)
+        seen = set()
+        learnt = [None]
+        counter = 0
+        index = len(trail) - 1
+        clause = conflict
+        start = 0
+        while True:
+            for q in clause[start:]:
+                v = abs(q)
+                if v not in seen and levels[v] > 0:
+                    seen.add(v)
+                    self._bump(v)
+                    if levels[v] == level:
+                        counter += 1
+                    else:
+                        learnt.append(q)
+            while abs(trail[index]) not in seen:
+                index -= 1
+            p = trail[index]
+            index -= 1
+            counter -= 1
+            if counter == 0:
+                break
+            clause = self._reasons[abs(p)]
+            start = 1
+        learnt[0] = -p
+        back = 0
+        if len(learnt) > 1:
+            k = max(range(1, len(learnt)), key=lambda i: levels[abs(learnt[i])])
+            learnt[1], learnt[k] = learnt[k], learnt[1]
+            back = levels[abs(learnt[1])]
+        return learnt, back
+
+    def _backtrack(self, level):
+        if len(self._limits) <= level:
+            return
+        start = self._limits[level]
+        values = self._values
+        for lit in self._trail[start:]:
+            v = abs(lit)
+            self._phases[v] = lit > 0
+            values[v] = 0
+            self._reasons[v] = None
+            heapq.heappush(self._heap, (-self._activity[v], v))
+        del self._trail[start:]
+        del self._limits[level:]
+        self._head = start
+        if len(self._heap) > 4 * self.count + 64:
+            self._rebuild_heap()
+
+    def _decide(self):
+        heap = self._heap
+        while heap:
+            v = heapq.heappop(heap)[1]
+            if self._values[v] == 0:
+                return v
+        return None
+
+    def _reduce(self):
+        # At level 0: forget the longer half of the learned clauses and
+        # rebuild the watch lists
+        if len(self._learnts) < self._learnt_limit:
+            return
+        self._learnts.sort(key=len)
+        keep = len(self._learnts) // 2
+        self._learnts = self._learnts[:keep] + \
+            [x for x in self._learnts[keep:] if len(x) <= 2]
+        self._learnt_limit = int(self._learnt_limit * 1.1)
+        for x in self._watches:
+            self._watches[x] = []
+        for c in self._clauses + self._learnts:
+            self._watches[c[0]].append(c)
+            self._watches[c[1]].append(c)
+
+    def solve(self):
+        """Return True if all clauses can be true at the same time, else
+        False"""
+        self._model = None
+        if not self._ok:
+            return False
+        restarts = 0
+        conflicts = 0
+        limit = self.restart_base * _luby(restarts)
+        while True:
+            conflict = self._propagate()
+            if conflict is not None:
+                if not self._limits:
+                    self._ok = False
+                    return False
+                conflicts += 1
+                learnt, level = self._analyze(conflict)
+                self._backtrack(level)
+                if len(learnt) == 1:
+                    self._assign(learnt[0], None)
+                else:
+                    self._learnts.append(learnt)
+                    self._watches[learnt[0]].append(learnt)
+                    self._watches[learnt[1]].append(learnt)
+                    self._assign(learnt[0], learnt)
+                self._increment /= self.decay
+                continue
+            if conflicts >= limit:
+                self._backtrack(0)
+                restarts += 1
+                conflicts = 0
+                limit = self.restart_base * _luby(restarts)
+                self._reduce()
+                continue
+            v = self._decide()
+            if v is None:
+                self._model = [x == 1 for x in self._values]
+                self._backtrack(0)
+                return True
+            self._limits.append(len(self._trail))
+            self._assign(v if self._phases[v] else -v, None)
+
+    def get_model(self):
+        """Return a list of the values of the variables (indexed by
+        variable number; index 0 is unused) found by the last successful
+        call to solve, or None"""
+        return self._model
+
+def find_model(expr):
+    """Return a dict of variable names and values making the expression
+    true, or None if it can never be true"""
+    cnf = CNF()
+    cnf.clauses.append([cnf.add(expr)])
+    solver = Solver(cnf.clauses)
+    if not solver.solve():
+        return None
+    model = solver.get_model()
+    return dict((name, model[v]) for name, v in cnf.variables.items())
+
+def is_satisfiable(expr):
+    """Check if the expression can be true"""
+    return find_model(expr) is not None
+
+def find_difference(a, b):
+    """Return a dict of variable names and values for which the two
+    expressions differ, or None if they are equivalent. The expressions
+    are encoded together (so what they share is encoded once), and the
+    exclusive or of the two (the miter) is solved."""
+    cnf = CNF()
+    x, y = cnf.add(a), cnf.add(b)
+    if x == y:
+        return None
+    cnf.clauses.extend(([x, y], [-x, -y]))
+    solver = Solver(cnf.clauses)
+    if not solver.solve():
+        return None
+    model = solver.get_model()
+    return dict((name, model[v]) for name, v in cnf.variables.items())
+
+def equivalent(a, b):
+    """Check if two expressions are equivalent"""
+    return find_difference(a, b) is None
@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+
+# electruth: a collection of boolean logic tools
+# Copyright (C) 2010, 2011  Niels Serup
+
+# This file is part of electruth.
+#
+# electruth is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# electruth is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with electruth.  If not, see <http://www.gnu.org/licenses/>.
+
+##[ Name        ]## electruth.schematic
+##[ Maintainer  ]## Niels Serup <ns@metanohi.org>
+##[ Description ]## Reads gschem schematics
+
+# A schematic is read directly into the objects of electruth.netlist,
+# without running gnetlist. Components are placed by moving the pins of
+# their symbols (mirrored, rotated and translated as gschem does), and
+# everything that touches is joined with a union-find structure: net
+# segments and pin ends sharing a point, net segment ends lying on other
+# net segments, and everything carrying the same net name (from netname=
+# attributes, or net= attributes such as the power pins of a symbol).
+
+# Symbols are looked up by file name in the directory of the schematic,
+# the directories named in its gafrc, symbol_paths and the usual places
+# of the gEDA library, and every symbol is read only once. Symbols are
+# shared between threads, but nothing else is, so several schematics
+# can be read at the same time.
+
+# The file names in each directory are indexed the first time it is
+# searched, along with the modification times of the directories
+# looked through. When a symbol cannot be found, only the directories
+# that have changed since are indexed again, and each at most once
+# while reading a schematic.
+
+import os
+import re
+import threading
+import electruth.netlist as netlist
+
+class SchematicError(Exception):
+    pass
+
+class UnsupportedError(SchematicError):
+    """A schematic that gnetlist might still be able to read, e.g. one
+    using a symbol that cannot be found"""
+    pass
+
+# Directories searched for symbols (and their subdirectories) before the
+# gEDA library
+symbol_paths = []
+
+# Set to True to always convert schematics with gnetlist
+use_gnetlist = False
+
+_library_paths = ('/usr/share/gEDA/sym', '/usr/local/share/gEDA/sym',
+                  '/usr/share/geda-gaf/sym', '/usr/local/share/geda-gaf/sym')
+
+_gafrc_library = re.compile(
+    r'\(\s*component-library(?:-search)?\s+"([^"]*)"')
+
+# Names and priorities of net names; a net= attribute names a net
+# before a netname= attribute does, as in gnetlist
+_net_attribute = 0
+_netname_attribute = 1
+
+_lock = threading.Lock()
+_directories = {} # (directory, recursive) and (stamps, {file name: path})
+_symbols = {} # Paths and (modification time, Symbol)
+
+class _Object(object):
+    """An object of a gEDA file: its type, the fields of its first line,
+    its text (for text objects) and its attached attributes and
+    embedded objects"""
+
+    def __init__(self, kind, fields):
+        self.kind = kind
+        self.fields = fields
+        self.text = None
+        self.attributes = []
+        self.contents = None
+
+def _read_objects(lines, path):
+    # Return the top-level objects of the lines of a gEDA file
+    objects = []
+    current = objects
+    last = None
+    stack = [] # Enclosing lists and the objects they are attached to
+    lines = iter(lines)
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if not line:
+            continue
+        kind = line[0]
+        if kind in '{[':
+            if last is None:
+                raise SchematicError('{}: "{}" does not follow an \
+object'.format(path, kind))
+            stack.append((current, last))
+            if kind == '{':
+                current = last.attributes
+            else:
+                current = last.contents = []
+            last = None
+        elif kind in '}]':
+            if not stack:
+                raise SchematicError('{}: unmatched "{}"'.format(path, kind))
+            current, last = stack.pop()
+        else:
+            obj = _Object(kind, line.split()[1:])
+            try:
+                if kind in 'TH':
+                    # Text and paths are followed by a number of lines
+                    obj.text = '\n'.join(next(lines).rstrip('\r\n') for i
+                                         in range(int(obj.fields[-1])))
+                elif kind == 'G':
+                    # Pictures are followed by a file name and, if
+                    # embedded, data ending with a line with a dot
+                    next(lines)
+                    if obj.fields[-1] == '1':
+                        while next(lines).rstrip('\r\n') != '.':
+                            pass
+            except (IndexError, ValueError, StopIteration):
+                raise SchematicError('{}: malformed "{}" object'.format(
+                        path, kind))
+            current.append(obj)
+            last = obj
+    if stack:
+        raise SchematicError('{}: unexpected end of file'.format(path))
+    return objects
+
+def _get_attributes(objects):
+    # Return the (name, value) attributes among some objects
+    attributes = []
+    for obj in objects:
+        if obj.kind == 'T':
+            name, sep, value = obj.text.partition('=')
+            if sep and name and value:
+                attributes.append((name, value))
+    return attributes
+
+def _first(attributes, name):
+    for key, value in attributes:
+        if key == name:
+            return value
+
+class Symbol(object):
+    """The pins and the inherited attributes of a symbol"""
+
+    def __init__(self, objects, path):
+        self.path = path
+        self.pins = [] # (x, y, pinnumber, pinseq), x and y being the end
+                       # that connects
+        for obj in objects:
+            if obj.kind != 'P':
+                continue
+            try:
+                x1, y1, x2, y2 = (int(x) for x in obj.fields[:4])
+                whichend = int(obj.fields[6]) if len(obj.fields) > 6 else 0
+            except ValueError:
+                raise SchematicError('{}: malformed pin'.format(path))
+            attributes = _get_attributes(obj.attributes)
+            seq = _first(attributes, 'pinseq')
+            if seq is not None:
+                seq = int(seq) if seq.isdigit() else None
+            x, y = (x2, y2) if whichend else (x1, y1)
+            self.pins.append((x, y, _first(attributes, 'pinnumber'), seq))
+        self.attributes = _get_attributes(objects)
+        self.slots = {} # Slot numbers and pin numbers in pinseq order
+        for key, value in self.attributes:
+            if key == 'slotdef':
+                slot, _, numbers = value.partition(':')
+                self.slots[slot.strip()] = [x.strip() for x in
+                                            numbers.split(',')]
+
+def _stamp(directory):
+    try:
+        return os.stat(directory).st_mtime_ns
+    except OSError:
+        return None
+
+def _index_directory(directory, recursive):
+    # Return the modification times of the directories looked through
+    # and the symbol file names and paths found in them
+    stamps = [(directory, _stamp(directory))]
+    index = {}
+    if recursive:
+        walk = os.walk(directory)
+    else:
+        try:
+            walk = [(directory, [], os.listdir(directory))]
+        except OSError:
+            walk = []
+    for root, dirs, files in walk:
+        dirs.sort()
+        if root != directory:
+            stamps.append((root, _stamp(root)))
+        for name in sorted(files):
+            if name.endswith('.sym') and name not in index:
+                index[name] = os.path.join(root, name)
+    return stamps, index
+
+def _search_directories(path):
+    # Return the (directory, recursive) pairs searched for the symbols of
+    # a schematic, in order
+    directory = os.path.dirname(os.path.abspath(path))
+    searched = [(directory, False)]
+    try:
+        with open(os.path.join(directory, 'gafrc'), 'r') as f:
+            for match in _gafrc_library.finditer(f.read()):
+                searched.append((os.path.join(
+                            directory, os.path.expanduser(match.group(1))),
+                                 True))
+    except OSError:
+        pass
+    searched.extend((x, True) for x in symbol_paths)
+    searched.extend((x, True) for x in _library_paths)
+    return searched
+
+def _find_symbol(name, directories, refreshed=None):
+    # Return the path of a symbol, or None. Directories are indexed
+    # without holding _lock. If refreshed is a set, the directories not
+    # in it are indexed again if they have changed, and added to it.
+    for key in directories:
+        with _lock:
+            known = _directories.get(key)
+        if known is None or refreshed is not None and key not in refreshed \
+                and any(_stamp(x) != stamp for x, stamp in known[0]):
+            known = _index_directory(*key)
+            with _lock:
+                _directories[key] = known
+        if refreshed is not None:
+            refreshed.add(key)
+        path = known[1].get(name)
+        if path is not None:
+            return path
+
+def get_symbol(name, directories, refreshed=None):
+    """Return the Symbol of a file name, searching (directory, recursive)
+    pairs in order. If it is not found, the directories that have
+    changed since they were last looked through are looked through
+    again, except those in refreshed (a set, to which they are added,
+    so that each is looked through again at most once)."""
+    if refreshed is None:
+        refreshed = set()
+    path = _find_symbol(name, directories)
+    if path is None:
+        path = _find_symbol(name, directories, refreshed)
+    if path is None:
+        raise UnsupportedError('symbol {} cannot be found'.format(name))
+    stamp = os.stat(path).st_mtime_ns
+    with _lock:
+        known = _symbols.get(path)
+    if known is not None and known[0] == stamp:
+        return known[1]
+    with open(path, 'r') as f:
+        symbol = Symbol(_read_objects(f, path), path)
+    with _lock:
+        _symbols[path] = (stamp, symbol)
+    return symbol
+
+def _place(x, y, angle, mirror, px, py):
+    # Move a point of a symbol to where it is in the schematic: gschem
+    # mirrors around the y axis first, then rotates counterclockwise
+    if mirror:
+        px = -px
+    if angle == 90:
+        px, py = -py, px
+    elif angle == 180:
+        px, py = -px, -py
+    elif angle == 270:
+        px, py = py, -px
+    return x + px, y + py
+
+class _Sets(object):
+    """A union-find structure of the numbers from 0"""
+
+    def __init__(self):
+        self.parents = []
+
+    def add(self):
+        self.parents.append(len(self.parents))
+        return len(self.parents) - 1
+
+    def find(self, x):
+        parents = self.parents
+        root = x
+        while parents[root] != root:
+            root = parents[root]
+        while parents[x] != root:
+            parents[x], x = root, parents[x]
+        return root
+
+    def union(self, x, y):
+        x, y = self.find(x), self.find(y)
+        if x != y:
+            self.parents[max(x, y)] = min(x, y)
+
+def _on_segment(px, py, segment):
+    # Whether a point lies inside a net segment (not at its ends)
+    x1, y1, x2, y2 = segment
+    if (px, py) in ((x1, y1), (x2, y2)):
+        return False
+    return (x2 - x1) * (py - y1) == (y2 - y1) * (px - x1) and \
+        min(x1, x2) <= px <= max(x1, x2) and min(y1, y2) <= py <= max(y1, y2)
+
+def _pin_number(number, refdes):
+    try:
+        return int(number)
+    except (TypeError, ValueError):
+        raise SchematicError('pin {} of {} is not a number'.format(
+                number, refdes))
+
+def read_schematic(path):
+    """Read a gschem schematic into an electruth.netlist.NetCollection"""
+    with open(path, 'r') as f:
+        objects = _read_objects(f, path)
+    directories = _search_directories(path)
+    symbols = {} # File names and the Symbols already used
+    refreshed = set() # Directories already indexed again
+
+    sets = _Sets()
+    points = {} # Points and the first node there
+    segments = [] # Net segments and their nodes
+    lines = {} # ('h', y), ('v', x) or None and indices of segments
+    names = {} # Nodes and (priority, name) pairs
+    links = {} # Nodes of pins and (refdes, pin number)
+    devices = {}
+    named = {} # Net names and the first node carrying them
+
+    def add_point(point, node):
+        first = points.setdefault(point, node)
+        if first != node:
+            sets.union(first, node)
+
+    def name_node(node, priority, name):
+        names.setdefault(node, []).append((priority, name))
+        first = named.setdefault(name, node)
+        if first != node:
+            sets.union(first, node)
+
+    for obj in objects:
+        if obj.kind == 'N':
+            try:
+                segment = tuple(int(x) for x in obj.fields[:4])
+            except ValueError:
+                raise SchematicError('{}: malformed net'.format(path))
+            node = sets.add()
+            x1, y1, x2, y2 = segment
+            segments.append((segment, node))
+            key = ('h', y1) if y1 == y2 else ('v', x1) if x1 == x2 else None
+            lines.setdefault(key, []).append(len(segments) - 1)
+            add_point((x1, y1), node)
+            add_point((x2, y2), node)
+            for key, value in _get_attributes(obj.attributes):
+                if key == 'netname':
+                    name_node(node, _netname_attribute, value)
+        elif obj.kind == 'C':
+            try:
+                x, y = int(obj.fields[0]), int(obj.fields[1])
+                angle, mirror = int(obj.fields[3]), obj.fields[4] == '1'
+                basename = obj.fields[5]
+            except (IndexError, ValueError):
+                raise SchematicError('{}: malformed component'.format(path))
+            if angle not in (0, 90, 180, 270):
+                raise SchematicError('{}: component {} has angle {}'.format(
+                        path, basename, angle))
+            if obj.contents is not None:
+                symbol = Symbol(obj.contents, path)
+            else:
+                symbol = symbols.get(basename)
+                if symbol is None:
+                    symbol = symbols[basename] = get_symbol(
+                        basename, directories, refreshed)
+            # Attached attributes come before inherited ones
+            attributes = _get_attributes(obj.attributes)
+            inherited = attributes + symbol.attributes
+            if _first(inherited, 'graphical') == '1':
+                continue
+            if _first(inherited, 'source') is not None:
+                raise UnsupportedError(
+                    '{}: hierarchical schematics are not supported'.format(
+                        path))
+            refdes = _first(inherited, 'refdes')
+            if refdes is not None:
+                if '?' in refdes:
+                    raise SchematicError('{}: component {} is not \
+numbered'.format(path, refdes))
+                device = _first(inherited, 'device')
+                if device is None:
+                    raise SchematicError('{}: {} has no device'.format(
+                            path, refdes))
+                if devices.setdefault(refdes, device) != device:
+                    raise SchematicError('{}: {} is both {} and {}'.format(
+                            path, refdes, devices[refdes], device))
+            slot = _first(attributes, 'slot')
+            numbers = symbol.slots.get(slot) if slot is not None else None
+            pins = {} # Pin numbers and nodes
+            for px, py, number, seq in symbol.pins:
+                if numbers is not None and seq is not None and \
+                        seq <= len(numbers):
+                    number = numbers[seq - 1]
+                node = sets.add()
+                add_point(_place(x, y, angle, mirror, px, py), node)
+                if number is not None:
+                    pins[number] = node
+                    if refdes is not None:
+                        links[node] = (refdes, _pin_number(number, refdes))
+            # net=NAME:PINS attributes, e.g. for power pins that are not
+            # drawn; the first one naming a pin counts
+            seen = set()
+            for key, value in inherited:
+                if key != 'net':
+                    continue
+                name, _, numbers = value.partition(':')
+                name = name.strip()
+                for number in numbers.split(','):
+                    number = number.strip()
+                    if number in seen:
+                        continue
+                    seen.add(number)
+                    node = pins.get(number)
+                    if node is None:
+                        if refdes is None:
+                            continue
+                        node = pins[number] = sets.add()
+                        links[node] = (refdes, _pin_number(number, refdes))
+                    name_node(node, _net_attribute, name)
+
+    # Net segments whose ends (or the ends of pins) lie inside other net
+    # segments are connected to them
+    for point, node in points.items():
+        px, py = point
+        for key in (('h', py), ('v', px), None):
+            for i in lines.get(key, ()):
+                segment, other = segments[i]
+                if _on_segment(px, py, segment):
+                    sets.union(node, other)
+
+    # Collect the nets, in the order of their first nodes
+    groups = {}
+    for node in range(len(sets.parents)):
+        root = sets.find(node)
+        group = groups.get(root)
+        if group is None:
+            group = groups[root] = ([], [], set())
+        if node in names:
+            group[0].extend(names[node])
+        link = links.get(node)
+        if link is not None and link not in group[2]:
+            group[1].append(link)
+            group[2].add(link)
+    nets = []
+    unnamed = 0
+    for root in sorted(groups):
+        net_names, net_links, _ = groups[root]
+        if not net_links:
+            continue
+        if net_names:
+            name = min(net_names)[1]
+        else:
+            unnamed += 1
+            name = 'unnamed_net{}'.format(unnamed)
+        nets.append((name, net_links))
+
+    used = set(link[0] for net in nets for link in net[1])
+    return netlist.create_net_collection(
+        dict((refdes, device) for refdes, device in devices.items()
+             if refdes in used), nets)
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+
+# electruth: a collection of boolean logic tools
+# Copyright (C) 2010, 2011  Niels Serup
+
+# This file is part of electruth.
+#
+# electruth is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# electruth is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with electruth.  If not, see <http://www.gnu.org/licenses/>.
+
+##[ Name        ]## electruth.simulate
+##[ Maintainer  ]## Niels Serup <ns@metanohi.org>
+##[ Description ]## Simulates the gates of netlists
+
+# The gates a set of nets depends on are compiled into a list of
+# operations ordered by level (the length of the longest path from a
+# starting net), each reading and writing slots of a list of net
+# values. A value is an integer in which every bit is a separate
+# vector of input values, as in BooleanBaseObject.test_bits, so one
+# pass simulates word_size vectors (or any other number) at once.
+# Every gate is simulated once, however many nets use its output.
+
+# After a full run, update simulates only the gates whose inputs have
+# changed, in order of level, and stops following a path as soon as a
+# gate's output stays the same.
+
+import heapq
+import electruth.booleanexpression as boolexpr
+import electruth.netlist as netlist
+
+class SimulatorError(Exception):
+    pass
+
+# The number of vectors simulated at once by default
+word_size = 64
+
+# How the generated code writes each operator (see booleanexpression)
+_operators = boolexpr._compiled_operators
+
+class Simulator(object):
+    """Simulates the gates that nets (e.g. the end nets of a
+    NetCollection) depend on"""
+
+    def __init__(self, nets):
+        order = netlist.topological_order(nets)
+        slots = dict((order[i], i) for i in range(len(order)))
+        starting = [x for x in order if x.get_output() is None]
+        self.inputs = [x.name for x in starting if x.constant is None]
+        self.outputs = [x.name for x in nets]
+        self._input_slots = dict((x.name, slots[x]) for x in starting
+                                 if x.constant is None)
+        self._constant_slots = [(slots[x], x.constant) for x in starting
+                                if x.constant is not None]
+        self._output_slots = [slots[x] for x in nets]
+
+        # Operations as (function, output slot, input slots), ordered
+        # by level
+        levels = [0] * len(order)
+        ops = []
+        for net in order:
+            gate = net.get_output()
+            if gate is None:
+                continue
+            inputs = [slots[x] for x in gate.get_input_nets()]
+            level = 1 + max(levels[x] for x in inputs)
+            levels[slots[net]] = level
+            ops.append((level, gate.func, slots[net], inputs))
+        ops.sort(key=lambda x: x[0])
+        self.depth = ops[-1][0] if ops else 0
+        self._ops = [x[1:] for x in ops]
+
+        # The operations reading each slot
+        self._users = [[] for x in order]
+        for i in range(len(self._ops)):
+            for x in self._ops[i][2]:
+                self._users[x].append(i)
+
+        self._compiled = None
+        self._values = None
+        self._mask = None
+        self.evaluated = 0 # Gates simulated by the last run or update
+
+    def _compile(self):
+        # One line per gate, like BooleanOperator.compile
+        lines = []
+        for func, output, inputs in self._ops:
+            symbol, inverted = _operators[func]
+            code = symbol.join('v[{}]'.format(x) for x in inputs)
+            if inverted:
+                code = 'm ^ ({})'.format(code)
+            lines.append('v[{}] = {}'.format(output, code))
+        lines.append('return v')
+        source = 'def simulate(v, m):\n    {}\n'.format('\n    '.join(lines))
+        namespace = {}
+        exec(compile(source, '<electruth simulator>', 'exec'), namespace)
+        return namespace['simulate']
+
+    def _outputs(self):
+        return dict((self.outputs[i], self._values[self._output_slots[i]])
+                    for i in range(len(self.outputs)))
+
+    def run(self, values, count=None):
+        """Simulate the gates for the values of the starting nets (a dict
+        of names and integers in which bit i is the value in vector i)
+        and return a dict of the names and values of the nets. count is
+        the number of vectors (word_size by default)."""
+        if count is None:
+            count = word_size
+        mask = (1 << count) - 1
+        state = [0] * len(self._users)
+        for slot, value in self._constant_slots:
+            state[slot] = mask if value else 0
+        for name, slot in self._input_slots.items():
+            try:
+                state[slot] = values[name] & mask
+            except KeyError:
+                raise SimulatorError('no value given for net {}'.format(
+                        name))
+        if self._compiled is None:
+            self._compiled = self._compile()
+        self._values = self._compiled(state, mask)
+        self._mask = mask
+        self.evaluated = len(self._ops)
+        return self._outputs()
+
+    def update(self, values):
+        """Change the values of some starting nets after run and return a
+        dict of the names and new values of the nets that changed. Only
+        the gates depending on the changed nets are simulated."""
+        if self._values is None:
+            raise SimulatorError('update needs a full run first')
+        state = self._values
+        mask = self._mask
+        ops = self._ops
+        users = self._users
+        pending = []
+        scheduled = set()
+        changed = set()
+        for name, value in values.items():
+            try:
+                slot = self._input_slots[name]
+            except KeyError:
+                raise SimulatorError('{} is not a starting net'.format(name))
+            value &= mask
+            if state[slot] != value:
+                state[slot] = value
+                changed.add(slot)
+                for i in users[slot]:
+                    if i not in scheduled:
+                        scheduled.add(i)
+                        heapq.heappush(pending, i)
+        evaluated = 0
+        bitwise = boolexpr._bitwise_operator_types
+        while pending:
+            i = heapq.heappop(pending)
+            func, output, inputs = ops[i]
+            value = bitwise[func](mask, *[state[x] for x in inputs])
+            evaluated += 1
+            if value != state[output]:
+                state[output] = value
+                changed.add(output)
+                for j in users[output]:
+                    if j not in scheduled:
+                        scheduled.add(j)
+                        heapq.heappush(pending, j)
+        self.evaluated = evaluated
+        return dict((self.outputs[i], state[self._output_slots[i]])
+                    for i in range(len(self.outputs))
+                    if self._output_slots[i] in changed)
+
+    def get_value(self, name):
+        """Return the value of a starting net or an observed net after
+        run"""
+        if self._values is None:
+            raise SimulatorError('nothing has been simulated yet')
+        if name in self._input_slots:
+            return self._values[self._input_slots[name]]
+        try:
+            return self._values[self._output_slots[self.outputs.index(
+                        name)]]
+        except ValueError:
+            raise SimulatorError('{} is not simulated'.format(name))
+
+    def run_vectors(self, vectors):
+        """Simulate an iterable of vectors (dicts of starting net names
+        and bools), word_size at a time, yielding a dict of net names
+        and bools for each"""
+        vectors = iter(vectors)
+        while True:
+            chunk = []
+            for x in vectors:
+                chunk.append(x)
+                if len(chunk) == word_size:
+                    break
+            if not chunk:
+                return
+            values = {}
+            for name in self.inputs:
+                word = 0
+                for i in range(len(chunk)):
+                    try:
+                        if chunk[i][name]:
+                            word |= 1 << i
+                    except KeyError:
+                        raise SimulatorError(
+                            'no value given for net {}'.format(name))
+                values[name] = word
+            outputs = self.run(values, len(chunk))
+            for i in range(len(chunk)):
+                yield dict((name, bool(outputs[name] >> i & 1))
+                           for name in self.outputs)
+            if len(chunk) < word_size:
+                return
@@ -23,7 +23,14 @@
 ##[ Description ]## Controls truth tables
 
 import math
+import gzip
+import bz2
+try:
+    import lzma
+except ImportError:
+    lzma = None
 import electruth.booleanexpression as boolexpr
+import electruth.minimize as minimize
 
 def decimal_to_binary(dec, min_size=None):
     if dec == 0:
@@ -35,163 +42,528 @@ def decimal_to_binary(dec, min_size=None):
         string = '0' * (min_size - len(string)) + string
     return string
 
+def variable_columns(count):
+    """Return a packed bit vector for each of count input variables.
+
+    Bit i of a column is the value of that variable in row i, the first
+    variable being the most significant bit of the row number (as in
+    decimal_to_binary)."""
+    rows = 1 << count
+    columns = []
+    for i in range(count):
+        width = 1 << (count - 1 - i)
+        column = ((1 << width) - 1) << width
+        period = width * 2
+        while period < rows:
+            column |= column << period
+            period *= 2
+        columns.append(column)
+    return columns
+
+def _iter_bits(bits):
+    """Yield the positions of the set bits of an integer, lowest first"""
+    text = bin(bits)[:1:-1]
+    i = text.find('1')
+    while i != -1:
+        yield i
+        i = text.find('1', i + 1)
+
+class TruthtableError(Exception):
+    pass
+
+# With this many inputs or fewer, tables are minimized exactly by
+# default; wider tables use the heuristic minimizer.
+exact_size_limit = 16
+
+# Tables of expressions with more inputs than this are created from
+# binary decision diagrams instead of evaluating all 2^n rows.
+bitmap_size_limit = 20
+
+_minimization_methods = ('auto', 'qm', 'espresso')
+
+# Raw truth tables with up to this many inputs are read into packed
+# bitmaps (one bit per row and output); wider ones into lists of cubes.
+packed_size_limit = 24
+
+# Tables with up to this many inputs are minimized through an in-process
+# memo keyed by their canonical forms (see electruth.npn), so a function
+# seen before with other or negated inputs is not minimized again. The
+# memo remembers memo_size covers; 0 turns it off.
+memo_size_limit = 16
+memo_size = 1024
+_memo = None
+
+# Cells in raw truth tables with these values are don't-cares
+_dont_care_markers = ('x', 'X', '-')
+
+# Compressed raw truth tables are recognized by their first bytes
+_compression_formats = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bzip2'),
+    (b'\xfd7zXZ\x00', 'xz')
+)
+
+def _cube_to_row(cube, size):
+    value, mask = cube
+    row = []
+    for i in range(size):
+        bit = 1 << (size - 1 - i)
+        if mask & bit:
+            row.append(bool(value & bit))
+        else:
+            row.append(None)
+    return row
+
+def _cubes_to_bitmap(cubes, size):
+    # The bits are set in a bytearray, row r being bit r % 8 of byte
+    # r // 8 (as in iter_raw_truthtable). The lowest three variables of
+    # a cube give the bits it sets in each byte, and the others the
+    # bytes it sets them in; those are set a slice at a time, along the
+    # longest run of free variables, so the time taken is about the
+    # number of rows covered rather than 2^n for every variable.
+    data = bytearray(((1 << size) + 7) >> 3)
+    low = min(size, 3)
+    high = size - low
+    low_mask = (1 << low) - 1
+    tables = {}
+    for value, mask in cubes:
+        byte = 0
+        for m in minimize.iter_cube_minterms(
+                (value & mask & low_mask, mask & low_mask), low):
+            byte |= 1 << m
+        if byte not in tables:
+            tables[byte] = bytes(x | byte for x in range(256))
+        table = tables[byte]
+        value = (value & mask) >> low
+        mask >>= low
+        start = length = best_start = best_length = 0
+        for i in range(high + 1):
+            if i < high and not mask & (1 << i):
+                length += 1
+                continue
+            if length > best_length:
+                best_start, best_length = start, length
+            start, length = i + 1, 0
+        step = 1 << best_start
+        span = step << best_length
+        run = ((1 << best_length) - 1) << best_start
+        for first in minimize.iter_cube_minterms((value, mask | run), high):
+            data[first:first + span:step] = \
+                data[first:first + span:step].translate(table)
+    return int.from_bytes(data, 'little')
+
+def _cubes_to_minterms(cubes, size):
+    minterms = set()
+    for x in cubes:
+        minterms.update(minimize.iter_cube_minterms(x, size))
+    return sorted(minterms)
+
+def _row_to_cube(row):
+    value = mask = 0
+    for x in row:
+        value <<= 1
+        mask <<= 1
+        if x is not None:
+            mask |= 1
+            if x:
+                value |= 1
+    return (value, mask)
+
 class Truthtable(object):
-    """A truthtable with only one output"""
-    def __init__(self, names, rows):
+    """A truthtable with only one output
+
+    The rows for which the output is true can be given in one of three
+    ways: as a list of rows (each row a list of True, False or None,
+    None meaning both), as onset, a packed bitmap with bit i set if row
+    i is true, or as a list of cubes (see electruth.minimize). Cubes
+    never require all 2^n rows to be listed, so they are preferable for
+    tables with many inputs.
+
+    Rows for which the output does not matter can be given as a list of
+    cubes in dontcares or as a packed bitmap in dcset. The minimizers
+    use them to find shorter expressions, but never add a product that
+    is only true for don't-care rows.
+
+    onset and dcset can also be bytes-like objects, row r being bit
+    r % 8 of byte r // 8 (such as views of the bitmaps of a binary truth
+    table, see electruth.binarytable); they are only turned into
+    integers when first used."""
+    def __init__(self, names, rows=None, onset=None, cubes=None,
+                 dontcares=None, dcset=None):
         self.names = names
-        self.rows = rows
-
-    def shorten(self):
-        return _shorten_truthtable(self).ungroup()
-
-def parse_raw_truthtable(path, delimiter='\t', shorten=True):
-    outputs = []
-    input_numbers = []
-    output_numbers = []
-    input_names = []
-    output_names = []
-
-    f = open(path, 'r')
-
-    i = 0
-    for name in f.readline().strip().split(delimiter):
-        tmp = ''
-        if name.startswith('<'):
-            input_names.append(name[1:])
-            input_numbers.append(i)
-        elif name.startswith('>'):
-            output_names.append(name[1:])
-            output_numbers.append(i)
-            outputs.append([])
-        i += 1
-    for line in f:
-        data = [int(x) for x in line.strip().split(delimiter)]
-
-        c = 0
-        for i in output_numbers:
-            if data[i]:
-                t = []
-                for j in input_numbers:
-                    t.append((j, data[j]))
-                outputs[c].append(t)
-            c += 1
-    f.close()
-    
+        self._onset = onset
+        self._cubes = cubes
+        self._dontcares = dontcares
+        self._dcset = dcset
+        if rows is not None:
+            self._cubes = [_row_to_cube(x) for x in rows]
+        elif onset is None and cubes is None:
+            self._cubes = []
+        if dontcares is None and dcset is None:
+            self._dontcares = []
+
+    def __getstate__(self):
+        # Buffers cannot be pickled
+        if self._onset is not None:
+            self.onset
+        if self._dcset is not None:
+            self.dcset
+        return self.__dict__
+
+    @property
+    def rows(self):
+        return [_cube_to_row(x, len(self.names)) for x in self.cubes]
+
+    @property
+    def cubes(self):
+        if self._cubes is None:
+            full = (1 << len(self.names)) - 1
+            self._cubes = [(m, full) for m in _iter_bits(self.onset)]
+        return self._cubes
+
+    @property
+    def dontcares(self):
+        if self._dontcares is None:
+            full = (1 << len(self.names)) - 1
+            self._dontcares = [(m, full) for m in _iter_bits(self.dcset)]
+        return self._dontcares
+
+    @property
+    def onset(self):
+        if self._onset is None:
+            self._onset = _cubes_to_bitmap(self._cubes, len(self.names))
+        elif not isinstance(self._onset, int):
+            self._onset = int.from_bytes(self._onset, 'little')
+        return self._onset
+
+    @property
+    def dcset(self):
+        if self._dcset is None:
+            self._dcset = _cubes_to_bitmap(self._dontcares, len(self.names))
+        elif not isinstance(self._dcset, int):
+            self._dcset = int.from_bytes(self._dcset, 'little')
+        return self._dcset
+
+    def minterms(self):
+        """Return the numbers of the rows for which the output is true"""
+        if self._onset is not None:
+            return list(_iter_bits(self.onset))
+        return _cubes_to_minterms(self._cubes, len(self.names))
+
+    def dc_minterms(self):
+        """Return the numbers of the rows for which the output does not
+        matter"""
+        if self._dcset is not None:
+            return list(_iter_bits(self.dcset))
+        return _cubes_to_minterms(self._dontcares, len(self.names))
+
+    def shorten(self, method=None, time_limit=None):
+        """Create a short sum-of-products expression of the table.
+
+        method can be 'qm' (exact, Quine-McCluskey), 'espresso'
+        (heuristic, for many inputs) or 'auto' (the default), which uses
+        'qm' for tables with up to exact_size_limit inputs. time_limit
+        limits the time spent by 'espresso', in seconds."""
+        return _shorten_truthtable(self, method, time_limit).ungroup()
+
+def _compression(path):
+    # Return the kind of compression of a file, or None
+    with open(path, 'rb') as f:
+        start = f.read(6)
+    for magic, kind in _compression_formats:
+        if start.startswith(magic):
+            return kind
+    return None
+
+def _open_text(path, mode='rt'):
+    # Open a file for reading text (or bytes, with mode 'rb'),
+    # decompressing it if needed
+    kind = _compression(path)
+    if kind is None:
+        return open(path, mode)
+    if kind == 'gzip':
+        return gzip.open(path, mode)
+    if kind == 'bzip2':
+        return bz2.open(path, mode)
+    if lzma is None:
+        raise TruthtableError('{} is xz-compressed, but lzma is not \
+available'.format(path))
+    return lzma.open(path, mode)
+
+def _parse_cell(cell):
+    cell = cell.strip()
+    if cell in _dont_care_markers:
+        return None
+    return int(cell) != 0
+
+def iter_raw_truthtable(path, delimiter='\t', outputs=None):
+    """Read a file of tab- or comma-separated values (see
+    parse_raw_truthtable), which may be compressed with gzip, bzip2 or
+    xz. Yields an (output name, Truthtable) pair for each output (or
+    for each output in outputs), one at a time.
+
+    The file is read one line at a time and each row is packed into an
+    integer right away. Tables with up to packed_size_limit inputs are
+    kept as bitmaps with a bit per row; wider ones as lists of cubes of
+    the rows that are true or don't-cares."""
+    with _open_text(path) as f:
+        input_numbers = []
+        input_names = []
+        columns = []
+        for i, name in enumerate(f.readline().strip().split(delimiter)):
+            name = name.strip()
+            if name.startswith('<'):
+                input_names.append(name[1:])
+                input_numbers.append(i)
+            elif name.startswith('>') and \
+                    (outputs is None or name[1:] in outputs):
+                columns.append((i, name[1:]))
+        size = len(input_names)
+        packed = size <= packed_size_limit
+        if packed:
+            length = ((1 << size) + 7) >> 3
+            ons = [bytearray(length) for x in columns]
+            dcs = [bytearray(length) for x in columns]
+        else:
+            ons = [[] for x in columns]
+            dcs = [[] for x in columns]
+        full = (1 << size) - 1
+        if input_numbers == list(range(size)):
+            # Inputs first, the usual case
+            first, last = 0, size
+        else:
+            first = last = None
+
+        for line in f:
+            cells = line.strip().split(delimiter)
+            if len(cells) <= 1 and not cells[0]:
+                continue
+            if first is not None:
+                bits = ''.join(cells[first:last])
+            else:
+                bits = ''.join([cells[j] for j in input_numbers])
+            # Cells of one 0 or 1 each can be read in one go
+            if len(bits) == size and not bits.strip('01'):
+                cube = int(bits, 2) if size else 0, full
+            else:
+                cube = _row_to_cube(_parse_cell(cells[j])
+                                    for j in input_numbers)
+            for c in range(len(columns)):
+                cell = cells[columns[c][0]]
+                if cell == '0':
+                    continue
+                if cell == '1':
+                    store = ons[c]
+                else:
+                    value = _parse_cell(cell)
+                    if value is None:
+                        store = dcs[c]
+                    elif value:
+                        store = ons[c]
+                    else:
+                        continue
+                if not packed:
+                    store.append(cube)
+                elif cube[1] == full:
+                    store[cube[0] >> 3] |= 1 << (cube[0] & 7)
+                else:
+                    for m in minimize.iter_cube_minterms(cube, size):
+                        store[m >> 3] |= 1 << (m & 7)
+
+    for c in range(len(columns)):
+        # Only convert (and keep) one output at a time
+        on, dc = ons[c], dcs[c]
+        ons[c] = dcs[c] = None
+        if packed:
+            table = Truthtable(input_names,
+                               onset=int.from_bytes(on, 'little'),
+                               dcset=int.from_bytes(dc, 'little'))
+        else:
+            table = Truthtable(input_names, cubes=on, dontcares=dc)
+        del on, dc
+        yield columns[c][1], table
+
+def parse_raw_truthtable(path, delimiter='\t', shorten=True,
+                         method=None, time_limit=None, multi_output=False):
+    """Parse a file of tab- or comma-separated values. The first line
+    names the columns, inputs prefixed with '<' and outputs with '>'.
+    Returns a dict of output names and Truthtable objects, or of output
+    names and expressions if shorten is true.
+
+    Cells can be don't-cares (x or -). A don't-care input makes the row
+    stand for both values of the input; a don't-care output means the
+    output may be either value for the row. The file may be compressed
+    (see iter_raw_truthtable).
+
+    If multi_output is true, all outputs are shortened together so that
+    they can share products (see shorten_truthtables)."""
+    if shorten and multi_output:
+        return shorten_truthtables(
+            dict(iter_raw_truthtable(path, delimiter)), method, time_limit)
     final = {}
-    for i in range(len(outputs)):
-        t = []
-        for x in outputs[i]:
-            tt = []
-            t.append(tt)
-            for y in x:
-                tt.append(None)
-            for y in x:
-                tt[y[0]] = bool(y[1])
+    for name, table in iter_raw_truthtable(path, delimiter):
         if shorten:
-            final[output_names[i]] = Truthtable(input_names, t).shorten()
+            final[name] = table.shorten(method, time_limit)
         else:
-            final[output_names[i]] = Truthtable(input_names, t)
+            final[name] = table
     return final
 
+def shorten_truthtables(tables, method=None, time_limit=None):
+    """Shorten several tables of the same inputs together. tables is a
+    dict of output names and Truthtables; a dict of output names and
+    sum-of-products expressions is returned. Products that are useful
+    to more than one output are found once and shared, so the
+    expressions form one DAG (see create_from_shared_cubes).
+
+    method is as for Truthtable.shorten; 'qm' finds the multi-output
+    prime implicants, while 'espresso' minimizes each output on its own
+    and then shares every product among all the outputs it is an
+    implicant of (see minimize.multi_output_espresso)."""
+    output_names = list(tables)
+    if not output_names:
+        return {}
+    products, covers = _minimize_truthtables(tables, method, time_limit)
+    exprs = create_from_shared_cubes(tables[output_names[0]].names,
+                                     products, covers)
+    return dict((output_names[i], exprs[i].ungroup())
+                for i in range(len(output_names)))
+
+def _minimize_truthtables(tables, method=None, time_limit=None):
+    # Return the shared products and the covers of a non-empty dict of
+    # tables (in its order), as for shorten_truthtables
+    output_names = list(tables)
+    names = tables[output_names[0]].names
+    for x in output_names:
+        if list(tables[x].names) != list(names):
+            raise TruthtableError('output {} does not have the inputs \
+{}'.format(x, ', '.join(names)))
+    size = len(names)
+    method = _get_minimization_method(method, size)
+    if method == 'qm':
+        return minimize.multi_output_quine_mccluskey(
+            size, [tables[x].minterms() for x in output_names],
+            [tables[x].dc_minterms() for x in output_names])
+    return minimize.multi_output_espresso(
+        size, [tables[x].cubes for x in output_names],
+        [tables[x].dontcares for x in output_names], time_limit)
+
 def create_from_expression(expr):
     input_names = expr.get_variables()
-    inlen = len(input_names)
-    rows = []
-    for i in range(2 ** inlen):
-        test_list = [bool(int(x)) for x in
-                     list(decimal_to_binary(i, inlen))]
-        test_dict = {}
-        for i in range(inlen):
-            test_dict[input_names[i]] = test_list[i]
-
-        if expr.test(**test_dict):
-            rows.append(test_list)
-    return Truthtable(input_names, rows)
-
-
-def _shorten_truthtable(table):
-    reqs = table.rows
-    while True:
-        nreqs = _shorten(reqs)
-        ok = False
-        if len(nreqs) == len(reqs):
-            ok = True
-            for i in range(len(reqs)):
-                for j in range(len(reqs[i])):
-                    if nreqs[i][j] != reqs[i][j]:
-                        ok = False
-                        break
-                if not ok:
-                    break
-        reqs = nreqs
-        if ok:
-            # It cannot be shortened any further
-            break
+    if len(input_names) > bitmap_size_limit:
+        return expr.create_bdd().to_truthtable(input_names)
+    # Every input is a packed column of all 2^n rows, so each operator
+    # is evaluated only once for the whole table.
+    mask = (1 << (1 << len(input_names))) - 1
+    columns = dict(zip(input_names, variable_columns(len(input_names))))
+    return Truthtable(input_names, onset=expr.test_bits(mask, **columns))
+
+
+def _get_minimization_method(method, size):
+    if method is None or method == 'auto':
+        return 'qm' if size <= exact_size_limit else 'espresso'
+    if method not in _minimization_methods:
+        raise TruthtableError('minimization method {} does not \
+exist'.format(method))
+    return method
+
+def get_memo():
+    """Return the electruth.npn.Memo used by Truthtable.shorten, or None
+    if memo_size is 0"""
+    global _memo
+    if memo_size <= 0:
+        return None
+    if _memo is None:
+        import electruth.npn as npn
+        _memo = npn.Memo(memo_size)
+    _memo.size = memo_size
+    return _memo
+
+def _minimize_truthtable(table, method=None, time_limit=None):
+    size = len(table.names)
+    method = _get_minimization_method(method, size)
+    memo = get_memo() if size <= memo_size_limit else None
+    if memo is None:
+        return _run_minimizer(table, method, time_limit)
+    if method != 'espresso':
+        time_limit = None
+    def minimizer(onset, dcset):
+        return _run_minimizer(Truthtable(table.names, onset=onset,
+                                         dcset=dcset), method, time_limit)
+    return memo.minimize(size, table.onset, table.dcset,
+                         (method, time_limit), minimizer)
+
+def _run_minimizer(table, method, time_limit):
+    size = len(table.names)
+    if method == 'qm':
+        return minimize.quine_mccluskey(size, table.minterms(),
+                                        table.dc_minterms())
+    return minimize.espresso(size, table.cubes, table.dontcares,
+                             time_limit)
 
+def _shorten_truthtable(table, method=None, time_limit=None):
+    import electruth.cache as cache
+    current = cache.get_cache()
+    if current is not None:
+        cubes = current.minimize(table, method, time_limit)
+    else:
+        cubes = _minimize_truthtable(table, method, time_limit)
+    return create_from_cubes(table.names, cubes)
+
+def create_from_cubes(names, cubes):
+    """Create a sum-of-products expression from a list of cubes (see
+    electruth.minimize)"""
+    if not cubes:
+        return boolexpr.BooleanConstant(False)
     inputs = []
-    for x in table.names:
+    for x in names:
         inputs.append(boolexpr.BooleanVariable(x))
 
+    size = len(names)
     or_objs = []
-    for x in reqs:
+    for value, mask in cubes:
+        if mask == 0:
+            return boolexpr.BooleanConstant(True)
         and_objs = []
-        for i in range(len(x)):
-            if x[i] is True:
-                and_objs.append(inputs[i])
-            elif x[i] is False:
-                and_objs.append(boolexpr.BooleanOperator(
-                        boolexpr.NOT, inputs[i]))
+        for i in range(size):
+            bit = 1 << (size - 1 - i)
+            if mask & bit:
+                if value & bit:
+                    and_objs.append(inputs[i])
+                else:
+                    and_objs.append(boolexpr.BooleanOperator(
+                            boolexpr.NOT, inputs[i]))
         or_objs.append(boolexpr.BooleanOperator(boolexpr.AND, *and_objs))
     expr = boolexpr.BooleanOperator(boolexpr.OR, *or_objs)
     return expr
 
-def _shorten(reqs):
-    nreqs = []
-    i = 0
-    for x in reqs:
-        i += 1
-        close_matches = 0
-        for y in reqs[i:]:
-            found = None
-            nones = []
-            for j in range(len(x)):
-                if y[j] is not x[j]:
-                    if found is None:
-                        found = True
-                        place = j
-                    else:
-                        found = False
-                        break
-            if found is True:
-                temp = y[:]
-                temp[place] = None
-                nreqs.append(temp)
-                close_matches += 1
-        if close_matches == 0:
-            nreqs.append(x)
-
-    nnreqs = []
-    for x in nreqs:
-        if x not in nnreqs and (True in x or False in x):
-            nnreqs.append(x)
-    nreqs = nnreqs
-    nnreqs = []
-    ignore = []
-    for x in nreqs:
-        if x in ignore:
+def create_from_shared_cubes(names, products, covers):
+    """Create a sum-of-products expression for each cover in covers (a
+    list of indices into products, a list of cubes). Every product
+    becomes one AND operator, used by all the sums that include it."""
+    inputs = [boolexpr.BooleanVariable(x) for x in names]
+    size = len(names)
+    terms = []
+    for value, mask in products:
+        if mask == 0:
+            terms.append(boolexpr.BooleanConstant(True))
             continue
-        ignore.append(x)
-        for y in nreqs:
-            if y in ignore:
-                continue
-            is_duplicate = True
-            for j in range(len(x)):
-                if x[j] is not None and x[j] != y[j]:
-                    is_duplicate = False
-                    break
-            if is_duplicate:
-                ignore.append(y)
-        nnreqs.append(x)
-    
-    return nnreqs
-
+        and_objs = []
+        for i in range(size):
+            bit = 1 << (size - 1 - i)
+            if mask & bit:
+                if value & bit:
+                    and_objs.append(inputs[i])
+                else:
+                    and_objs.append(boolexpr.BooleanOperator(
+                            boolexpr.NOT, inputs[i]))
+        terms.append(boolexpr.BooleanOperator(boolexpr.AND, *and_objs))
+    exprs = []
+    for cover in covers:
+        objs = [terms[i] for i in cover]
+        if not objs:
+            exprs.append(boolexpr.BooleanConstant(False))
+        elif any(x.is_constant for x in objs):
+            exprs.append(boolexpr.BooleanConstant(True))
+        else:
+            exprs.append(boolexpr.BooleanOperator(boolexpr.OR, *objs))
+    return exprs
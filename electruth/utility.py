@@ -23,17 +23,32 @@
 ##[ Description ]## Controls the actions of the command-line utility
 
 import os
+import time
 from electruth.settingsparser import SettingsParser
 import electruth.various as various
 import electruth.generalinformation as ginfo
 import electruth.booleanexpression as boolexpr
 import electruth.truthtable as truthtable
+import electruth.binarytable as binarytable
 import electruth.netlist as netlist
+import electruth.parallel as parallel
+import electruth.cache as cache
+import electruth.incremental as incremental
+
+# Filename endings of compressed files; the ending before it tells the
+# type (e.g. table.csv.gz)
+_compressed_endings = ('gz', 'bz2', 'xz')
+
+def _endings(ending):
+    return ', '.join([ending] + [ending + '.' + x
+                                 for x in _compressed_endings])
 
 _available_types = (
     ('Boolean expression', 'expr', 'none (given directly)'),
-    ('Truthtable (tab-separated)', 'tsv', '.tsv'),
-    ('Truthtable (comma-separated)', 'csv', '.csv'),
+    ('Truthtable (tab-separated)', 'tsv', _endings('.tsv')),
+    ('Truthtable (comma-separated)', 'csv', _endings('.csv')),
+    ('Truthtable (binary, see electruth.binarytable)', 'ettb',
+     _endings('.ettb')),
     ('Schematic (from gschem, using \'gnetlist -g geda\')',
      'sch', '.sch'),
     ('Netlist (only output from \'gnetlist -g geda\' is \
@@ -44,7 +59,15 @@ _config_file_translations = {
     'verbose': 'term_verbose',
     'color errors': 'term_color_errors',
     'auto compare': 'auto_compare',
-    'express': 'express_type'
+    'express': 'express_type',
+    'minimizer': 'minimizer',
+    'time limit': 'time_limit',
+    'statistics': 'statistics',
+    'multi output': 'multi_output',
+    'jobs': 'jobs',
+    'cache': 'cache_path',
+    'cache size': 'cache_size',
+    'watch': 'watch'
 }
 
 class Utility(SettingsParser):
@@ -57,10 +80,40 @@ class Utility(SettingsParser):
         self.set_if_nil('term_color_errors', True)
         self.set_if_nil('auto_compare', True)
         self.set_if_nil('express_type', 'basic')
+        self.set_if_nil('minimizer', 'auto')
+        self.set_if_nil('time_limit', None)
+        self.set_if_nil('statistics', False)
+        self.set_if_nil('multi_output', False)
+        self.set_if_nil('watch', False)
+        if self.minimizer not in truthtable._minimization_methods:
+            self.error('minimization method {} does not exist'.format(
+                    self.minimizer), True)
+        if self.time_limit is not None:
+            self.time_limit = float(self.time_limit)
+        self.set_if_nil('jobs', 1)
+        try:
+            self.jobs = int(self.jobs)
+        except ValueError:
+            self.jobs = 0
+        if self.jobs < 1:
+            self.error('the number of jobs must be a positive integer',
+                       True)
+        self.set_if_nil('cache_path', None)
+        self.set_if_nil('cache_size', 64)
+        self.cache = None
+        if self.cache_path is not None:
+            try:
+                self.cache = cache.Cache(os.path.expanduser(self.cache_path),
+                                         int(float(self.cache_size) * 2**20))
+            except cache.CacheError as e:
+                self.error(str(e), True)
 
         self.do_compare = len(self.inputs) > 1 and self.auto_compare
 
         self.exprs = []
+        # Netlist paths and their electruth.incremental.Analysis objects,
+        # so that reloading a netlist only simplifies changed end nets
+        self.analyses = {}
 
     def error(self, msg, done=None):
         if self.term_verbose:
@@ -69,6 +122,10 @@ class Utility(SettingsParser):
     def status(self, msg):
         print(ginfo.program_name + ': ' + msg)
 
+    def statistic(self, msg):
+        if self.statistics:
+            self.status(msg)
+
     def add_expression(self, o_name, expr):
         if self.do_compare:
             name = o_name + '_0'
@@ -86,6 +143,13 @@ class Utility(SettingsParser):
             self.add_expression(key, val)
 
     def start(self):
+        cache.set_cache(self.cache)
+        self.analyze()
+        if self.watch:
+            self.watch_inputs()
+
+    def analyze(self):
+        self.exprs = []
         self.load_inputs()
         try:
             self.exprs.sort()
@@ -93,31 +157,109 @@ class Utility(SettingsParser):
             self.error('when not comparing, names must differ', True)
         self.print_exprs()
 
+    def watch_inputs(self):
+        # Analyze the inputs again whenever one of the files changes,
+        # until interrupted
+        paths = [x[1] for x in self.inputs if os.path.isfile(x[1])]
+        if not paths:
+            self.error('there are no files to watch', True)
+        with incremental.FileWatcher(paths) as watcher:
+            self.statistic('watching {} {}'.format(
+                    ', '.join(paths), 'with inotify' if watcher.uses_inotify
+                    else 'by polling'))
+            while True:
+                changed = watcher.wait()
+                print()
+                self.status('{} changed'.format(', '.join(changed)))
+                try:
+                    self.analyze()
+                except Exception as e:
+                    self.error(str(e))
+
     def load_inputs(self):
+        # Shortening is submitted to a pool of worker processes, and the
+        # results are collected in the order of the inputs
+        pending = []
+        with parallel.Pool(self.jobs) as pool:
+            for x in self.inputs:
+                start_time = time.time()
+                data = self.load_input(x[0], x[1], pool, pending)
+                self.statistic('loaded {} in {:.3f} s'.format(
+                        data, time.time() - start_time))
+            start_time = time.time()
+            for name, result in pending:
+                if name is None:
+                    self.add_expressions(**result.get())
+                else:
+                    self.add_expression(name, result.get())
+            if self.cache is not None:
+                for data, analysis in self.analyses.items():
+                    analysis.save(self.cache, os.path.abspath(data))
+            if pool.jobs > 1:
+                self.statistic('waited {:.3f} s for {} workers'.format(
+                        time.time() - start_time, pool.jobs))
+
+    def load_input(self, typ, data, pool, pending):
         # inputs are in the form [type, path/expression]
-        for x in self.inputs:
-            typ = x[0]
-            data = x[1]
-
-            if typ == 'tsv':
-                self.add_expressions(**truthtable.parse_raw_truthtable(data, '\t'))
-            elif typ == 'csv':
-                self.add_expressions(**truthtable.parse_raw_truthtable(data, ','))
-            elif typ == 'net':
-                self.add_expressions(
-                    **netlist.parse_geda_netlist(data, True))
-            elif typ == 'sch':
-                self.add_expressions(
-                    **netlist.parse_geda_netlist_from_schematic(data, True))
+        if typ in _compressed_endings:
+            inner = os.path.splitext(os.path.splitext(
+                    os.path.basename(data))[0])[1]
+            if not inner:
+                self.error('the type of {} is unknown; give it with \
+--type'.format(data), True)
+            typ = inner[1:]
+
+        if typ in ('tsv', 'csv', 'ettb'):
+            # Outputs are read and submitted one at a time
+            if typ == 'ettb':
+                with binarytable.BinaryTable(data) as table:
+                    self.load_tables(((name, table.get_truthtable(name))
+                                      for name in table.outputs),
+                                     pool, pending)
             else:
-                if '=' in data:
-                    spl = data.split('=')
-                    data = spl[1]
-                    name = spl[0]
-                else:
-                    name = 'unnamed-expression'
-                self.add_expression(
-                    name, boolexpr.parse_raw_expression(data, False, True))
+                self.load_tables(truthtable.iter_raw_truthtable(
+                        data, '\t' if typ == 'tsv' else ','), pool, pending)
+        elif typ in ('net', 'sch'):
+            if typ == 'net':
+                coll = netlist.parse_geda_netlist(data)
+            else:
+                coll = netlist.parse_geda_netlist_from_schematic(data)
+            self.statistic('parsed {} nets of {} in {:.3f} s'.format(
+                    len(coll.nets), data, coll.parse_time))
+            analysis = self.analyses.get(data)
+            if analysis is None:
+                analysis = incremental.Analysis(self.minimizer,
+                                                self.time_limit)
+                # The results of earlier runs are kept in the cache
+                if self.cache is not None:
+                    analysis.load(self.cache, os.path.abspath(data))
+                self.analyses[data] = analysis
+            results = analysis.submit(coll, pool)
+            self.statistic('{} of {} end nets of {} changed'.format(
+                    len(analysis.changed), len(results), data))
+            pending.extend(results)
+        else:
+            if '=' in data:
+                spl = data.split('=')
+                data = spl[1]
+                name = spl[0]
+            else:
+                name = 'unnamed-expression'
+            pending.append((name, pool.simplify(
+                        boolexpr.parse_raw_expression(data),
+                        self.minimizer, self.time_limit)))
+        return data
+
+    def load_tables(self, tables, pool, pending):
+        # tables yields (output name, Truthtable) pairs
+        if self.multi_output:
+            # Shortened together, so all outputs are needed at once
+            pending.append((None, pool.shorten_together(
+                        dict(tables), self.minimizer, self.time_limit)))
+        else:
+            for name, table in tables:
+                pending.append((name, pool.shorten(
+                            table, self.minimizer, self.time_limit)))
 
     def print_exprs(self):
         if not self.exprs:
@@ -130,7 +272,7 @@ class Utility(SettingsParser):
                 i = 1
                 for x in prevs[:-1]:
                     for y in prevs[i:]:
-                        print(' \'-', x[0], 'matches', y[0] + '?', x[2].match(y[2]))
+                        print(' \'-', x[0], 'matches', y[0] + '?', x[2].equivalent(y[2]))
                     i += 1
                 print
 
@@ -147,4 +289,12 @@ class Utility(SettingsParser):
         maybe_compare()
 
     def end(self):
-        pass
+        memo = truthtable.get_memo()
+        if memo is not None and memo.hits + memo.misses:
+            self.statistic('memo: {} hits, {} misses'.format(
+                    memo.hits, memo.misses))
+        if self.cache is not None:
+            self.statistic('cache: {} hits, {} misses'.format(
+                    self.cache.hits, self.cache.misses))
+            cache.set_cache(None)
+            self.cache.close()
@@ -32,6 +32,9 @@ try:
 except ImportError:
     from electruth.external.termcolor import colored
 
+def nothing(*args, **kwds):
+    pass
+
 def error(msg, done=None, pre=None, **kwds):
     errstr = str(msg) + '\n'
     if pre is not None:
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+This example checks the parser of raw expressions: random expressions
+of several operators are parsed and compared, row by row, with a
+direct reading of their precedence rules (NOT, then AND and NAND, then
+XOR and XNOR, then OR and NOR, each level read from left to right, and
+a chain of one AND, NAND, OR or NOR one operator of all its objects).
+Malformed expressions must be refused, and very deep ones must not hit
+the recursion limit.
+"""
+import random
+import itertools
+
+# Import electruth submodules needed for this example
+import electruth.booleanexpression as b
+
+random.seed(10)
+
+levels = (('or', 'nor'), ('xor', 'xnor'), ('and', 'nand'))
+names = ['A', 'B', 'C', 'D']
+
+def random_tokens(depth):
+    if depth == 0 or random.random() < 0.25:
+        tokens = [random.choice(names + ['0', '1'])]
+    elif random.random() < 0.3:
+        tokens = ['(', *random_tokens(depth - 1), ')']
+    else:
+        tokens = random_tokens(depth - 1)
+        for i in range(random.randint(1, 3)):
+            tokens += [random.choice(sum(levels, ()))] + \
+                random_tokens(depth - 1)
+    if random.random() < 0.2:
+        tokens = ['not'] + tokens
+    return tokens
+
+def evaluate(tokens, row):
+    # Read the tokens by their precedence, level by level
+    pos = 0
+    def level(i):
+        nonlocal pos
+        if i == len(levels):
+            token = tokens[pos]
+            pos += 1
+            if token == 'not':
+                return not level(i)
+            if token == '(':
+                value = level(0)
+                pos += 1
+                return value
+            if token in ('0', '1'):
+                return token == '1'
+            return row[token]
+        value = level(i + 1)
+        while pos < len(tokens) and tokens[pos] in levels[i]:
+            name = tokens[pos]
+            values = [value]
+            while pos < len(tokens) and tokens[pos] == name:
+                pos += 1
+                values.append(level(i + 1))
+                if name in ('xor', 'xnor'):
+                    break
+            if name == 'and':
+                value = all(values)
+            elif name == 'nand':
+                value = not all(values)
+            elif name == 'or':
+                value = any(values)
+            elif name == 'nor':
+                value = not any(values)
+            elif name == 'xor':
+                value = values[0] != values[1]
+            else:
+                value = values[0] == values[1]
+        return value
+    return level(0)
+
+tested = 0
+for i in range(300):
+    tokens = random_tokens(4)
+    expr = b.parse_raw_expression(' '.join(tokens), always_return_op=True)
+    for values in itertools.product((False, True), repeat=len(names)):
+        row = dict(zip(names, values))
+        used = dict((x, row[x]) for x in expr.get_variables())
+        if expr.test(**used) != evaluate(tokens, row):
+            raise Exception('wrong parse of {}: {}'.format(
+                    ' '.join(tokens), expr))
+    tested += 1
+print('Checked {} expressions'.format(tested))
+
+# Exact shapes
+for text, shape in (('A or B and C', 'or(A, and(B, C))'),
+                    ('A xor B xor C', 'xor(C, xor(A, B))'),
+                    ('A nor B nor C', 'nor(A, B, C)'),
+                    ('A nand B and C', 'and(C, nand(A, B))'),
+                    ('not not A', 'A'),
+                    ('((A))', 'A'),
+                    ('A & B | !C', 'or(and(A, B), not(C))')):
+    if str(b.parse_raw_expression(text)) != shape:
+        raise Exception('{} is not {}'.format(text, shape))
+
+for text in ('', '()', '(A', 'A)', '(A))', '((A)', 'A and', 'or B',
+             'A B', 'A and ()', 'not', '( )'):
+    try:
+        b.parse_raw_expression(text)
+    except b.BooleanExpressionError:
+        pass
+    else:
+        raise Exception('{!r} was parsed'.format(text))
+print('Checked malformed expressions')
+
+depth = 100000
+if b.parse_raw_expression('(' * depth + 'A' + ')' * depth) is not \
+        b.BooleanVariable('A'):
+    raise Exception('wrong parse of a deep variable')
+text = ' and ('.join(('B', 'C') * (depth // 2)) + ' or A' + ')' * (depth - 1)
+expr = b.parse_raw_expression(text)
+if sum(1 for x in b._iter_postorder(expr) if x.is_operator) != depth:
+    raise Exception('wrong parse of a deep expression')
+print('Checked expressions {} levels deep'.format(depth))
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+This example checks the gate simulator against the logic of the nets:
+for the bundled netlist and for random netlists of logic gates, random
+vectors are simulated with run_vectors, run and update, and every
+value must be the one test_bits gives for the expression of that net.
+"""
+import os.path
+import random
+
+# Import electruth submodules needed for this example
+import electruth.netlist as nl
+import electruth.simulate as simulate
+
+random.seed(11)
+
+_filedir = os.path.dirname(os.path.realpath(__file__))
+
+# Devices and their first gate, as (input pins, output pin)
+gates = {
+    '4081': ((1, 2), 3),
+    '4071': ((1, 2), 3),
+    '4070': ((1, 2), 3),
+    '4069': ((1,), 2)
+}
+
+def random_netlist(inputs, count):
+    # Every gate is a component of its own, reading earlier nets
+    names = ['I{}'.format(i) for i in range(inputs)]
+    links = dict((x, []) for x in names)
+    devices = {}
+    for i in range(count):
+        refdes = 'U{}'.format(i + 1)
+        device = random.choice(sorted(gates))
+        devices[refdes] = device
+        pins, output = gates[device]
+        for pin in pins:
+            links[random.choice(names)].append((refdes, pin))
+        name = 'N{}'.format(i + 1)
+        names.append(name)
+        links[name] = [(refdes, output)]
+    # The last few nets are end nets, but may be used by other gates too
+    ends = set(names[-3:] + [random.choice(names[inputs:])])
+    nets = [('>' + x if x in ends else x, links[x]) for x in names
+            if links[x]]
+    return nl.create_net_collection(devices, nets)
+
+def check(coll, vectors):
+    simulator = coll.get_simulator()
+    exprs = coll.get_logic_dag()
+    count = len(vectors)
+    mask = (1 << count) - 1
+    def columns():
+        return dict((x, sum(1 << i for i in range(count)
+                            if vectors[i][x]))
+                    for x in simulator.inputs)
+    def expected():
+        current = columns()
+        return dict((x, exprs[x].test_bits(
+                    mask, **dict((y, current[y])
+                                 for y in exprs[x].get_variables())))
+                    for x in simulator.outputs)
+    values = expected()
+    for i, result in enumerate(simulator.run_vectors(vectors)):
+        for name in simulator.outputs:
+            if result[name] != bool(values[name] >> i & 1):
+                raise Exception('run_vectors gave the wrong value of {} in \
+vector {}'.format(name, i))
+    if simulator.run(columns(), count) != values:
+        raise Exception('run gave wrong values')
+    # Change a few inputs in every vector, then update
+    for step in range(5):
+        changed = random.sample(simulator.inputs,
+                                random.randint(1, len(simulator.inputs)))
+        for vector in vectors:
+            for name in changed:
+                if random.random() < 0.5:
+                    vector[name] = not vector[name]
+        new = columns()
+        result = simulator.update(dict((x, new[x]) for x in changed))
+        old, values = values, expected()
+        if result != dict((x, values[x]) for x in values
+                          if values[x] != old[x]):
+            raise Exception('update gave wrong values')
+        for name in simulator.outputs:
+            if simulator.get_value(name) != values[name]:
+                raise Exception('wrong value of {} after update'.format(name))
+
+def random_vectors(inputs, count):
+    return [dict((x, random.random() < 0.5) for x in inputs)
+            for i in range(count)]
+
+coll = nl.parse_geda_netlist(os.path.join(_filedir, 'rotated_schematic.net'))
+check(coll, random_vectors(coll.get_simulator().inputs, 150))
+print('Checked the bundled netlist')
+
+tested = 0
+for i in range(100):
+    coll = random_netlist(random.randint(1, 8), random.randint(1, 40))
+    # Counts that are not multiples of the word size as well
+    count = random.choice((1, simulate.word_size, 100, 200))
+    check(coll, random_vectors(coll.get_simulator().inputs, count))
+    tested += 1
+print('Checked {} random netlists'.format(tested))
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+This example checks incremental analysis (see electruth.incremental):
+after one gate of a random netlist is changed, only the end nets whose
+cone signatures changed may be simplified again, and the others must
+keep the results of the previous version, also when those are loaded
+from a cache.
+"""
+import os
+import random
+import tempfile
+
+# Import electruth submodules needed for this example
+import electruth.netlist as nl
+import electruth.incremental as incremental
+import electruth.parallel as parallel
+import electruth.cache as cache
+
+random.seed(12)
+
+# Devices and their first gate, as (input pins, output pin)
+gates = {
+    '4081': ((1, 2), 3),
+    '4071': ((1, 2), 3),
+    '4070': ((1, 2), 3),
+    '4069': ((1,), 2)
+}
+
+def random_design(inputs, count):
+    # Devices and the input net names of every gate, which is a
+    # component of its own, reading earlier nets
+    names = ['I{}'.format(i) for i in range(inputs)]
+    design = []
+    for i in range(count):
+        device = random.choice(sorted(gates))
+        design.append([device, [random.choice(names)
+                                for x in gates[device][0]]])
+        names.append('N{}'.format(i + 1))
+    return design
+
+def create_netlist(design, inputs, ends):
+    names = ['I{}'.format(i) for i in range(inputs)] + \
+        ['N{}'.format(i + 1) for i in range(len(design))]
+    links = dict((x, []) for x in names)
+    devices = {}
+    for i, (device, sources) in enumerate(design):
+        refdes = 'U{}'.format(i + 1)
+        devices[refdes] = device
+        pins, output = gates[device]
+        for pin, source in zip(pins, sources):
+            links[source].append((refdes, pin))
+        links['N{}'.format(i + 1)].append((refdes, output))
+    return nl.create_net_collection(devices, [
+            ('>' + x if x in ends else x, links[x])
+            for x in names if links[x]])
+
+class CountingPool(parallel.Pool):
+    def __init__(self):
+        parallel.Pool.__init__(self, 1)
+        self.simplified = 0
+
+    def simplify(self, expr, method=None, time_limit=None):
+        self.simplified += 1
+        return parallel.Pool.simplify(self, expr, method, time_limit)
+
+def signatures(coll):
+    found = incremental.cone_signatures(coll.get_end_nets())
+    return dict((x.name, found[x]) for x in coll.get_end_nets())
+
+tested = 0
+for i in range(100):
+    inputs = random.randint(2, 6)
+    design = random_design(inputs, random.randint(5, 30))
+    ends = set('N{}'.format(len(design) - x)
+               for x in random.sample(range(len(design)),
+                                      min(len(design), 6)))
+    coll = create_netlist(design, inputs, ends)
+    analysis = incremental.Analysis()
+    with CountingPool() as pool:
+        first = dict(analysis.submit(coll, pool))
+    before = signatures(coll)
+
+    # Change the device of one gate (keeping its number of inputs) or
+    # what it reads
+    gate = random.choice(design)
+    if gate[0] == '4069' or random.random() < 0.5:
+        source = random.randrange(len(gate[1]))
+        gate[1][source] = random.choice(['I{}'.format(x)
+                                         for x in range(inputs)])
+    else:
+        gate[0] = random.choice(['4081', '4071', '4070'])
+    changed_coll = create_netlist(design, inputs, ends)
+    after = signatures(changed_coll)
+    expected = set(x for x in after if before.get(x) != after[x])
+
+    with CountingPool() as pool:
+        second = dict(analysis.submit(changed_coll, pool))
+    if set(analysis.changed) != expected or pool.simplified != \
+            len(expected):
+        raise Exception('{} were simplified again instead of {}'.format(
+                sorted(analysis.changed), sorted(expected)))
+    exprs = changed_coll.get_logic_dag()
+    for name, result in second.items():
+        if name not in expected and result is not first[name]:
+            raise Exception('the result of {} was not reused'.format(name))
+        if not result.get().equivalent(exprs[name], 'table'):
+            raise Exception('wrong expression of {}'.format(name))
+    tested += 1
+print('Checked {} changed netlists'.format(tested))
+
+# Between runs, the results come from the cache
+directory = tempfile.mkdtemp()
+path = os.path.join(directory, 'cache.db')
+try:
+    with cache.Cache(path) as c:
+        analysis.save(c, 'netlist.net')
+    loaded = incremental.Analysis()
+    with cache.Cache(path) as c:
+        loaded.load(c, 'netlist.net')
+    with CountingPool() as pool:
+        results = dict(loaded.submit(changed_coll, pool))
+    if loaded.changed or pool.simplified:
+        raise Exception('results in the cache were not reused')
+    for name, result in results.items():
+        if not result.get().equivalent(exprs[name], 'table'):
+            raise Exception('wrong expression of {} from the cache'.format(
+                    name))
+finally:
+    os.remove(path)
+    os.rmdir(directory)
+print('Checked results loaded from a cache')
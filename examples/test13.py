@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+This example checks that device names with vendor prefixes, logic
+family letters and package suffixes (e.g. SN74LS08N or CD4081BE) are
+recognized as the parts they are, and that unknown devices are refused.
+"""
+# Import electruth submodules needed for this example
+import electruth.netlist as nl
+
+for name, known in (('SN74LS08', '7408'),
+                    ('74HC08', '7408'),
+                    ('SN74LS08N', '7408'),
+                    ('74ALS08', '7408'),
+                    ('DM74LS86N', '7486'),
+                    ('74HCT138', '74138'),
+                    ('74F151', '74151'),
+                    ('CD4081', '4081'),
+                    ('CD4081BE', '4081'),
+                    ('MC14081B', '4081'),
+                    ('HEF4081BP', '4081'),
+                    ('4069UB', '4069'),
+                    ('7408', '7408')):
+    part = nl.get_part(name)
+    if part.device != name or part.outputs != nl.get_part(known).outputs:
+        raise Exception('{} is not recognized as {}'.format(name, known))
+print('Checked device names')
+
+for name in ('74LS999', 'SN74', 'NE555', 'CD4999', 'LM741', '4081X7',
+             'HC08', ''):
+    try:
+        nl.get_part(name)
+    except Exception as e:
+        if 'is not recognized' not in str(e):
+            raise
+    else:
+        raise Exception('{} was recognized'.format(name))
+print('Checked unknown devices')
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+This example checks the bit-parallel truth tables of expressions
+against building them row by row: random expressions are turned into
+truth tables at once, and every row must be what testing the expression
+with that row gives. Wide expressions, whose tables are made from
+binary decision diagrams, are checked on random rows.
+"""
+import random
+
+# Import electruth submodules needed for this example
+import electruth.booleanexpression as b
+import electruth.truthtable as tt
+
+random.seed(14)
+
+operators = ('and', 'or', 'xor', 'nand', 'nor', 'xnor')
+
+def random_expression(names, depth):
+    if depth == 0 or random.random() < 0.2:
+        if random.random() < 0.05:
+            return b.BooleanConstant(random.random() < 0.5)
+        return b.BooleanVariable(random.choice(names))
+    if random.random() < 0.2:
+        return b.BooleanOperator('not', random_expression(names, depth - 1))
+    operator = random.choice(operators)
+    count = 2 if operator in ('xor', 'xnor') else random.randint(2, 4)
+    return b.BooleanOperator(operator, *[
+            random_expression(names, depth - 1) for i in range(count)])
+
+def row_values(names, row):
+    # As the old tables were made: the first name is the highest bit
+    return dict(zip(names, (x == '1' for x in tt.decimal_to_binary(
+                    row, len(names)))))
+
+def in_cubes(cubes, row):
+    return any(row & mask == value & mask for value, mask in cubes)
+
+tested = 0
+for i in range(300):
+    names = ['X{}'.format(j) for j in range(random.randint(1, 10))]
+    expr = b.BooleanOperator('or', random_expression(names, 4))
+    table = tt.create_from_expression(expr)
+    used = table.names
+    if used != expr.get_variables():
+        raise Exception('wrong inputs of {}'.format(expr))
+    for row in range(1 << len(used)):
+        if bool(table.onset >> row & 1) != expr.test(
+                **row_values(used, row)):
+            raise Exception('wrong row {} of {}'.format(row, expr))
+    if tt.Truthtable(used, cubes=table.cubes).onset != table.onset:
+        raise Exception('wrong cubes of {}'.format(expr))
+    tested += 1
+print('Checked {} tables'.format(tested))
+
+# Tables of more inputs than bitmap_size_limit are made from a diagram
+names = ['X{}'.format(j) for j in range(tt.bitmap_size_limit + 4)]
+for i in range(5):
+    shuffled = [b.BooleanVariable(x) for x in names]
+    random.shuffle(shuffled)
+    expr = b.BooleanOperator('or', *[
+            b.BooleanOperator(random.choice(('and', 'nor')),
+                              *shuffled[j:j + 3])
+            for j in range(0, len(names), 3)])
+    table = tt.create_from_expression(expr)
+    used = table.names
+    if len(used) != len(names):
+        raise Exception('wrong inputs of {}'.format(expr))
+    for j in range(2000):
+        row = random.getrandbits(len(used))
+        if in_cubes(table.cubes, row) != expr.test(**row_values(used, row)):
+            raise Exception('wrong row {} of {}'.format(row, expr))
+print('Checked tables of {} inputs'.format(len(names)))
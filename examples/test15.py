@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+This example checks compiled expressions against test: random
+expressions, with subexpressions shared between operators, are
+compiled both for positional values and for row numbers, and must give
+what test gives for every row. A compiled function is made once and
+then reused.
+"""
+import random
+import itertools
+
+# Import electruth submodule needed for this example
+import electruth.booleanexpression as b
+
+random.seed(15)
+
+operators = ('and', 'or', 'xor', 'nand', 'nor', 'xnor')
+
+def random_expression(names, depth, shared):
+    if shared and random.random() < 0.2:
+        return random.choice(shared)
+    if depth == 0 or random.random() < 0.2:
+        if random.random() < 0.05:
+            return b.BooleanConstant(random.random() < 0.5)
+        return b.BooleanVariable(random.choice(names))
+    if random.random() < 0.2:
+        x = b.BooleanOperator('not', random_expression(names, depth - 1,
+                                                       shared))
+    else:
+        operator = random.choice(operators)
+        count = 2 if operator in ('xor', 'xnor') else random.randint(1, 4)
+        x = b.BooleanOperator(operator, *[
+                random_expression(names, depth - 1, shared)
+                for i in range(count)])
+    shared.append(x)
+    return x
+
+tested = 0
+for i in range(300):
+    names = ['X{}'.format(j) for j in range(random.randint(1, 6))]
+    expr = b.BooleanOperator('or', random_expression(names, 4, []))
+    func = expr.compile()
+    by_row = expr.compile(True)
+    variables = expr.get_variables()
+    if func.variables != variables or expr.compile() is not func:
+        raise Exception('wrong compiled function of {}'.format(expr))
+    for row, values in enumerate(itertools.product(
+            (False, True), repeat=len(variables))):
+        expected = expr.test(**dict(zip(variables, values)))
+        if func(*values) != expected or by_row(row) != expected:
+            raise Exception('wrong value of {} in row {}'.format(expr, row))
+    tested += 1
+print('Checked {} compiled expressions'.format(tested))
+
+# Deeper than the recursion limit
+expr = b.BooleanVariable('X0')
+for j in range(1, 3000):
+    expr = b.BooleanOperator(random.choice(operators[:3]), expr,
+                             b.BooleanVariable('X{}'.format(j % 7)))
+func = expr.compile()
+for k in range(20):
+    values = [random.random() < 0.5 for x in func.variables]
+    if func(*values) != expr.test(**dict(zip(func.variables, values))):
+        raise Exception('wrong value of a deep expression')
+print('Checked a compiled expression 3000 levels deep')
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+This example checks the conversion of netlists into expressions: for
+random netlists of logic gates, with fan-out, reconvergent paths and
+supply nets, the expression of every end net must have the value that
+following the gates net by net gives, and every gate must be converted
+once. Netlists with loops must be refused.
+"""
+import time
+import random
+
+# Import electruth submodules needed for this example
+import electruth.booleanexpression as b
+import electruth.netlist as nl
+import electruth.truthtable as tt
+
+random.seed(16)
+
+# Devices and their first two gates, as (input pins, output pin)
+gates = {
+    '4081': (((1, 2), 3), ((5, 6), 4)),
+    '4071': (((1, 2), 3), ((5, 6), 4)),
+    '4070': (((1, 2), 3), ((5, 6), 4)),
+    '4011': (((1, 2), 3), ((5, 6), 4)),
+    '4069': (((1,), 2), ((3,), 4))
+}
+
+def create_netlist(design, ends):
+    # design is a list of (refdes, device, gate number, input nets,
+    # output net)
+    links = {}
+    devices = {}
+    for refdes, device, number, inputs, output in design:
+        devices[refdes] = device
+        pins, pin = gates[device][number]
+        for x, source in zip(pins, inputs):
+            links.setdefault(source, []).append((refdes, x))
+        links.setdefault(output, []).append((refdes, pin))
+    return nl.create_net_collection(devices, [
+            ('>' + x if x in ends else x, links[x]) for x in sorted(links)])
+
+def random_design(inputs, count):
+    # Gates are used two to a package
+    names = ['I{}'.format(i) for i in range(inputs)] + ['Vcc', 'GND']
+    design = []
+    for i in range(count):
+        if i % 2 == 0:
+            device = random.choice(sorted(gates))
+        # Mostly read the latest nets, so that paths meet again
+        sources = [random.choice(names[-4:] if random.random() < 0.5
+                                 else names)
+                   for x in gates[device][i % 2][0]]
+        output = 'N{}'.format(i)
+        design.append(('U{}'.format(i // 2 + 1), device, i % 2, sources,
+                       output))
+        names.append(output)
+    return design
+
+def follow(coll, names, mask, columns):
+    # The value of every net, found gate by gate from the inputs
+    values = {}
+    def value(net):
+        if net not in values:
+            gate = net.get_output()
+            if gate is None:
+                if net.constant is not None:
+                    values[net] = mask if net.constant else 0
+                else:
+                    values[net] = columns[net.name]
+            else:
+                inputs = [value(x) for x in gate.get_input_nets()]
+                keys = ['a{}'.format(i) for i in range(len(inputs))]
+                values[net] = b.BooleanOperator(
+                    gate.func, *[b.BooleanVariable(x) for x in keys]
+                    ).test_bits(mask, **dict(zip(keys, inputs)))
+        return values[net]
+    return dict((x.name, value(x)) for x in coll.get_end_nets())
+
+tested = 0
+for i in range(100):
+    inputs = random.randint(1, 6)
+    design = random_design(inputs, random.randint(1, 30))
+    ends = set(x[4] for x in random.sample(design, min(len(design), 5)))
+    coll = create_netlist(design, ends)
+    exprs = coll.get_logic_dag()
+    names = ['I{}'.format(x) for x in range(inputs)]
+    mask = (1 << (1 << inputs)) - 1
+    columns = dict(zip(names, tt.variable_columns(inputs)))
+    expected = follow(coll, names, mask, columns)
+    for name, expr in exprs.items():
+        used = dict((x, columns[x]) for x in expr.get_variables())
+        if expr.test_bits(mask, **used) != expected[name]:
+            raise Exception('wrong expression of {}: {}'.format(name, expr))
+    operators = set(x for expr in exprs.values()
+                    for x in b._iter_postorder(expr) if x.is_operator)
+    if len(operators) > len(design):
+        raise Exception('a gate was converted more than once')
+    tested += 1
+print('Checked {} netlists'.format(tested))
+
+# Every gate reads the one before twice, so there are 2^100 paths from
+# the end to the input, which must not all be followed
+design = [('U0', '4081', 0, ['I0', 'I1'], 'N0')]
+for i in range(1, 100):
+    design.append(('U{}'.format(i), random.choice(('4070', '4071')), 0,
+                   ['N{}'.format(i - 1)] * 2, 'N{}'.format(i)))
+start = time.time()
+exprs = create_netlist(design, set(['N99'])).get_logic_dag()
+if time.time() - start > 5:
+    raise Exception('reconvergent paths took {:.1f} s'.format(
+            time.time() - start))
+print('Checked a netlist of 2^100 paths')
+
+# A loop through two gates
+design = [('U1', '4081', 0, ['I0', 'N1'], 'N0'),
+          ('U2', '4071', 0, ['N0', 'I1'], 'N1'),
+          ('U3', '4069', 0, ['N1'], 'N2')]
+try:
+    create_netlist(design, set(['N2'])).get_logic_dag()
+except Exception as e:
+    if 'loop' not in str(e):
+        raise
+else:
+    raise Exception('a loop was not found')
+print('Checked a netlist with a loop')
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+This example checks the gEDA netlist parser: random netlists are
+written in the format of 'gnetlist -g geda' and read back, and every
+net must link the pins written for it, in order, each pin being the
+one its component knows. A netlist of 20000 pins must be read in time
+proportional to its size.
+"""
+import os
+import time
+import random
+import tempfile
+
+# Import electruth submodule needed for this example
+import electruth.netlist as nl
+
+random.seed(17)
+
+devices = ('4081', '4071', '4070', '7408', '7432', '7486')
+
+def random_netlist(count, nets):
+    components = dict(('U{}'.format(i + 1), random.choice(devices))
+                      for i in range(count))
+    links = {}
+    for refdes in components:
+        for pin in range(1, 15):
+            links.setdefault(random.randrange(nets), []).append(
+                (refdes, pin))
+    return components, [('N{}'.format(i) if random.random() < 0.9
+                         else '>E{}'.format(i), links[i])
+                        for i in sorted(links)]
+
+def write_netlist(path, components, nets):
+    with open(path, 'w') as f:
+        f.write('START header\n\ngEDA\'s netlist format\nCreated \
+specifically for testing of gnetsim\n\nEND header\n\n')
+        f.write('START components\n\n')
+        for refdes, device in components.items():
+            f.write('{} device={}\n'.format(refdes, device))
+        f.write('\nEND components\n\nSTART renamed-nets\n\n\nEND \
+renamed-nets\n\nSTART nets\n\n')
+        for name, links in nets:
+            f.write('{} : {} \n'.format(name, ', '.join(
+                        '{} {}'.format(*x) for x in links)))
+        f.write('\nEND nets\n\n')
+
+directory = tempfile.mkdtemp()
+path = os.path.join(directory, 'netlist.net')
+try:
+    for i in range(50):
+        components, nets = random_netlist(random.randint(1, 20),
+                                          random.randint(1, 40))
+        write_netlist(path, components, nets)
+        coll = nl.parse_geda_netlist(path)
+        if coll.parse_time is None:
+            raise Exception('the parse time was not recorded')
+        read = [(('>' if x.is_end_net else '') + x.name,
+                 [(y.component.name, y.pin) for y in x.links])
+                for x in coll.nets]
+        if read != nets:
+            raise Exception('the nets were not read as written')
+        pins = {}
+        for net in coll.nets:
+            for x in net.links:
+                if x.component.device != components[x.component.name]:
+                    raise Exception('wrong device of {}'.format(
+                            x.component.name))
+                if pins.setdefault((x.component.name, x.pin), x) is not x:
+                    raise Exception('pin {} {} was made twice'.format(
+                            x.component.name, x.pin))
+                if x.component.pins[x.pin] is not x or x.parent is not net:
+                    raise Exception('pin {} {} is not linked'.format(
+                            x.component.name, x.pin))
+    print('Checked 50 netlists')
+
+    # 20000 pins, and then twice as many
+    times = []
+    for count in (1430, 2860):
+        write_netlist(path, *random_netlist(count, count * 4))
+        start = time.time()
+        nl.parse_geda_netlist(path)
+        times.append(time.time() - start)
+    if times[1] > times[0] * 4 + 0.5:
+        raise Exception('twice the pins took {:.2f} s instead of {:.2f} \
+s'.format(times[1], times[0]))
+    print('Checked netlists of 20000 and 40000 pins')
+finally:
+    os.remove(path)
+    os.rmdir(directory)
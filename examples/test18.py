@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+This example checks the streaming truth table reader against reading
+the table row by row: random tables, with don't-care inputs and
+outputs, inputs and outputs in any column order, and compressed or not,
+are read, and the rows for which each output is true or does not matter
+must be those the file lists. Both packed bitmaps and lists of cubes
+(for wide tables) are checked.
+"""
+import os
+import bz2
+import gzip
+import lzma
+import random
+import tempfile
+
+# Import electruth submodules needed for this example
+import electruth.truthtable as tt
+import electruth.minimize as minimize
+
+random.seed(18)
+
+def random_table(inputs, outputs, count):
+    # Columns in a random order, and rows as lists of cells
+    columns = ['<I{}'.format(i) for i in range(inputs)] + \
+        ['>O{}'.format(i) for i in range(outputs)]
+    if random.random() < 0.5:
+        random.shuffle(columns)
+    rows = []
+    for i in range(count):
+        row = []
+        for x in columns:
+            if x.startswith('<'):
+                row.append(random.choice('01' * 6 + 'x-'))
+            else:
+                row.append(random.choice('000111' + 'xX-'))
+        rows.append(row)
+    return columns, rows
+
+def expected_sets(columns, rows, output):
+    # Every row is expanded into the rows it stands for, one by one
+    inputs = [x for x in columns if x.startswith('<')]
+    size = len(inputs)
+    onset = dcset = 0
+    for row in rows:
+        cells = dict(zip(columns, row))
+        value = mask = 0
+        for i, name in enumerate(inputs):
+            bit = 1 << (size - 1 - i)
+            if cells[name] in '01':
+                mask |= bit
+                if cells[name] == '1':
+                    value |= bit
+        cell = cells['>' + output]
+        for m in minimize.iter_cube_minterms((value, mask), size):
+            if cell == '1':
+                onset |= 1 << m
+            elif cell != '0':
+                dcset |= 1 << m
+    return onset, dcset
+
+openers = (open, gzip.open, bz2.open, lzma.open)
+
+directory = tempfile.mkdtemp()
+path = os.path.join(directory, 'table')
+try:
+    tested = 0
+    for i in range(100):
+        columns, rows = random_table(random.randint(0, 8),
+                                     random.randint(1, 3),
+                                     random.randint(0, 40))
+        delimiter = random.choice('\t,')
+        with random.choice(openers)(path, 'wt') as f:
+            f.write(delimiter.join(columns) + '\n')
+            for row in rows:
+                f.write(delimiter.join(row) + '\n')
+        # Wide tables are read into cubes instead of bitmaps
+        packed = tt.packed_size_limit
+        if random.random() < 0.5:
+            tt.packed_size_limit = 0
+        try:
+            tables = tt.parse_raw_truthtable(path, delimiter, shorten=False)
+        finally:
+            tt.packed_size_limit = packed
+        outputs = [x[1:] for x in columns if x.startswith('>')]
+        if sorted(tables) != sorted(outputs):
+            raise Exception('wrong outputs {}'.format(sorted(tables)))
+        for name in outputs:
+            table = tables[name]
+            if table.names != [x[1:] for x in columns if x.startswith('<')]:
+                raise Exception('wrong inputs {}'.format(table.names))
+            if (table.onset, table.dcset) != expected_sets(columns, rows,
+                                                           name):
+                raise Exception('wrong rows of {}'.format(name))
+        # Only some of the outputs
+        wanted = random.sample(outputs, 1)
+        if [x[0] for x in tt.iter_raw_truthtable(path, delimiter,
+                                                 wanted)] != wanted:
+            raise Exception('outputs were not left out')
+        tested += 1
+    print('Checked {} tables'.format(tested))
+finally:
+    os.remove(path)
+    os.rmdir(directory)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+This example checks the cache of minimized functions (see
+electruth.cache): a second run must find every function in the cache
+and print the same expressions, the same logic under other input names
+must be found as well, and when the cache grows past its size (as set
+with --cache-size), the least recently used covers must be removed
+first.
+"""
+import io
+import os
+import time
+import random
+import tempfile
+import contextlib
+
+# Import electruth submodules needed for this example
+import electruth.booleanexpression as b
+import electruth.truthtable as tt
+import electruth.cache as cache
+from electruth.utility import Utility
+
+random.seed(19)
+
+def run(inputs, path, size):
+    # Return what a run prints, and its cache hits and misses
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        u = Utility(inputs=inputs, cache_path=path, cache_size=size,
+                    auto_compare=False)
+        u.start()
+        counts = u.cache.hits, u.cache.misses, u.cache.get_size()
+        u.end()
+    return output.getvalue(), counts
+
+directory = tempfile.mkdtemp()
+path = os.path.join(directory, 'cache.db')
+try:
+    # The memo would find the functions before the cache does
+    tt.memo_size = 0
+    inputs = tuple(('expr', 'F{}=({}) or ({}) and not {}'.format(
+                i, ' xor '.join(random.sample('ABCDE', 2)),
+                ' or '.join(random.sample('ABCDE', 3)),
+                random.choice('ABCDE'))) for i in range(20))
+    first, counts = run(inputs, path, 64)
+    # Some of the functions are the same up to the names of their inputs
+    if sum(counts[:2]) != 20 or counts[1] == 0:
+        raise Exception('the first run had {} hits and {} misses'.format(
+                *counts[:2]))
+    second, counts = run(inputs, path, 64)
+    if counts[:2] != (20, 0) or second != first:
+        raise Exception('the second run was not taken from the cache')
+    print('Checked a run from the cache')
+
+    # Hashed by position, so other names find the same cover, which is
+    # rebuilt with those names
+    with cache.Cache(path) as c:
+        cache.set_cache(c)
+        try:
+            x = b.parse_raw_expression('(P xor Q) or R')
+            y = b.parse_raw_expression('(S xor T) or U')
+            shortened = x.simplify()
+            if c.hits != 0 or not y.simplify().equivalent(y) or c.hits != 1:
+                raise Exception('renamed logic was not found')
+            if not shortened.equivalent(x):
+                raise Exception('wrong expression from the cache')
+        finally:
+            cache.set_cache(None)
+    print('Checked logic under other names')
+
+    # A small --cache-size (in MiB) keeps the cache small
+    path = os.path.join(directory, 'small.db')
+    size = 0.0005
+    first, counts = run(inputs, path, size)
+    if counts[2] > size * 2**20:
+        raise Exception('the cache takes up {} bytes'.format(counts[2]))
+    with cache.Cache(path) as c:
+        if not 0 < len(c) < 20:
+            raise Exception('{} covers were kept'.format(len(c)))
+    print('Checked a small cache size')
+
+    # The least recently used covers go first
+    path = os.path.join(directory, 'lru.db')
+    cover = [(5, 7), (1, 3)]
+    length = len(cache.json.dumps(cover, separators=(',', ':')))
+    with cache.Cache(path, max_size=length * 5) as c:
+        for i in range(5):
+            c.store('key{}'.format(i), cover)
+            time.sleep(0.002)
+        # key0 is used again, so key1 is the least recently used
+        if c.lookup('key0') != cover:
+            raise Exception('a stored cover was not found')
+        time.sleep(0.002)
+        c.store('key5', cover)
+        kept = set(x for x in ('key{}'.format(i) for i in range(6))
+                   if cache.lookup_readonly(path, x) is not None)
+        if kept != set(['key0', 'key2', 'key3', 'key4', 'key5']) or \
+                c.get_size() > c.max_size:
+            raise Exception('wrong covers were removed: {} are \
+kept'.format(', '.join(sorted(kept))))
+    print('Checked removing the least recently used covers')
+finally:
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+This example checks that expressions much deeper than the recursion
+limit can be printed, evaluated, walked, rebuilt and pickled, by
+comparing a random chain of 100000 operators with the same chain
+followed step by step.
+"""
+import re
+import sys
+import pickle
+import random
+import collections
+
+# Import electruth submodules needed for this example
+import electruth.booleanexpression as b
+
+random.seed(20)
+
+names = 'ABCD'
+depth = 100000
+if depth <= sys.getrecursionlimit():
+    raise Exception('the chain is not deeper than the recursion limit')
+
+functions = {
+    'and': lambda x, y: x and y,
+    'or': lambda x, y: x or y,
+    'xor': lambda x, y: x != y,
+    'nand': lambda x, y: not (x and y),
+    'nor': lambda x, y: not (x or y),
+    'xnor': lambda x, y: x == y,
+}
+
+# Every step puts the chain so far into a new operator, with a variable
+# before or after it, under NOT, or alone in a group (as left by some
+# netlists)
+first = random.choice(names)
+expr = b.BooleanVariable(first)
+steps = []
+groups = 0
+for i in range(depth):
+    kind = random.choice(tuple(functions) + ('not', 'group'))
+    if kind == 'not':
+        expr = b.BooleanOperator('not', expr)
+        steps.append((kind, None, None))
+    elif kind == 'group':
+        expr = b.BooleanOperator('or', expr)
+        steps.append((kind, None, None))
+        groups += 1
+    else:
+        name = random.choice(names)
+        before = random.random() < 0.5
+        variable = b.BooleanVariable(name)
+        expr = b.BooleanOperator(kind, *(before and (variable, expr) or
+                                         (expr, variable)))
+        steps.append((kind, name, before))
+
+def follow(values):
+    # Evaluate the chain one step at a time
+    result = values[first]
+    for kind, name, before in steps:
+        if kind == 'not':
+            result = not result
+        elif kind != 'group':
+            x, y = result, values[name]
+            if before:
+                x, y = y, x
+            result = functions[kind](x, y)
+    return bool(result)
+
+rows = []
+for row in range(1 << len(names)):
+    values = dict((name, bool(row >> (len(names) - 1 - i) & 1))
+                  for i, name in enumerate(names))
+    rows.append((values, follow(values)))
+
+def check_rows(x, what):
+    if x.get_variables() != names_in_order:
+        raise Exception('{}: wrong variables {}'.format(
+                what, x.get_variables()))
+    columns = dict((name, sum(1 << r for r, (values, result) in
+                              enumerate(rows) if values[name]))
+                   for name in names)
+    bits = x.test_bits((1 << len(rows)) - 1, **columns)
+    for r, (values, result) in enumerate(rows):
+        if bool(bits >> r & 1) != result:
+            raise Exception('{}: wrong result for {}'.format(what, values))
+    # test walks the whole chain for each row, so only a few are tried
+    for values, result in random.sample(rows, 2):
+        if bool(x.test(**values)) != result:
+            raise Exception('{}: wrong result for {}'.format(what, values))
+
+# Operands of commutative operators are sorted, so the variables come
+# in the order they are printed rather than the order they were added
+text = str(expr)
+names_in_order = list(collections.OrderedDict.fromkeys(
+        re.findall(r'\b[A-D]\b', text)))
+check_rows(expr, 'the chain')
+print('Checked test and test_bits')
+
+# Walking the chain visits every object once
+objects = list(expr.iter_postorder())
+if len(objects) != depth + len(names_in_order) or objects[-1] is not expr:
+    raise Exception('iter_postorder yielded {} objects'.format(len(objects)))
+if expr.visit(lambda x, results: 1 + sum(results)) != \
+        depth + 1 + sum(1 for kind, name, before in steps if name):
+    raise Exception('visit gave the wrong count')
+print('Checked iter_postorder and visit')
+
+# Every operator is printed, and expressed text parses back into the
+# same logic
+if text.count('(') != depth:
+    raise Exception('str gave the wrong text')
+check_rows(b.parse_raw_expression(expr.express()), 'the expressed chain')
+for typ in ('math', 'bool'):
+    if len(expr.express(typ)) < depth:
+        raise Exception('express({!r}) is too short'.format(typ))
+print('Checked str and express')
+
+# Ungrouping removes every group and nothing else
+ungrouped = expr.ungroup()
+if any(x.is_operator and len(x.objs) == 1 and x.get_name() != 'not'
+       for x in ungrouped.iter_postorder()):
+    raise Exception('a group was left')
+if len(list(ungrouped.iter_postorder())) != len(objects) - groups:
+    raise Exception('ungroup removed the wrong objects')
+check_rows(ungrouped, 'the ungrouped chain')
+print('Checked ungroup')
+
+# Renaming every variable with transform
+renamed = expr.transform(lambda x: x.is_variable and
+                         b.BooleanVariable(x.name.lower()) or x)
+if renamed.get_variables() != [name.lower() for name in names_in_order]:
+    raise Exception('transform did not rename the variables')
+for values, result in random.sample(rows, 2):
+    if bool(renamed.test(**dict((name.lower(), value) for name, value in
+                                values.items()))) != result:
+        raise Exception('transform changed the logic')
+if expr.transform(lambda x: x) is not expr:
+    raise Exception('transform without changes gave another object')
+print('Checked transform')
+
+# Expressions are interned, so the pickled chain comes back as itself
+if pickle.loads(pickle.dumps(expr)) is not expr:
+    raise Exception('pickling gave another object')
+print('Checked pickling')
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+This example checks evaluating expressions for many vectors at once
+against testing them one vector at a time: with integer columns, with
+NumPy arrays of bools or numbers, with arrays packed with
+numpy.packbits (including counts that are not a multiple of 8, whose
+unused bits must be cleared), and in chunks. The NumPy checks are
+skipped if NumPy is not installed.
+"""
+import random
+
+# Import electruth submodules needed for this example
+import electruth.booleanexpression as b
+
+random.seed(21)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+names = 'ABCDEF'
+operators = ('and', 'or', 'xor', 'nand', 'nor', 'xnor')
+
+def random_expression(depth):
+    if depth == 0 or random.random() < 0.2:
+        if random.random() < 0.05:
+            return b.BooleanConstant(random.random() < 0.5)
+        return b.BooleanVariable(random.choice(names))
+    if random.random() < 0.2:
+        return b.BooleanOperator('not', random_expression(depth - 1))
+    operator = random.choice(operators)
+    count = 2 if operator in ('xor', 'xnor') else random.randint(2, 4)
+    return b.BooleanOperator(operator, *[
+            random_expression(depth - 1) for i in range(count)])
+
+def random_vectors(count):
+    return [dict((name, random.random() < 0.5) for name in names)
+            for i in range(count)]
+
+def int_columns(vectors):
+    return dict((name, sum(1 << i for i, x in enumerate(vectors)
+                           if x[name])) for name in names)
+
+def check(results, expected, what):
+    if list(results) != expected:
+        raise Exception('{}: wrong results for {}'.format(what, expr))
+
+counts = [1, 7, 8, 9, 15, 16, 17] + [random.randint(1, 300)
+                                     for i in range(93)]
+for count in counts:
+    expr = b.BooleanOperator('or', random_expression(4))
+    chunks = [random_vectors(count) for i in range(3)]
+    expected = [[bool(expr.test(**x)) for x in vectors]
+                for vectors in chunks]
+    vectors = chunks[0]
+
+    # Integers, where bit i is vector i
+    result = expr.evaluate_batch(int_columns(vectors), count=count)
+    if result >> count:
+        raise Exception('bits set after the last vector')
+    check((bool(result >> i & 1) for i in range(count)), expected[0],
+          'integers')
+    for result, vectors_expected in zip(
+            expr.evaluate_batch((int_columns(x) for x in chunks),
+                                count=count), expected):
+        check((bool(result >> i & 1) for i in range(count)),
+              vectors_expected, 'chunks of integers')
+
+    if numpy is None:
+        continue
+
+    # Arrays of bools, and of numbers where 0 is false
+    def arrays(vectors, dtype):
+        return dict((name, numpy.array([x[name] for x in vectors], dtype))
+                    for name in names)
+    for dtype in (numpy.bool_, numpy.int32):
+        result = expr.evaluate_batch(arrays(vectors, dtype))
+        if result.shape != (count,):
+            raise Exception('wrong shape {}'.format(result.shape))
+        check((bool(x) for x in result), expected[0],
+              '{} arrays'.format(numpy.dtype(dtype).name))
+
+    # Packed arrays, the unused bits of the last byte being cleared
+    def packed(vectors):
+        return dict((name, numpy.packbits(
+                        numpy.array([x[name] for x in vectors], bool)))
+                    for name in names)
+    for result, vectors_expected in zip(
+            expr.evaluate_batch((packed(x) for x in chunks), packed=True,
+                                count=count), expected):
+        if result.dtype != numpy.uint8 or \
+                result.shape != ((count + 7) // 8,):
+            raise Exception('wrong packed result {!r}'.format(result))
+        bits = numpy.unpackbits(result)
+        if bits[count:].any():
+            raise Exception('bits set after the last vector')
+        check((bool(x) for x in bits[:count]), vectors_expected,
+              'packed arrays')
+print('Checked integers')
+if numpy is None:
+    print('Skipped arrays: NumPy is not installed')
+else:
+    print('Checked arrays and packed arrays')
+
+# Mistakes in the columns
+expr = b.parse_raw_expression('A and B')
+for columns, count in (({'A': 5}, 3), ({'A': 5, 'B': 3}, None)):
+    try:
+        expr.evaluate_batch(columns, count=count)
+    except b.BooleanExpressionError:
+        pass
+    else:
+        raise Exception('no error for {}'.format(columns))
+if numpy is not None:
+    try:
+        expr.evaluate_batch({'A': numpy.zeros(3, numpy.uint8),
+                             'B': numpy.zeros(3, bool)}, packed=True)
+    except b.BooleanExpressionError:
+        pass
+    else:
+        raise Exception('no error for packed bools')
+print('Checked errors')
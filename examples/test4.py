@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+This example checks the minimizers against brute force: for random
+small functions, every cover found by Quine-McCluskey and by the
+Espresso-style heuristic (for one output and for several outputs
+together) must be true for all rows of the onset and for no rows
+outside the onset and the don't-cares.
+"""
+import random
+import time
+
+# Import electruth submodule needed for this example
+import electruth.minimize as minimize
+
+random.seed(4)
+
+def random_function(n):
+    # Return the minterms and the don't-care minterms of a random
+    # function of n variables
+    rows = list(range(1 << n))
+    random.shuffle(rows)
+    ones = random.randint(0, len(rows))
+    dcs = random.randint(ones, len(rows)) if random.random() < 0.5 else ones
+    return sorted(rows[:ones]), sorted(rows[ones:dcs])
+
+def covered_rows(n, cubes):
+    rows = set()
+    for cube in cubes:
+        rows.update(minimize.iter_cube_minterms(cube, n))
+    return rows
+
+def check_cover(what, n, minterms, dontcares, cubes):
+    rows = covered_rows(n, cubes)
+    if not set(minterms) <= rows <= set(minterms) | set(dontcares):
+        raise Exception('{} gives a wrong cover of {} (don\'t care: \
+{})'.format(what, minterms, dontcares))
+
+def as_cubes(n, minterms):
+    return [(m, (1 << n) - 1) for m in minterms]
+
+tested = 0
+for i in range(300):
+    n = random.randint(0, 6)
+    minterms, dontcares = random_function(n)
+    qm = minimize.quine_mccluskey(n, minterms, dontcares)
+    check_cover('quine_mccluskey', n, minterms, dontcares, qm)
+    esp = minimize.espresso(n, as_cubes(n, minterms),
+                            as_cubes(n, dontcares))
+    check_cover('espresso', n, minterms, dontcares, esp)
+    tested += 1
+print('Checked {} single-output functions'.format(tested))
+
+tested = 0
+for i in range(100):
+    n = random.randint(1, 5)
+    functions = [random_function(n) for o in range(random.randint(1, 4))]
+    minterms = [x[0] for x in functions]
+    dontcares = [x[1] for x in functions]
+    for name, (products, covers) in (
+        ('multi_output_quine_mccluskey',
+         minimize.multi_output_quine_mccluskey(n, minterms, dontcares)),
+        ('multi_output_espresso',
+         minimize.multi_output_espresso(
+                n, [as_cubes(n, x) for x in minterms],
+                [as_cubes(n, x) for x in dontcares]))):
+        for o in range(len(functions)):
+            check_cover(name, n, minterms[o], dontcares[o],
+                        [products[x] for x in covers[o]])
+    tested += 1
+print('Checked {} sets of functions minimized together'.format(tested))
+
+# Disjoint products of two literals over many variables are already
+# minimal, and must stay fast however many there are
+n = 80
+cubes = [((3 << (n - 2 - 2 * i)), (3 << (n - 2 - 2 * i)))
+         for i in range(n // 2)]
+start = time.time()
+if sorted(minimize.espresso(n, cubes)) != sorted(cubes):
+    raise Exception('espresso changed disjoint products')
+if time.time() - start > 5:
+    raise Exception('espresso is too slow on disjoint products')
+print('Checked {} disjoint products of {} variables'.format(len(cubes), n))
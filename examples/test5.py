@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+This example checks that expressions are compared by what they do,
+not by how they are written: random small expressions are compared
+with every equivalence method, and the answers are checked against
+evaluating both expressions row by row. Expressions with too many
+variables to list all rows are compared with a SAT solver.
+"""
+import random
+import itertools
+
+# Import electruth submodule needed for this example
+import electruth.booleanexpression as b
+
+random.seed(5)
+
+operators = ('and', 'or', 'xor', 'nand', 'nor', 'xnor')
+
+def random_expression(names, depth):
+    if depth == 0 or random.random() < 0.2:
+        if random.random() < 0.05:
+            return b.BooleanConstant(random.random() < 0.5)
+        return b.BooleanVariable(random.choice(names))
+    if random.random() < 0.2:
+        return b.BooleanOperator('not', random_expression(names, depth - 1))
+    operator = random.choice(operators)
+    # Exclusive or and its negation take exactly two operands
+    count = 2 if operator in ('xor', 'xnor') else random.randint(2, 3)
+    return b.BooleanOperator(operator, *[
+            random_expression(names, depth - 1) for i in range(count)])
+
+def evaluate(x, row):
+    if x.is_variable:
+        return row[x.name]
+    return x.test(**row)
+
+def brute_force_equivalent(x, y, names):
+    for values in itertools.product((False, True), repeat=len(names)):
+        row = dict(zip(names, values))
+        if evaluate(x, row) != evaluate(y, row):
+            return False
+    return True
+
+# Constants have no variables, and are only equivalent to themselves
+for value in (False, True):
+    assert b.BooleanConstant(value).get_variables() == []
+    assert b.BooleanConstant(value).equivalent(b.BooleanConstant(value))
+    assert not b.BooleanConstant(value).equivalent(
+        b.BooleanConstant(not value))
+
+names = ['A', 'B', 'C', 'D']
+tested = 0
+for i in range(300):
+    x = random_expression(names, 3)
+    # Half of the pairs are rewritten versions of the same function
+    if random.random() < 0.5:
+        y = b.BooleanOperator('not', b.BooleanOperator('not', x))
+        if x.is_operator and random.random() < 0.5:
+            y = x.create_truthtable().shorten()
+    else:
+        y = random_expression(names, 3)
+    expected = brute_force_equivalent(x, y, names)
+    for method in ('table', 'bdd', 'sat'):
+        if x.equivalent(y, method) != expected:
+            raise Exception('{} equivalence of {} and {} is \
+wrong'.format(method, x, y))
+    tested += 1
+print('Checked {} pairs of expressions'.format(tested))
+
+# Rewrites of expressions over 40 variables, which are too wide for a
+# table of all rows
+wide = [b.BooleanVariable('X{}'.format(i)) for i in range(40)]
+x = b.BooleanOperator('nand', *wide)
+y = b.BooleanOperator('or', *[b.BooleanOperator('not', v) for v in wide])
+assert x.equivalent(y)
+x = b.BooleanOperator('and', wide[0], b.BooleanOperator('or', *wide[1:]))
+y = b.BooleanOperator('or', *[b.BooleanOperator('and', wide[0], v)
+                              for v in wide[1:]])
+assert x.equivalent(y)
+assert not x.equivalent(b.BooleanOperator('or', *wide))
+print('Checked expressions of {} variables'.format(len(wide)))
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+This example checks binary decision diagrams against brute force: for
+random small expressions, the number of true rows, the irredundant sum
+of products (ISOP) read from the diagram, a satisfying assignment and
+restrictions to constants must all agree with evaluating the
+expression row by row, also after the variables have been reordered.
+Automatic reordering must not make building diagrams much slower.
+"""
+import random
+import itertools
+import time
+
+# Import electruth submodules needed for this example
+import electruth.booleanexpression as b
+import electruth.bdd as bdd
+import electruth.minimize as minimize
+
+random.seed(6)
+
+operators = ('and', 'or', 'xor', 'nand', 'nor', 'xnor')
+
+def random_expression(names, depth):
+    if depth == 0 or random.random() < 0.2:
+        return b.BooleanVariable(random.choice(names))
+    if random.random() < 0.2:
+        return b.BooleanOperator('not', random_expression(names, depth - 1))
+    operator = random.choice(operators)
+    # Exclusive or and its negation take exactly two operands
+    count = 2 if operator in ('xor', 'xnor') else random.randint(2, 3)
+    return b.BooleanOperator(operator, *[
+            random_expression(names, depth - 1) for i in range(count)])
+
+def evaluate(x, row):
+    if x.is_variable:
+        return row[x.name]
+    return x.test(**row)
+
+def true_rows(expr, names):
+    # Row numbers with names[0] as the most significant bit, as in
+    # electruth.minimize
+    rows = set()
+    for i, values in enumerate(itertools.product((False, True),
+                                                 repeat=len(names))):
+        if evaluate(expr, dict(zip(names, values))):
+            rows.add(i)
+    return rows
+
+def check(expr, function, names):
+    rows = true_rows(expr, names)
+    if function.count(names) != len(rows):
+        raise Exception('wrong count for {}'.format(expr))
+    table = function.to_truthtable(names)
+    covered = set()
+    for cube in table.cubes:
+        covered.update(minimize.iter_cube_minterms(cube, len(names)))
+    if covered != rows:
+        raise Exception('wrong ISOP for {}'.format(expr))
+    model = function.pick()
+    if (model is None) != (not rows):
+        raise Exception('wrong pick for {}'.format(expr))
+    if model is not None:
+        row = dict((name, model.get(name, False)) for name in names)
+        if not evaluate(expr, row):
+            raise Exception('pick does not satisfy {}'.format(expr))
+    name = random.choice(names)
+    value = random.random() < 0.5
+    restricted = function.restrict(**{name: value})
+    if restricted.count(names) != 2 * len(
+        [r for r in rows if bool(r >> (len(names) - 1 - names.index(name))
+                                 & 1) == value]):
+        raise Exception('wrong restriction of {}'.format(expr))
+
+names = ['A', 'B', 'C', 'D', 'E', 'F']
+tested = 0
+for i in range(200):
+    expr = random_expression(names, 4)
+    manager = bdd.BDD(names)
+    function = manager.from_expression(expr)
+    check(expr, function, names)
+    order = list(names)
+    random.shuffle(order)
+    manager.set_order(order)
+    check(expr, function, names)
+    manager.reorder()
+    check(expr, function, names)
+    if not (function.to_expression().equivalent(expr, 'table')):
+        raise Exception('wrong expression for {}'.format(expr))
+    tested += 1
+print('Checked {} decision diagrams'.format(tested))
+
+# A diagram thousands of levels deep, built from the bottom up so that
+# it takes little time; working on it must not hit the recursion limit
+names = ['X{}'.format(i) for i in range(5000)]
+manager = bdd.BDD(names, reordering=False)
+function = manager.true
+for name in reversed(names):
+    function = manager.variable(name) & function
+if (~function).count() != (1 << len(names)) - 1:
+    raise Exception('wrong count of a deep diagram')
+if function.restrict(X0=True).count(names) != 2:
+    raise Exception('wrong restriction of a deep diagram')
+if len((~function).to_truthtable(names).cubes) != len(names):
+    raise Exception('wrong ISOP of a deep diagram')
+print('Checked a diagram of {} levels'.format(len(names)))
+
+def and_chain(manager, count):
+    function = manager.true
+    for i in range(count):
+        function = function & manager.add_variable('X{}'.format(i))
+    return [function]
+
+def multiplier(manager, count):
+    a = [manager.add_variable('A{}'.format(i)) for i in range(count)]
+    b = [manager.add_variable('B{}'.format(i)) for i in range(count)]
+    # Add the shifted partial products one row at a time
+    total = [manager.false] * (2 * count)
+    for j in range(count):
+        carry = manager.false
+        for i in range(2 * count - j):
+            s = total[i + j]
+            p = a[i] & b[j] if i < count else manager.false
+            total[i + j] = s ^ p ^ carry
+            carry = (s & p) | (carry & (s ^ p))
+    return total
+
+def adder(manager, count):
+    # All of a before all of b, an order exponential in count
+    a = [manager.add_variable('A{}'.format(i)) for i in range(count)]
+    b = [manager.add_variable('B{}'.format(i)) for i in range(count)]
+    carry = manager.false
+    total = []
+    for i in range(count):
+        total.append(a[i] ^ b[i] ^ carry)
+        carry = (a[i] & b[i]) | (carry & (a[i] ^ b[i]))
+    return total + [carry]
+
+def build(circuit, count, reordering):
+    manager = bdd.BDD(reordering=reordering)
+    start = time.time()
+    functions = circuit(manager, count)
+    return (time.time() - start, len(manager),
+            [function.count() for function in functions])
+
+# Reordering cannot help the first two, so it must not cost much; it
+# must make the diagrams of the adder smaller
+for circuit, count in ((and_chain, 400), (multiplier, 7), (adder, 14)):
+    on = build(circuit, count, True)
+    off = build(circuit, count, False)
+    if on[2] != off[2]:
+        raise Exception('reordering changed {}'.format(circuit.__name__))
+    if circuit is adder:
+        if on[1] * 10 > off[1]:
+            raise Exception('reordering did not help {}'.format(
+                circuit.__name__))
+    elif on[0] > off[0] * 2 + 1:
+        raise Exception('reordering made {} slower: {:.2f}s against '
+                        '{:.2f}s'.format(circuit.__name__, on[0], off[0]))
+print('Checked reordering on an and chain, a multiplier and an adder')
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+This example checks the SAT solver against enumeration: random sets of
+clauses are solved, and the answers are compared with trying every
+assignment. Models must satisfy every clause, and expressions are
+checked for satisfiability and for differences the same way.
+"""
+import random
+import itertools
+
+# Import electruth submodules needed for this example
+import electruth.booleanexpression as b
+import electruth.sat as sat
+
+random.seed(7)
+
+def random_clauses(count, size):
+    # Around the ratio of clauses to variables (4.26 for 3-literal
+    # clauses) where about half of the sets are satisfiable
+    clauses = []
+    for i in range(int(count * 4.26)):
+        variables = random.sample(range(1, count + 1), size)
+        clauses.append([v if random.random() < 0.5 else -v
+                        for v in variables])
+    return clauses
+
+def satisfies(values, clauses):
+    return all(any(values[abs(x)] == (x > 0) for x in clause)
+               for clause in clauses)
+
+def enumerate_satisfiable(count, clauses):
+    for values in itertools.product((False, True), repeat=count):
+        if satisfies((None,) + values, clauses):
+            return True
+    return False
+
+found = 0
+tested = 0
+for i in range(300):
+    count = random.randint(3, 12)
+    clauses = random_clauses(count, 3)
+    solver = sat.Solver(clauses)
+    result = solver.solve()
+    if result != enumerate_satisfiable(count, clauses):
+        raise Exception('wrong answer for {}'.format(clauses))
+    if result:
+        found += 1
+        model = solver.get_model()
+        if not satisfies(model + [False] * (count + 1 - len(model)),
+                         clauses):
+            raise Exception('the model does not satisfy {}'.format(
+                    clauses))
+    tested += 1
+print('Checked {} sets of clauses ({} satisfiable)'.format(tested, found))
+
+operators = ('and', 'or', 'xor', 'nand', 'nor', 'xnor')
+
+def random_expression(names, depth):
+    if depth == 0 or random.random() < 0.2:
+        return b.BooleanVariable(random.choice(names))
+    if random.random() < 0.2:
+        return b.BooleanOperator('not', random_expression(names, depth - 1))
+    operator = random.choice(operators)
+    # Exclusive or and its negation take exactly two operands
+    count = 2 if operator in ('xor', 'xnor') else random.randint(2, 3)
+    return b.BooleanOperator(operator, *[
+            random_expression(names, depth - 1) for i in range(count)])
+
+def evaluate(x, row):
+    if x.is_variable:
+        return row[x.name]
+    return x.test(**row)
+
+def rows(names):
+    for values in itertools.product((False, True), repeat=len(names)):
+        yield dict(zip(names, values))
+
+names = ['A', 'B', 'C', 'D', 'E']
+tested = 0
+for i in range(200):
+    x = random_expression(names, 4)
+    y = random_expression(names, 4)
+    model = sat.find_model(x)
+    if (model is None) != (not any(evaluate(x, r) for r in rows(names))):
+        raise Exception('wrong satisfiability of {}'.format(x))
+    if model is not None:
+        row = dict((n, model.get(n, False)) for n in names)
+        if not evaluate(x, row):
+            raise Exception('the model does not satisfy {}'.format(x))
+    difference = sat.find_difference(x, y)
+    differs = any(evaluate(x, r) != evaluate(y, r) for r in rows(names))
+    if (difference is not None) != differs:
+        raise Exception('wrong difference of {} and {}'.format(x, y))
+    if difference is not None:
+        row = dict((n, difference.get(n, False)) for n in names)
+        if evaluate(x, row) == evaluate(y, row):
+            raise Exception('{} and {} do not differ there'.format(x, y))
+    tested += 1
+print('Checked {} expressions'.format(tested))
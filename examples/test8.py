@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+This example checks the schematic reader against a netlist written by
+'gnetlist -g geda': a schematic with a rotated and mirrored component
+(and its symbol, found next to it) is read without gnetlist, and must
+connect the same pins into the same nets as the bundled netlist.
+"""
+import os.path
+
+# Import electruth submodules needed for this example
+import electruth.booleanexpression as b
+import electruth.netlist as nl
+import electruth.schematic as schematic
+
+_filedir = os.path.dirname(os.path.realpath(__file__))
+
+def connections(coll):
+    # Named nets by name, unnamed ones (whose numbers may differ) only by
+    # the pins they connect
+    named = {}
+    unnamed = set()
+    for net in coll.nets:
+        pins = frozenset((x.component.name, x.pin) for x in net.links)
+        if net.name.startswith('unnamed_net'):
+            unnamed.add(pins)
+        else:
+            named[(net.name, net.is_end_net)] = pins
+    devices = dict((x.component.name, x.component.device)
+                   for net in coll.nets for x in net.links)
+    return named, unnamed, devices
+
+read = schematic.read_schematic(os.path.join(_filedir,
+                                             'rotated_schematic.sch'))
+expected = nl.parse_geda_netlist(os.path.join(_filedir,
+                                              'rotated_schematic.net'))
+if connections(read) != connections(expected):
+    raise Exception('the schematic does not connect as gnetlist does')
+exprs = read.get_logic_dag()
+if not exprs['Y'].equivalent(b.parse_raw_expression('A and B and C or D'),
+                             'table'):
+    raise Exception('wrong logic for Y: {}'.format(exprs['Y']))
+print('Checked a schematic against its netlist')
+
+# gschem mirrors a symbol around its y axis before rotating it; the other
+# way around, pins at other positions than their own ends would move
+for angle in (0, 90, 180, 270):
+    for mirror in (False, True):
+        for px, py in ((0, 500), (900, 300), (-200, 0)):
+            x, y = (-px if mirror else px), py
+            for i in range(angle // 90):
+                x, y = -y, x
+            if schematic._place(100, 200, angle, mirror, px, py) != \
+                    (100 + x, 200 + y):
+                raise Exception('wrong place of ({}, {}) at {} \
+degrees'.format(px, py, angle))
+print('Checked placing pins')
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+This example checks canonical forms (see electruth.npn): random
+functions of up to 6 inputs, with their inputs negated and reordered at
+random, must have the same canonical form, and a cover remembered for
+one must be moved back to a cover of the other.
+"""
+import random
+
+# Import electruth submodules needed for this example
+import electruth.truthtable as tt
+import electruth.minimize as minimize
+import electruth.npn as npn
+
+random.seed(9)
+
+def transform(n, bits, order, negations):
+    # Row r of the result is the row of bits where input j has the value
+    # of input order[j] of r, negated if bit j of negations is set
+    result = 0
+    for r in range(1 << n):
+        s = 0
+        for j in range(n):
+            value = (r >> (n - 1 - order[j])) & 1 ^ (negations >> j) & 1
+            s |= value << (n - 1 - j)
+        if bits & (1 << s):
+            result |= 1 << r
+    return result
+
+def minimizer(n):
+    def run(onset, dcset):
+        return minimize.quine_mccluskey(n, list(tt._iter_bits(onset)),
+                                        list(tt._iter_bits(dcset)))
+    return run
+
+tested = 0
+for i in range(300):
+    n = random.randint(0, 6)
+    rows = 1 << n
+    onset = random.getrandbits(rows)
+    dcset = random.getrandbits(rows) & random.getrandbits(rows) & ~onset
+    if random.random() < 0.2:
+        dcset = 0
+    order = list(range(n))
+    random.shuffle(order)
+    negations = random.getrandbits(n) if n else 0
+    other_onset = transform(n, onset, order, negations)
+    other_dcset = transform(n, dcset, order, negations)
+    form = npn.canonical_form(n, onset, dcset)
+    if form[:2] != npn.canonical_form(n, other_onset, other_dcset)[:2]:
+        raise Exception('different canonical forms of {:x} and {:x}'.format(
+                onset, other_onset))
+
+    memo = npn.Memo()
+    cover = memo.minimize(n, onset, dcset, 'qm', minimizer(n))
+    other_cover = memo.minimize(n, other_onset, other_dcset, 'qm',
+                                minimizer(n))
+    if memo.hits != 1 or len(other_cover) != len(cover):
+        raise Exception('the cover of {:x} was not reused'.format(onset))
+    for on, dc, cubes in ((onset, dcset, cover),
+                          (other_onset, other_dcset, other_cover)):
+        bits = tt._cubes_to_bitmap(cubes, n)
+        if bits & ~(on | dc) or on & ~bits:
+            raise Exception('wrong cover of {:x}'.format(on))
+    tested += 1
+print('Checked {} pairs of functions'.format(tested))
+
+# Parity ties everywhere, so all 2^n n! ways are tried; that is at most
+# npn.max_candidates for up to 4 inputs
+for n in range(1, 5):
+    parity = 0
+    for r in range(1 << n):
+        if bin(r).count('1') % 2:
+            parity |= 1 << r
+    order = list(range(n))[::-1]
+    if npn.canonical_form(n, parity)[:2] != npn.canonical_form(
+            n, transform(n, parity, order, 1))[:2]:
+        raise Exception('different canonical forms of parity')
+print('Checked parity functions')
@@ -13,6 +13,7 @@ setup(
     author='Niels Serup',
     author_email='ns@metanohi.org',
     packages=['electruth', 'electruth.external'],
+    package_data={'electruth': ['gates.json']},
     scripts=['scripts/electruth'],
     requires=['qvikconfig'],
     url='http://metanohi.org/projects/electruth/',